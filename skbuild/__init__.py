@@ -1,9 +1,17 @@
 # -*- coding: utf-8 -*-
 
-from .setuptools_wrap import setup  # noqa: F401
-
 __author__ = 'The scikit-build team'
 __email__ = 'scikit-build@googlegroups.com'
 __version__ = '0.3.0'
 
 __all__ = ["setup"]
+
+
+def setup(*args, **kw):
+    """Wrapper of :func:`.setuptools_wrap.setup`.
+
+    Importing ``setuptools``, ``distutils`` and ``wheel`` is expensive,
+    they are only loaded once this function is called.
+    """
+    from .setuptools_wrap import setup as _setup
+    return _setup(*args, **kw)
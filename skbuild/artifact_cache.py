@@ -0,0 +1,453 @@
+"""This module provides a content-addressed cache of CMake install trees.
+
+When the ``SKBUILD_ARTIFACT_CACHE`` environment variable is set, the files
+installed by CMake are archived after each build, keyed by a digest of the
+inputs of the build (see :func:`artifact_key`). Subsequent builds done with
+the same inputs, possibly in another checkout of the project, restore the
+install tree from the archive and skip the configure and build steps.
+
+Archives are stored in a local directory whose total size is capped, the
+least recently used archives being evicted first. A remote HTTP cache can
+also be used: archives missing locally are then downloaded from it, and new
+archives are uploaded to it.
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import sysconfig
+import tarfile
+import time
+
+from distutils.spawn import find_executable
+
+try:
+    from urllib.error import HTTPError, URLError
+    from urllib.request import Request, urlopen
+except ImportError:  # pragma: no cover
+    from urllib2 import HTTPError, Request, URLError, urlopen
+
+from .constants import skbuild_plat_name
+from .utils import (env_flag, get_cache_dir, mkdir_p, parse_flag,
+                    replace_file)
+
+ARTIFACT_CACHE_DIRNAME = "artifacts"
+
+ARTIFACT_SUFFIX = ".tar.gz"
+
+# Name of the install manifest stored in the archives. Its paths are
+# relative to the install tree.
+ARTIFACT_MANIFEST = "install_manifest.txt"
+
+# Default value of ``SKBUILD_ARTIFACT_CACHE_MAX_SIZE``.
+DEFAULT_MAX_SIZE = 2 * 1024 ** 3
+
+# Compilers identified by :func:`toolchain_identity`: environment variable
+# and default executable.
+TOOLCHAIN_COMPILERS = (("CC", "cc"), ("CXX", "c++"), ("FC", "gfortran"))
+
+# Environment variables changing the flags used by the compilers.
+TOOLCHAIN_ENV_VARS = ("CFLAGS", "CPPFLAGS", "CXXFLAGS", "FFLAGS", "LDFLAGS")
+
+_SIZE_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+
+def parse_size(value):
+    """Return the number of bytes of a size like ``500M`` or ``2G``, or
+    None if it can not be parsed."""
+    match = re.match(r"^\s*(\d+)\s*([KMG]?)B?\s*$", str(value), re.I)
+    if match is None:
+        return None
+    return int(match.group(1)) * _SIZE_UNITS[match.group(2).upper()]
+
+
+def get_artifact_cache_max_size():
+    """Return the maximum size, in bytes, of the local artifact cache. It is
+    read from the ``SKBUILD_ARTIFACT_CACHE_MAX_SIZE`` environment variable
+    and defaults to 2G."""
+    size = parse_size(os.environ.get("SKBUILD_ARTIFACT_CACHE_MAX_SIZE", ""))
+    return DEFAULT_MAX_SIZE if size is None else size
+
+
+def _is_url(value):
+    return re.match(r"^https?://", value) is not None
+
+
+def get_artifact_cache_dir():
+    """Return the directory of the local artifact cache: the one set by the
+    ``SKBUILD_ARTIFACT_CACHE`` environment variable, or the ``artifacts``
+    directory of the scikit-build cache (see :func:`get_artifact_cache`).
+    """
+    value = os.environ.get("SKBUILD_ARTIFACT_CACHE", "").strip()
+    if parse_flag(value) is not None or _is_url(value):
+        return os.path.join(get_cache_dir(), ARTIFACT_CACHE_DIRNAME)
+    return value
+
+
+def get_artifact_cache():
+    """Return the artifact cache selected by the ``SKBUILD_ARTIFACT_CACHE``
+    environment variable, or None if it is disabled.
+
+    The variable may be set to:
+
+    - ``1``: use the ``artifacts`` directory of the scikit-build cache,
+    - a directory: use this directory,
+    - an ``http://`` or ``https://`` URL: use this remote cache in addition
+      to the ``artifacts`` directory of the scikit-build cache.
+    """
+    if not env_flag("SKBUILD_ARTIFACT_CACHE"):
+        return None
+    value = os.environ["SKBUILD_ARTIFACT_CACHE"].strip()
+    local_cache = LocalArtifactCache(
+        get_artifact_cache_dir(), get_artifact_cache_max_size())
+    if _is_url(value):
+        return TieredArtifactCache(local_cache, HTTPArtifactCache(value))
+    return local_cache
+
+
+class LocalArtifactCache(object):
+    """Artifact cache storing archives in ``directory``.
+
+    Archives are evicted, least recently used first, when the total size of
+    the cache exceeds ``max_size`` bytes.
+    """
+
+    def __init__(self, directory, max_size=DEFAULT_MAX_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+
+    def __str__(self):
+        return self.directory
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ARTIFACT_SUFFIX)
+
+    def get(self, key, path):
+        """Copy the archive associated with ``key`` to ``path``. Return
+        False if there is none."""
+        source = self._path(key)
+        try:
+            shutil.copyfile(source, path)
+        except (IOError, OSError):
+            return False
+        # The modification time records the last use of the archive
+        try:
+            os.utime(source, None)
+        except OSError:  # pragma: no cover
+            pass
+        return True
+
+    def put(self, key, path):
+        """Store the archive ``path`` under ``key`` and evict the least
+        recently used archives if the cache is full."""
+        mkdir_p(self.directory)
+        # The archive is copied under a temporary name then renamed, this
+        # ensures concurrent builds never read a partially written archive.
+        tmp_path = "{}.{}.tmp".format(self._path(key), os.getpid())
+        shutil.copyfile(path, tmp_path)
+        replace_file(tmp_path, self._path(key))
+        self.evict()
+
+    def evict(self):
+        """Remove the least recently used archives until the total size of
+        the cache is at most :attr:`max_size`. Return the removed keys."""
+        entries = []
+        try:
+            filenames = os.listdir(self.directory)
+        except OSError:
+            return []
+        for filename in filenames:
+            if not filename.endswith(ARTIFACT_SUFFIX):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, filename))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, filename, stat.st_size))
+        total_size = sum(size for _, _, size in entries)
+        evicted = []
+        for _, filename, size in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(os.path.join(self.directory, filename))
+            except OSError:
+                continue
+            total_size -= size
+            evicted.append(filename[:-len(ARTIFACT_SUFFIX)])
+        return evicted
+
+    def clear(self):
+        """Remove all the archives. Other files of the directory, which may
+        be set by the user, are kept."""
+        try:
+            filenames = os.listdir(self.directory)
+        except OSError:
+            return
+        for filename in filenames:
+            if filename.endswith(ARTIFACT_SUFFIX):
+                os.remove(os.path.join(self.directory, filename))
+
+
+class HTTPArtifactCache(object):
+    """Artifact cache storing archives on an HTTP server.
+
+    Archives are downloaded using ``GET <url>/<key>.tar.gz`` and uploaded
+    using ``PUT``. Errors are reported and otherwise ignored: they must not
+    fail the build. Evicting archives is left to the server.
+    """
+
+    def __init__(self, url, timeout=30):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def __str__(self):
+        return self.url
+
+    def _url(self, key):
+        return "{}/{}{}".format(self.url, key, ARTIFACT_SUFFIX)
+
+    def get(self, key, path):
+        """Download the archive associated with ``key`` to ``path``. Return
+        False if there is none or if it can not be downloaded."""
+        try:
+            response = urlopen(self._url(key), timeout=self.timeout)
+            try:
+                with open(path, "wb") as fp:
+                    shutil.copyfileobj(response, fp)
+            finally:
+                response.close()
+        except HTTPError as e:
+            if e.code != 404:
+                print("Failed to download {}: {}".format(self._url(key), e))
+            return False
+        except (URLError, IOError, OSError) as e:
+            print("Failed to download {}: {}".format(self._url(key), e))
+            return False
+        return True
+
+    def put(self, key, path):
+        """Upload the archive ``path`` under ``key``."""
+        with open(path, "rb") as fp:
+            data = fp.read()
+        request = Request(self._url(key), data=data, headers={
+            "Content-Type": "application/gzip"})
+        request.get_method = lambda: "PUT"
+        try:
+            urlopen(request, timeout=self.timeout).close()
+        except (URLError, IOError, OSError) as e:
+            print("Failed to upload {}: {}".format(self._url(key), e))
+
+
+class TieredArtifactCache(object):
+    """Artifact cache looking up archives in ``local`` first, then in
+    ``remote``. Archives found remotely are stored locally, new archives are
+    stored in both."""
+
+    def __init__(self, local, remote):
+        self.local = local
+        self.remote = remote
+
+    def __str__(self):
+        return "{} and {}".format(self.local, self.remote)
+
+    def get(self, key, path):
+        if self.local.get(key, path):
+            return True
+        if self.remote.get(key, path):
+            self.local.put(key, path)
+            return True
+        return False
+
+    def put(self, key, path):
+        self.local.put(key, path)
+        self.remote.put(key, path)
+
+
+def _first_line_of_output(cmd):
+    try:
+        output = subprocess.check_output(cmd, stderr=subprocess.STDOUT)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    lines = output.decode("utf-8", "replace").strip().splitlines()
+    return lines[0] if lines else ""
+
+
+def toolchain_identity():
+    """Return a list identifying the CMake executable, the C, C++ and
+    Fortran compilers (path and ``--version`` output) and the compiler
+    flags set in the environment."""
+    identity = []
+    executables = [("cmake", "cmake")] + [
+        (name, os.environ.get(name) or default)
+        for name, default in TOOLCHAIN_COMPILERS]
+    for name, executable in executables:
+        path = find_executable(executable)
+        if path is None:
+            identity.append([name, executable, None])
+            continue
+        identity.append([name, os.path.realpath(path),
+                         _first_line_of_output([path, "--version"])])
+    identity.append({name: os.environ.get(name)
+                     for name in TOOLCHAIN_ENV_VARS})
+    return identity
+
+
+def python_abi():
+    """Return a dictionary identifying the ABI of the current interpreter."""
+    return {
+        "platform": skbuild_plat_name(),
+        "soabi": sysconfig.get_config_var("SOABI"),
+        "version": sys.version.split(" ")[0],
+        "maxsize": sys.maxsize
+    }
+
+
+def artifact_key(sources_digest, configure_command, build_args):
+    """Return the key of the install tree built from the sources identified
+    by ``sources_digest`` using ``configure_command`` and ``build_args``.
+
+    The current directory is replaced by a placeholder in the configure
+    command: it makes the key independent of the location of the project.
+    The identity of the toolchain (see :func:`toolchain_identity`) and the
+    ABI of the interpreter (see :func:`python_abi`) are also part of the key.
+    """
+    from . import __version__
+    project_dir = os.path.abspath(os.curdir)
+    inputs = {
+        "sources": sources_digest,
+        "configure": [arg.replace(project_dir, "<project>")
+                      for arg in configure_command],
+        "build": list(build_args),
+        "toolchain": toolchain_identity(),
+        "python": python_abi(),
+        "scikit-build": __version__
+    }
+    return hashlib.sha1(json.dumps(
+        inputs, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _artifact_tmp_path(install_dir):
+    return "{}.{}{}".format(
+        os.path.abspath(install_dir), os.getpid(), ARTIFACT_SUFFIX)
+
+
+def store_install_tree(cache, key, install_dir, installed_paths):
+    """Archive the ``installed_paths`` (relative to the current directory)
+    found in ``install_dir`` and store the archive in ``cache`` under
+    ``key``.
+
+    Nothing is stored if some of the paths are not in ``install_dir``: the
+    install tree could then not be restored in another location. Return
+    True if the archive was stored.
+    """
+    install_dir = os.path.abspath(install_dir)
+    relative_paths = []
+    for path in installed_paths:
+        path = os.path.abspath(path)
+        if not path.startswith(install_dir + os.sep):
+            print("not caching the install tree: {} is installed outside "
+                  "of {}".format(path, install_dir))
+            return False
+        relative_paths.append(
+            os.path.relpath(path, install_dir).replace(os.sep, "/"))
+
+    archive_path = _artifact_tmp_path(install_dir)
+    try:
+        manifest = "".join(path + "\n" for path in relative_paths)
+        manifest_path = archive_path + ".manifest"
+        with open(manifest_path, "w") as fp:
+            fp.write(manifest)
+        with tarfile.open(archive_path, "w:gz") as archive:
+            archive.add(manifest_path, ARTIFACT_MANIFEST)
+            for path in relative_paths:
+                archive.add(os.path.join(install_dir, path),
+                            "install/" + path, recursive=False)
+        os.remove(manifest_path)
+        cache.put(key, archive_path)
+    finally:
+        if os.path.exists(archive_path):
+            os.remove(archive_path)
+    return True
+
+
+def _check_member(member, install_dir):
+    """Raise :class:`tarfile.TarError` if extracting ``member`` into
+    ``install_dir`` would write, or create a link pointing, outside of it.
+
+    Paths are resolved against the links already extracted: a link can not
+    be used by a later member to escape ``install_dir``.
+    """
+    root = os.path.realpath(install_dir)
+    parent = os.path.realpath(
+        os.path.join(root, *member.name.split("/")[:-1]))
+    paths = [os.path.join(parent, member.name.split("/")[-1])]
+    if member.issym():
+        paths.append(os.path.realpath(os.path.join(parent, member.linkname)))
+    for path in paths:
+        if path != root and not path.startswith(root + os.sep):
+            raise tarfile.TarError(
+                "'{}' points outside of the install tree".format(member.name))
+
+
+def restore_install_tree(cache, key, install_dir, manifest_path):
+    """Restore the install tree stored in ``cache`` under ``key`` into
+    ``install_dir`` and write its install manifest into ``manifest_path``.
+
+    ``install_dir`` is emptied first. Return False if there is no archive
+    associated with ``key`` or if it can not be extracted, e.g. because one
+    of its members or links points outside of ``install_dir`` (archives may
+    come from a remote cache).
+    """
+    archive_path = _artifact_tmp_path(install_dir)
+    mkdir_p(os.path.dirname(archive_path))
+    try:
+        if not cache.get(key, archive_path):
+            return False
+        if os.path.isdir(install_dir):
+            shutil.rmtree(install_dir)
+        mkdir_p(install_dir)
+        try:
+            with tarfile.open(archive_path, "r:gz") as archive:
+                members = archive.getmembers()
+                manifest = archive.extractfile(ARTIFACT_MANIFEST).read()
+                relative_paths = manifest.decode("utf-8").splitlines()
+                for member in members:
+                    name = member.name
+                    if (not name.startswith("install/")
+                            or os.path.isabs(name) or ".." in name.split("/")
+                            or not (member.isfile() or member.isdir()
+                                    or member.issym())):
+                        continue
+                    member.name = name[len("install/"):]
+                    _check_member(member, install_dir)
+                    if hasattr(tarfile, "data_filter"):
+                        archive.extract(member, install_dir, filter="data")
+                    else:
+                        archive.extract(member, install_dir)
+        except (tarfile.TarError, KeyError, IOError, OSError) as e:
+            print("Failed to restore the install tree {}: {}".format(key, e))
+            shutil.rmtree(install_dir)
+            mkdir_p(install_dir)
+            return False
+    finally:
+        if os.path.exists(archive_path):
+            os.remove(archive_path)
+
+    install_dir = os.path.abspath(install_dir)
+    mkdir_p(os.path.dirname(os.path.abspath(manifest_path)))
+    with open(manifest_path, "w") as fp:
+        for path in relative_paths:
+            fp.write(os.path.join(install_dir, *path.split("/")) + "\n")
+    # Make the restored files newer than the sources, like after a build
+    now = time.time()
+    for path in relative_paths:
+        try:
+            os.utime(os.path.join(install_dir, *path.split("/")), (now, now))
+        except OSError:  # pragma: no cover
+            pass
+    return True
@@ -1,26 +1,65 @@
 import argparse
 import glob
+import hashlib
 import itertools
+import json
+import multiprocessing
 import os
 import os.path
 import platform
 import re
 import subprocess
 import shlex
+import shutil
 import sys
 import sysconfig
 
+from distutils.spawn import find_executable
+from multiprocessing.pool import ThreadPool
 from subprocess import CalledProcessError
 
-from .constants import (CMAKE_BUILD_DIR,
-                        CMAKE_INSTALL_DIR,
-                        SETUPTOOLS_INSTALL_DIR)
+from .constants import (get_cmake_build_dir,
+                        get_cmake_install_dir,
+                        get_setuptools_install_dir,
+                        get_skbuild_build_base,
+                        SKBUILD_DIR)
 from .platform_specifics import get_platform
 from .exceptions import SKBuildError
+from .profiling import (compile_times_enabled, parse_compile_timer_log,
+                        parse_ninja_log, profile_phase, report_compile_times)
+from .utils import (env_flag, get_cache_dir, load_json, parse_flag,
+                    save_json)
 
 RE_FILE_INSTALL = re.compile(
     r"""[ \t]*file\(INSTALL DESTINATION "([^"]+)".*"([^"]+)"\).*""")
 
+RE_INCLUDE = re.compile(r"""[ \t]*include\("([^"]+)"\).*""")
+
+# Configure arguments that may select a toolchain different from the one
+# detected while testing the generator.
+RE_TOOLCHAIN_ARG = re.compile(
+    r"^(-C|-T|-A|-D\s*CMAKE_(\w+_COMPILER|TOOLCHAIN_FILE|GENERATOR_\w+)\b)")
+
+# Compiler caches searched for when the compiler cache is enabled without
+# selecting one explicitly. See :func:`find_compiler_cache`.
+COMPILER_CACHES = ("ccache", "sccache")
+
+# Languages for which the compiler cache is used as compiler launcher
+COMPILER_CACHE_LANGUAGES = ("C", "CXX", "Fortran")
+
+# Directory of the scikit-build cache where the Python include directory
+# and library found for each interpreter are stored.
+# See :meth:`CMaker.get_python_info`.
+PYTHON_INFO_CACHE_DIRNAME = "python-info"
+
+# File written next to CMakeCache.txt recording the inputs of the last
+# configure step. See :meth:`CMaker.configure`.
+CONFIGURE_STAMP_FILENAME = "skbuild-configure-stamp.json"
+
+COMPILE_TIMER_LOG_FILENAME = "skbuild-compile-times.log"
+COMPILE_TIMER_SCRIPT = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "compile_timer.py")
+
 
 def pop_arg(arg, a, default=None):
     """Pops an arg(ument) from an argument list a and returns the new list
@@ -37,6 +76,16 @@ def pop_arg(arg, a, default=None):
     return a, val
 
 
+def pop_args(arg, a):
+    """Pops all the occurrences of an arg(ument) from an argument list a
+    and returns the new list and the list of their values.
+    """
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument(arg, action='append', dest='values', default=[])
+    ns, a = parser.parse_known_args(a)
+    return a, ns.values
+
+
 def _remove_cwd_prefix(path):
     cwd = os.getcwd()
 
@@ -52,6 +101,249 @@ def _remove_cwd_prefix(path):
     return result
 
 
+def _read_first_line(path):
+    try:
+        with open(path) as fp:
+            return fp.readline().strip()
+    except (IOError, OSError):
+        return None
+
+
+def _parse_positive_int(value):
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return None
+    return value if value > 0 else None
+
+
+def get_cpu_count():
+    """Return the number of CPUs this process can use.
+
+    This takes into account the CPU affinity of the process and, on Linux,
+    the CPU quota of the cgroup (v1 or v2) it belongs to.
+    """
+    try:
+        count = len(os.sched_getaffinity(0))
+    except AttributeError:
+        count = multiprocessing.cpu_count()
+
+    quota, period = None, None
+    cpu_max = _read_first_line("/sys/fs/cgroup/cpu.max")
+    if cpu_max is not None:
+        quota, _, period = cpu_max.partition(" ")
+    else:
+        quota = _read_first_line("/sys/fs/cgroup/cpu/cpu.cfs_quota_us")
+        period = _read_first_line("/sys/fs/cgroup/cpu/cpu.cfs_period_us")
+    quota, period = _parse_positive_int(quota), _parse_positive_int(period)
+    if quota and period:
+        count = min(count, max(1, quota // period))
+
+    return max(1, count)
+
+
+def get_available_memory():
+    """Return the memory available to this process in bytes, or None if it
+    can not be determined."""
+    available = None
+    try:
+        with open("/proc/meminfo") as meminfo:
+            for line in meminfo:
+                if line.startswith("MemAvailable:"):
+                    available = int(line.split()[1]) * 1024
+                    break
+    except (IOError, OSError):
+        try:
+            available = (os.sysconf("SC_AVPHYS_PAGES")
+                         * os.sysconf("SC_PAGE_SIZE"))
+        except (AttributeError, ValueError, OSError):
+            pass
+
+    # cgroup v2, then v1
+    limit = _parse_positive_int(_read_first_line("/sys/fs/cgroup/memory.max"))
+    usage = _read_first_line("/sys/fs/cgroup/memory.current")
+    if limit is None:
+        limit = _parse_positive_int(_read_first_line(
+            "/sys/fs/cgroup/memory/memory.limit_in_bytes"))
+        usage = _read_first_line(
+            "/sys/fs/cgroup/memory/memory.usage_in_bytes")
+    # cgroup v1 reports a huge number when there is no limit
+    if limit is not None and limit < 2 ** 60:
+        cgroup_available = max(0, limit - (_parse_positive_int(usage) or 0))
+        if available is None or cgroup_available < available:
+            available = cgroup_available
+
+    return available
+
+
+def get_build_jobs(jobs=None):
+    """Return the number of build jobs to run at once.
+
+    The number is, by order of precedence, ``jobs``, the value of the
+    ``SKBUILD_PARALLEL_LEVEL`` or ``CMAKE_BUILD_PARALLEL_LEVEL`` environment
+    variables, or the number of usable CPUs (see :func:`get_cpu_count`).
+
+    If the ``SKBUILD_BUILD_MEMORY_PER_JOB`` environment variable is set to a
+    number of megabytes, the number of jobs is also limited so that each one
+    can use that amount of the available memory.
+    """
+    jobs = (_parse_positive_int(jobs)
+            or _parse_positive_int(os.environ.get("SKBUILD_PARALLEL_LEVEL"))
+            or _parse_positive_int(
+                os.environ.get("CMAKE_BUILD_PARALLEL_LEVEL"))
+            or get_cpu_count())
+
+    memory_per_job = _parse_positive_int(
+        os.environ.get("SKBUILD_BUILD_MEMORY_PER_JOB"))
+    if memory_per_job is not None:
+        available_memory = get_available_memory()
+        if available_memory is not None:
+            jobs = min(jobs,
+                       max(1, available_memory // (memory_per_job * 1024 ** 2)))
+
+    return jobs
+
+
+def get_build_tool_jobs_args(generator, jobs=None):
+    """Return the build tool arguments allowing ``jobs`` build jobs at once
+    with the given CMake ``generator``.
+
+    If ``jobs`` is None, the number of jobs is computed using
+    :func:`get_build_jobs`.
+    """
+    jobs = get_build_jobs(jobs)
+
+    if generator is None:
+        return ['-j', str(jobs)]
+
+    if generator.startswith("Visual Studio"):
+        return ['/m:{}'.format(jobs)]
+
+    if (generator in ("Unix Makefiles", "MinGW Makefiles", "MSYS Makefiles")
+            or generator.startswith("Ninja")):
+        return ['-j', str(jobs)]
+
+    if generator == "Xcode":
+        return ['-jobs', str(jobs)]
+
+    # The build tool is not known to support parallel builds
+    return []
+
+
+def find_compiler_cache(compiler_cache=None):
+    """Return the path of the compiler cache executable to use as compiler
+    launcher, or None if no compiler cache should be used.
+
+    ``compiler_cache`` can be False (disabled), True or ``"auto"`` (use
+    the first of :data:`COMPILER_CACHES` found in the ``PATH``), or the name
+    or path of the compiler cache executable (e.g. ``"sccache"``). If the
+    ``SKBUILD_COMPILER_CACHE`` environment variable is set, it takes
+    precedence over ``compiler_cache``.
+
+    It raises ``SKBuildError`` if an explicitly selected compiler cache can
+    not be found.
+    """
+    compiler_cache = os.environ.get("SKBUILD_COMPILER_CACHE", compiler_cache)
+    if compiler_cache is None or compiler_cache is False:
+        return None
+
+    value = str(compiler_cache).strip()
+    flag = parse_flag(value)
+    if flag is False:
+        return None
+
+    if flag is True or value.lower() == "auto":
+        for name in COMPILER_CACHES:
+            path = find_executable(name)
+            if path is not None:
+                return path
+        return None
+
+    path = find_executable(value)
+    if path is None:
+        raise SKBuildError(
+            "Compiler cache '{}' could not be found.".format(value))
+    return path
+
+
+def get_compiler_launcher_args(compiler_cache=None, compile_timer_log=None):
+    """Return the CMake arguments setting the compiler cache found using
+    :func:`find_compiler_cache` as compiler launcher.
+
+    If ``compile_timer_log`` is set, compilations are also wrapped by
+    :mod:`.compile_timer` recording their duration in this file.
+    """
+    launcher = []
+    if compile_timer_log is not None:
+        launcher = [sys.executable, COMPILE_TIMER_SCRIPT, compile_timer_log]
+    compiler_cache = find_compiler_cache(compiler_cache)
+    if compiler_cache is not None:
+        launcher.append(compiler_cache)
+    if not launcher:
+        return []
+    return ["-DCMAKE_{}_COMPILER_LAUNCHER:STRING={}".format(
+            language, ";".join(launcher))
+            for language in COMPILER_CACHE_LANGUAGES]
+
+
+def _get_launcher_compiler_cache(launcher):
+    """Return the compiler cache found in the CMake list ``launcher``
+    (the value of ``CMAKE_<LANG>_COMPILER_LAUNCHER``), or None."""
+    for path in reversed((launcher or "").split(";")):
+        name = os.path.splitext(os.path.basename(path))[0].lower()
+        if name in COMPILER_CACHES:
+            return path
+    return None
+
+
+def get_compiler_cache_stats(compiler_cache):
+    """Return a ``(hits, misses)`` tuple with the statistics reported by
+    the ``ccache`` or ``sccache`` executable ``compiler_cache``, or None if
+    they can not be retrieved."""
+    name = os.path.splitext(os.path.basename(compiler_cache))[0].lower()
+    try:
+        if name == "sccache":
+            output = subprocess.check_output(
+                [compiler_cache, "--show-stats", "--stats-format=json"])
+            stats = json.loads(output.decode("utf-8"))["stats"]
+            return tuple(
+                sum(stats[counter]["counts"].values())
+                for counter in ("cache_hits", "cache_misses"))
+
+        if name == "ccache":
+            output = subprocess.check_output(
+                [compiler_cache, "--print-stats"]).decode("utf-8")
+            stats = dict(
+                line.split("\t", 1) for line in output.splitlines()
+                if "\t" in line)
+            return (int(stats.get("direct_cache_hit", 0))
+                    + int(stats.get("preprocessed_cache_hit", 0)),
+                    int(stats["cache_miss"]))
+    except (OSError, CalledProcessError, ValueError, KeyError,
+            AttributeError):
+        pass
+    return None
+
+
+def _get_cmake_cache_value(build_dir, name):
+    """Return the value of the entry ``name`` found in the ``CMakeCache.txt``
+    of ``build_dir``, or None if it is not set."""
+    prefix = name + ":"
+    try:
+        with open(os.path.join(build_dir, "CMakeCache.txt")) as cache:
+            for line in cache:
+                if line.startswith(prefix):
+                    return line.rstrip("\r\n").split("=", 1)[1]
+    except (IOError, OSError):
+        pass
+    return None
+
+
+def _hash_json(data):
+    return hashlib.sha1(
+        json.dumps(data, sort_keys=True).encode("utf-8")).hexdigest()
+
+
 class CMaker(object):
 
     def __init__(self):
@@ -63,9 +355,12 @@ class CMaker(object):
                 "Problem with the CMake installation, aborting build.")
 
         self.platform = get_platform()
+        self._best_generators = {}
 
+    @profile_phase("configure")
     def configure(self, clargs=(), generator_id=None,
-                  cmake_source_dir='.', cmake_install_dir=''):
+                  cmake_source_dir='.', cmake_install_dir='',
+                  incremental=None, compiler_cache=None):
         """Calls cmake to generate the Makefile/VS Solution/XCode project.
 
         Input:
@@ -73,6 +368,98 @@ class CMaker(object):
         generator_id: string
             The string representing the CMake generator to use.
             If None, uses defaults for your platform.
+        incremental: bool or None
+            If True and the build directory was already configured, the
+            generator used previously is reused and the configure step is
+            skipped if the command line, the Python paths and the
+            ``CMakeLists.txt`` and ``*.cmake`` files are unchanged. If only
+            the CMake files changed, the existing build tree is regenerated
+            using ``cmake .``. If None, the value of the
+            ``SKBUILD_INCREMENTAL_CONFIGURE`` environment variable is used.
+        compiler_cache: bool or string or None
+            Compiler cache (e.g. ``ccache`` or ``sccache``) set as
+            ``CMAKE_<LANG>_COMPILER_LAUNCHER`` for C, C++ and Fortran.
+            See :func:`find_compiler_cache`.
+
+        The inputs and the decision taken are recorded in the
+        ``skbuild-configure-stamp.json`` file of the build directory.
+        """
+
+        previous_stamp = CMaker._previous_configure_stamp(incremental)
+        generator_id, cmd = self.get_configure_command(
+            clargs, generator_id, cmake_source_dir, cmake_install_dir,
+            compiler_cache, previous_stamp)
+
+        if not os.path.exists(get_cmake_build_dir()):
+            os.makedirs(get_cmake_build_dir())
+
+        if not os.path.exists(get_cmake_install_dir()):
+            os.makedirs(get_cmake_install_dir())
+
+        if not os.path.exists(get_setuptools_install_dir()):
+            os.makedirs(get_setuptools_install_dir())
+
+        cmake_source_dir = os.path.abspath(cmake_source_dir)
+
+        stamp_path = os.path.join(
+            get_cmake_build_dir(), CONFIGURE_STAMP_FILENAME)
+        stamp = CMaker._configure_stamp(cmd, generator_id, cmake_source_dir)
+        decision = CMaker._configure_decision(previous_stamp, stamp)
+        stamp["decision"] = decision
+
+        if decision == "skip":
+            print("skipping CMake configure step (nothing changed since the "
+                  "last configure)")
+            CMaker.check_for_bad_installs()
+            save_json(stamp_path, stamp)
+            return
+
+        # The stamp is only valid once the configure step succeeded and the
+        # install destinations were checked
+        if os.path.exists(stamp_path):
+            os.remove(stamp_path)
+
+        if decision == "regenerate":
+            cmd = ['cmake', '.']
+
+        # If possible, reuse the toolchain detected while testing the
+        # generator so that compilers are not identified a second time.
+        if not any(RE_TOOLCHAIN_ARG.match(arg) for arg in cmd[2:]):
+            initial_cache = self.platform.write_probe_toolchain(
+                get_cmake_build_dir(), generator_id)
+            if initial_cache is not None:
+                cmd[2:2] = ['-C', initial_cache]
+
+        # changes dir to cmake_build and calls cmake's configure step
+        # to generate makefile
+        rtn = subprocess.call(cmd, cwd=get_cmake_build_dir())
+        if rtn != 0:
+            raise SKBuildError(
+                "An error occurred while configuring with CMake.\n"
+                "  Command:\n"
+                "    {}\n"
+                "  Source directory:\n"
+                "    {}\n"
+                "  Working directory:\n"
+                "    {}\n"
+                "Please see CMake's output for more information.".format(
+                    self._formatArgsForDisplay(cmd),
+                    os.path.abspath(cmake_source_dir),
+                    os.path.abspath(get_cmake_build_dir())))
+
+        CMaker.check_for_bad_installs()
+
+        save_json(stamp_path, stamp)
+
+    def get_configure_command(self, clargs=(), generator_id=None,
+                              cmake_source_dir='.', cmake_install_dir='',
+                              compiler_cache=None, previous_stamp=None):
+        """Return the generator and the command line used by
+        :meth:`configure` to configure the project.
+
+        The working generator is selected as described in :meth:`configure`.
+        It is only searched for once per requested generator: subsequent
+        calls reuse it.
         """
 
         # if no provided default generator_id, check environment
@@ -84,34 +471,34 @@ class CMaker(object):
         if cli_generator_id is not None:
             generator_id = cli_generator_id
 
-        # use the generator_id returned from the platform, with the current
-        # generator_id as a suggestion
-        generator_id = self.platform.get_best_generator(generator_id)
+        if (previous_stamp is not None
+                and previous_stamp.get("generator")
+                and generator_id in (None, previous_stamp["generator"])):
+            # an existing build tree can only be used with the generator
+            # it was configured with.
+            generator_id = previous_stamp["generator"]
+        else:
+            # use the generator_id returned from the platform, with the
+            # current generator_id as a suggestion
+            if generator_id not in self._best_generators:
+                self._best_generators[generator_id] = \
+                    self.platform.get_best_generator(generator_id)
+            generator_id = self._best_generators[generator_id]
 
         if generator_id is None:
             raise SKBuildError(
                 "Could not get working generator for your system."
                 "  Aborting build.")
 
-        if not os.path.exists(CMAKE_BUILD_DIR):
-            os.makedirs(CMAKE_BUILD_DIR)
-
-        if not os.path.exists(CMAKE_INSTALL_DIR):
-            os.makedirs(CMAKE_INSTALL_DIR)
-
-        if not os.path.exists(SETUPTOOLS_INSTALL_DIR):
-            os.makedirs(SETUPTOOLS_INSTALL_DIR)
-
-        python_version = CMaker.get_python_version()
-        python_include_dir = CMaker.get_python_include_dir(python_version)
-        python_library = CMaker.get_python_library(python_version)
+        python_version, python_include_dir, python_library = \
+            CMaker.get_python_info()
 
         cmake_source_dir = os.path.abspath(cmake_source_dir)
         cmd = [
             'cmake', cmake_source_dir, '-G', generator_id,
             ("-DCMAKE_INSTALL_PREFIX:PATH=" +
                 os.path.abspath(
-                    os.path.join(CMAKE_INSTALL_DIR, cmake_install_dir))),
+                    os.path.join(get_cmake_install_dir(), cmake_install_dir))),
             ("-DPYTHON_EXECUTABLE:FILEPATH=" +
                 sys.executable),
             ("-DPYTHON_VERSION_STRING:STRING=" +
@@ -126,6 +513,9 @@ class CMaker(object):
                 os.path.join(os.path.dirname(__file__), "resources", "cmake"))
         ]
 
+        cmd.extend(get_compiler_launcher_args(
+            compiler_cache, CMaker._compile_timer_log(generator_id)))
+
         cmd.extend(clargs)
 
         cmd.extend(
@@ -133,24 +523,126 @@ class CMaker(object):
                    shlex.split(os.environ.get("SKBUILD_CONFIGURE_OPTIONS", "")))
         )
 
-        # changes dir to cmake_build and calls cmake's configure step
-        # to generate makefile
-        rtn = subprocess.call(cmd, cwd=CMAKE_BUILD_DIR)
-        if rtn != 0:
-            raise SKBuildError(
-                "An error occurred while configuring with CMake.\n"
-                "  Command:\n"
-                "    {}\n"
-                "  Source directory:\n"
-                "    {}\n"
-                "  Working directory:\n"
-                "    {}\n"
-                "Please see CMake's output for more information.".format(
-                    self._formatArgsForDisplay(cmd),
-                    os.path.abspath(cmake_source_dir),
-                    os.path.abspath(CMAKE_BUILD_DIR)))
+        return generator_id, cmd
 
-        CMaker.check_for_bad_installs()
+    @staticmethod
+    def _previous_configure_stamp(incremental):
+        """Return the stamp recorded by the last configure step if
+        ``incremental`` is enabled and the build tree exists, None
+        otherwise."""
+        if incremental is None:
+            incremental = env_flag("SKBUILD_INCREMENTAL_CONFIGURE")
+        if not incremental or not os.path.exists(
+                os.path.join(get_cmake_build_dir(), "CMakeCache.txt")):
+            return None
+        return load_json(
+            os.path.join(get_cmake_build_dir(), CONFIGURE_STAMP_FILENAME))
+
+    @staticmethod
+    def _configure_stamp(cmd, generator_id, cmake_source_dir):
+        """Return a dictionary identifying the inputs of the configure
+        step: the command line, the Python paths and the CMake files found
+        in the source tree and in the scikit-build CMake modules."""
+        command_key = {
+            "command": cmd,
+            "configure_options": os.environ.get(
+                "SKBUILD_CONFIGURE_OPTIONS", ""),
+            "python": [sys.executable, sys.prefix, sys.version]
+        }
+        sources_key = [
+            CMaker._cmake_files_fingerprint(cmake_source_dir),
+            CMaker._cmake_files_fingerprint(
+                os.path.join(os.path.dirname(__file__), "resources", "cmake"))
+        ]
+        return {
+            "generator": generator_id,
+            "command_hash": _hash_json(command_key),
+            "sources_hash": _hash_json(sources_key)
+        }
+
+    @staticmethod
+    def _configure_decision(previous_stamp, stamp):
+        """Return "skip", "regenerate" or "configure" given the stamps
+        associated with the previous and current configure steps."""
+        if (previous_stamp is None
+                or previous_stamp.get("command_hash") != stamp["command_hash"]):
+            return "configure"
+        if previous_stamp.get("sources_hash") != stamp["sources_hash"]:
+            return "regenerate"
+        return "skip"
+
+    @staticmethod
+    def _cmake_files_fingerprint(directory):
+        """Return a sorted list of ``(path, size, mtime)`` for every
+        ``CMakeLists.txt`` and ``*.cmake`` file found in ``directory``.
+
+        Hidden directories, scikit-build directories and CMake build trees
+        are not searched."""
+        fingerprint = []
+        for root, dir_list, file_list in os.walk(directory):
+            dir_list[:] = [
+                name for name in dir_list
+                if not name.startswith(".") and name != SKBUILD_DIR
+                and not os.path.exists(
+                    os.path.join(root, name, "CMakeCache.txt"))
+            ]
+            for filename in file_list:
+                if (filename != "CMakeLists.txt"
+                        and os.path.splitext(filename)[1] != ".cmake"):
+                    continue
+                path = os.path.join(root, filename)
+                stat = os.stat(path)
+                fingerprint.append((os.path.relpath(path, directory),
+                                    stat.st_size, stat.st_mtime))
+        return sorted(fingerprint)
+
+    @staticmethod
+    def get_python_info():
+        """Return a ``(version, include_dir, library)`` tuple describing the
+        current Python interpreter.
+
+        Since searching for the include directory and the library can be
+        slow, the result is cached in the scikit-build cache directory. The
+        cache entry is specific to the interpreter: it is identified by
+        ``sys.executable``, its modification time and the ``VERSION``,
+        ``LIBDIR`` and ``INCLUDEPY`` configuration variables. It is ignored
+        if the cached paths do not exist anymore.
+        """
+        try:
+            executable_mtime = os.path.getmtime(sys.executable)
+        except OSError:
+            executable_mtime = None
+        cache_path = os.path.join(
+            get_cache_dir(), PYTHON_INFO_CACHE_DIRNAME,
+            _hash_json([sys.executable, executable_mtime] + [
+                sysconfig.get_config_var(name)
+                for name in ("VERSION", "LIBDIR", "INCLUDEPY")
+            ]) + ".json")
+
+        info = load_json(cache_path)
+        if (isinstance(info, list) and len(info) == 3
+                and all(info) and all(map(os.path.exists, info[1:]))):
+            return tuple(info)
+
+        python_version = CMaker.get_python_version()
+        info = (python_version,
+                CMaker.get_python_include_dir(python_version),
+                CMaker.get_python_library(python_version))
+        if all(info):
+            try:
+                save_json(cache_path, info)
+            except (IOError, OSError):
+                # The cache directory may not be writable
+                pass
+        return info
+
+    @staticmethod
+    def clear_python_info_cache():
+        """Remove the Python information cached by
+        :meth:`get_python_info` for all interpreters."""
+        cache_dir = os.path.join(get_cache_dir(), PYTHON_INFO_CACHE_DIRNAME)
+        if os.path.isdir(cache_dir):
+            shutil.rmtree(cache_dir)
 
     @staticmethod
     def get_python_version():
@@ -314,37 +806,30 @@ class CMaker(object):
         outside the project root before they are actually installed.
 
         Indeed, we can not wait for the manifest, so we try to extract the
-        information (install destination) from the CMake build files
-        ``*.cmake`` found in ``CMAKE_BUILD_DIR``.
+        information (install destination) from the CMake install scripts
+        found in ``CMAKE_BUILD_DIR``: starting from the top-level
+        ``cmake_install.cmake``, the scripts found in ``CMAKE_BUILD_DIR`` and
+        referenced using ``include()`` are scanned, level by level, using a
+        pool of threads. If an included path can not be resolved, every
+        ``*.cmake`` file found in ``CMAKE_BUILD_DIR`` is scanned instead.
 
         It raises ``SKBuildError`` if it found install detination outside of
         ``CMAKE_INSTALL_DIR``.
         """
 
-        bad_installs = []
-        install_dir = os.path.join(os.getcwd(), CMAKE_INSTALL_DIR)
+        install_dir = os.path.join(os.getcwd(), get_cmake_install_dir())
 
-        for root, dir_list, file_list in os.walk(CMAKE_BUILD_DIR):
-            for filename in file_list:
-                if os.path.splitext(filename)[1] != ".cmake":
-                    continue
+        bad_installs = CMaker._find_bad_installs_from_install_scripts(
+            install_dir)
 
-                for line in open(os.path.join(root, filename)):
-                    match = RE_FILE_INSTALL.match(line)
-                    if match is None:
+        if bad_installs is None:
+            bad_installs = []
+            for root, dir_list, file_list in os.walk(get_cmake_build_dir()):
+                for filename in file_list:
+                    if os.path.splitext(filename)[1] != ".cmake":
                         continue
-
-                    destination = os.path.normpath(
-                        match.group(1).replace("${CMAKE_INSTALL_PREFIX}",
-                                               install_dir))
-
-                    if not destination.startswith(install_dir):
-                        bad_installs.append(
-                            os.path.join(
-                                destination,
-                                os.path.basename(match.group(2))
-                            )
-                        )
+                    bad_installs.extend(CMaker._scan_install_script(
+                        os.path.join(root, filename), install_dir)[0])
 
         if bad_installs:
             raise SKBuildError("\n".join((
@@ -356,27 +841,188 @@ class CMaker(object):
                     ("      " + _install) for _install in bad_installs)
             )))
 
-    def make(self, clargs=(), config="Release", source_dir="."):
+    @staticmethod
+    def _find_bad_installs_from_install_scripts(install_dir):
+        """Return the list of files installed outside of ``install_dir`` by
+        the install scripts reachable from the top-level
+        ``cmake_install.cmake``, or None if the reachable scripts can not
+        all be determined."""
+        build_dir = os.path.abspath(get_cmake_build_dir())
+        top_level_script = os.path.join(build_dir, "cmake_install.cmake")
+        if not os.path.exists(top_level_script):
+            return None
+
+        bad_installs = []
+        scripts = [top_level_script]
+        visited = set(scripts)
+        pool = ThreadPool(min(8, get_cpu_count()))
+        try:
+            while scripts:
+                results = pool.map(
+                    lambda script: CMaker._scan_install_script(
+                        script, install_dir),
+                    scripts)
+                scripts = []
+                for script_bad_installs, includes in results:
+                    bad_installs.extend(script_bad_installs)
+                    for include in includes:
+                        if "${" in include:
+                            return None
+                        include = os.path.normpath(
+                            os.path.join(build_dir, include))
+                        if (include in visited
+                                or not os.path.normcase(include).startswith(
+                                    os.path.normcase(build_dir))
+                                or not os.path.exists(include)):
+                            continue
+                        visited.add(include)
+                        scripts.append(include)
+        finally:
+            pool.close()
+            pool.join()
+
+        return bad_installs
+
+    @staticmethod
+    def _scan_install_script(path, install_dir):
+        """Return a ``(bad_installs, includes)`` tuple where ``bad_installs``
+        is the list of files installed outside of ``install_dir`` by the
+        script ``path`` and ``includes`` the list of paths it includes."""
+        bad_installs = []
+        includes = []
+        with open(path) as script:
+            for line in script:
+                match = RE_INCLUDE.match(line)
+                if match is not None:
+                    includes.append(match.group(1))
+                    continue
+
+                match = RE_FILE_INSTALL.match(line)
+                if match is None:
+                    continue
+
+                destination = os.path.normpath(
+                    match.group(1).replace("${CMAKE_INSTALL_PREFIX}",
+                                           install_dir))
+
+                if not destination.startswith(install_dir):
+                    bad_installs.append(
+                        os.path.join(
+                            destination,
+                            os.path.basename(match.group(2))
+                        )
+                    )
+        return bad_installs, includes
+
+    @profile_phase("make")
+    def make(self, clargs=(), config="Release", source_dir=".",
+             targets=None, install_components=None):
         """Calls the system-specific make program to compile code.
+
+        By default, the ``install`` target is built: it builds all the
+        targets of the project and installs everything. If ``targets`` or
+        ``install_components`` are given, only these targets (or the default
+        target) are built, and only these install components (or all of
+        them) are installed using ``cmake_install.cmake``. The ``--target``
+        and ``--component`` arguments found in ``clargs`` take precedence
+        over ``targets`` and ``install_components``.
+
+        Install manifests of previous builds are removed first: the
+        manifests found after the build list exactly the installed files.
+
+        The ``-j N`` argument found in ``clargs`` is translated into the
+        argument expected by the build tool associated with the generator
+        (see :func:`get_build_tool_jobs_args`).
+
+        If the project was configured with a compiler cache, the number of
+        cache hits and misses of the build is reported.
+
+        If the ``SKBUILD_COMPILE_TIMES`` environment variable is set, the
+        duration of each compilation is reported, see :meth:`_compile_times`.
         """
         clargs, config = pop_arg('--config', clargs, config)
-        if not os.path.exists(CMAKE_BUILD_DIR):
+        clargs, jobs = pop_arg('-j', clargs)
+        clargs, clargs_targets = pop_args('--target', clargs)
+        clargs, clargs_components = pop_args('--component', clargs)
+        targets = clargs_targets or targets
+        install_components = clargs_components or install_components
+        if not os.path.exists(get_cmake_build_dir()):
             raise SKBuildError(("CMake build folder ({}) does not exist. "
                                 "Did you forget to run configure before "
-                                "make?").format(CMAKE_BUILD_DIR))
-
-        cmd = ["cmake", "--build", source_dir,
-               "--target", "install", "--config", config, "--"]
-        cmd.extend(clargs)
-        cmd.extend(
+                                "make?").format(get_cmake_build_dir()))
+
+        generator = _get_cmake_cache_value(
+            get_cmake_build_dir(), "CMAKE_GENERATOR")
+        compiler_cache = _get_launcher_compiler_cache(_get_cmake_cache_value(
+            get_cmake_build_dir(), "CMAKE_C_COMPILER_LAUNCHER"))
+        compiler_cache_stats = None
+        if compiler_cache:
+            compiler_cache_stats = get_compiler_cache_stats(compiler_cache)
+
+        for path in CMaker.get_install_manifests():
+            os.remove(path)
+
+        select = bool(targets or install_components)
+        build_args = get_build_tool_jobs_args(generator, jobs)
+        build_args.extend(clargs)
+        build_args.extend(
             filter(bool,
                    shlex.split(os.environ.get("SKBUILD_BUILD_OPTIONS", "")))
         )
 
-        rtn = subprocess.call(cmd, cwd=CMAKE_BUILD_DIR)
+        compile_times = None
+        if compile_times_enabled():
+            compile_times = CMaker._compile_times()
+
+        # Building the targets one after the other supports CMake versions
+        # not accepting several "--target" arguments.
+        for target in (targets or [None]) if select else ["install"]:
+            cmd = ["cmake", "--build", source_dir]
+            if target is not None:
+                cmd.extend(["--target", target])
+            cmd.extend(["--config", config, "--"])
+            cmd.extend(build_args)
+            CMaker._check_call(cmd, "building", source_dir)
+
+        if select:
+            CMaker.install_components(install_components, config, source_dir)
+
+        if compiler_cache_stats is not None:
+            CMaker._report_compiler_cache_stats(
+                compiler_cache, compiler_cache_stats)
+
+        if compile_times is not None:
+            records = compile_times()
+            if records:
+                report_compile_times(records, get_skbuild_build_base())
+            else:
+                print("No compile times recorded: they are only available "
+                      "with Ninja and Makefile generators.")
+
+    @staticmethod
+    def install_components(components=None, config="Release", source_dir="."):
+        """Install the CMake install ``components`` (all of them if None)
+        of the build directory by running ``cmake_install.cmake``.
+
+        Each component writes its own ``install_manifest_<component>.txt``
+        file (see :meth:`_parse_manifests`).
+        """
+        for component in components or [None]:
+            cmd = ["cmake", "-DBUILD_TYPE:STRING=" + config]
+            if component is not None:
+                cmd.append("-DCOMPONENT:STRING=" + component)
+            cmd.extend(["-P", "cmake_install.cmake"])
+            CMaker._check_call(cmd, "installing", source_dir)
+
+    @staticmethod
+    def _check_call(cmd, action, source_dir):
+        """Run ``cmd`` in the build directory and raise an
+        :class:`.SKBuildError` if it fails. ``action`` (e.g. "building")
+        describes the command in the error message."""
+        rtn = subprocess.call(cmd, cwd=get_cmake_build_dir())
         if rtn != 0:
             raise SKBuildError(
-                "An error occurred while building with CMake.\n"
+                "An error occurred while {} with CMake.\n"
                 "  Command:\n"
                 "    {}\n"
                 "  Source directory:\n"
@@ -384,26 +1030,97 @@ class CMaker(object):
                 "  Working directory:\n"
                 "    {}\n"
                 "Please see CMake's output for more information.".format(
-                    self._formatArgsForDisplay(cmd),
+                    action,
+                    CMaker._formatArgsForDisplay(cmd),
                     os.path.abspath(source_dir),
-                    os.path.abspath(CMAKE_BUILD_DIR)))
+                    os.path.abspath(get_cmake_build_dir())))
+
+    @staticmethod
+    def _compile_timer_log(generator_id):
+        """Return the path of the log file :mod:`.compile_timer` should write
+        into if compile times are recorded, None otherwise.
+
+        Ninja records the duration of each build step in ``.ninja_log``,
+        other generators need the compiler launcher.
+        """
+        if not compile_times_enabled() or "Ninja" in generator_id:
+            return None
+        return os.path.abspath(
+            os.path.join(get_cmake_build_dir(), COMPILE_TIMER_LOG_FILENAME))
+
+    @staticmethod
+    def _compile_times():
+        """Prepare recording the compile times of the build and return a
+        function returning the ``(output, start, end)`` records of the
+        build once it is done.
+
+        With Ninja, the records appended to ``.ninja_log`` are used. Other
+        generators rely on the log written by :mod:`.compile_timer` set as
+        compiler launcher by :meth:`configure`.
+        """
+        build_dir = os.path.abspath(get_cmake_build_dir())
+        ninja_log = os.path.join(build_dir, ".ninja_log")
+        timer_log = os.path.join(build_dir, COMPILE_TIMER_LOG_FILENAME)
+        if os.path.exists(timer_log):
+            os.remove(timer_log)
+        ninja_log_offset = (os.path.getsize(ninja_log)
+                            if os.path.exists(ninja_log) else 0)
+
+        def records():
+            return (parse_ninja_log(ninja_log, ninja_log_offset)
+                    + parse_compile_timer_log(timer_log, build_dir))
+        return records
+
+    @staticmethod
+    def _report_compiler_cache_stats(compiler_cache, stats_before):
+        stats_after = get_compiler_cache_stats(compiler_cache)
+        if stats_after is None:
+            return
+        hits, misses = (after - before for (after, before)
+                        in zip(stats_after, stats_before))
+        total = hits + misses
+        print("Compiler cache ({}): {} hits, {} misses{}".format(
+            os.path.basename(compiler_cache), hits, misses,
+            " ({:.0%} hit rate)".format(float(hits) / total) if total else ""))
 
     def install(self):
-        """Returns a list of file paths to install via setuptools that is
-        compatible with the data_files keyword argument.
+        """Returns an iterator over the file paths to install via setuptools
+        that is compatible with the data_files keyword argument.
+
+        See :meth:`_parse_manifests`.
         """
         return self._parse_manifests()
 
+    @staticmethod
+    def get_install_manifests():
+        """Return the sorted paths of the install manifests found in the
+        build directory."""
+        return sorted(
+            glob.glob(os.path.join(
+                get_cmake_build_dir(), "install_manifest*.txt")))
+
     def _parse_manifests(self):
-        paths = \
-            glob.glob(os.path.join(CMAKE_BUILD_DIR, "install_manifest*.txt"))
-        return [self._parse_manifest(path) for path in paths][0]
+        """Lazily yield the paths listed in all the install manifests
+        (e.g. ``install_manifest.txt`` and the ``install_manifest_<comp>.txt``
+        written by component installs).
+
+        Manifests are read one line at a time, in sorted order, and paths
+        listed in several manifests are only yielded the first time they
+        are found.
+        """
+        seen = set()
+        for path in CMaker.get_install_manifests():
+            for installed_path in self._parse_manifest(path):
+                if installed_path not in seen:
+                    seen.add(installed_path)
+                    yield installed_path
 
     def _parse_manifest(self, install_manifest_path):
         with open(install_manifest_path, "r") as manifest:
-            return [_remove_cwd_prefix(path) for path in manifest]
-
-        return []
+            for path in manifest:
+                path = _remove_cwd_prefix(path)
+                if path:
+                    yield path
 
     @staticmethod
     def _formatArgsForDisplay(args):
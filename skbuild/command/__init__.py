@@ -1,13 +1,49 @@
 
-from .. import cmaker
+from .. import cmaker, compression
 
 
 class set_build_base_mixin(object):
     def finalize_options(self, *args, **kwargs):
         try:
             if not self.build_base or self.build_base == 'build':
-                self.build_base = cmaker.SETUPTOOLS_INSTALL_DIR
+                self.build_base = cmaker.get_setuptools_install_dir()
         except AttributeError:
             pass
 
         super(set_build_base_mixin, self).finalize_options(*args, **kwargs)
+
+
+class compression_policy_mixin(object):
+    """Add the options selecting the :mod:`..compression` policy and report
+    of the archives written by a command."""
+
+    compression_user_options = [
+        ('compression-policy=', None,
+         "compression level of the archive files: comma separated profiles "
+         "(default, auto, dev, max) and GLOB=LEVEL rules"),
+        ('compression-report', None,
+         "report the compression time and ratio of each archive file"),
+    ]
+
+    def initialize_options(self, *args, **kwargs):
+        super(compression_policy_mixin, self).initialize_options(
+            *args, **kwargs)
+        self.compression_policy = None
+        self.compression_report = None
+
+    def finalize_options(self, *args, **kwargs):
+        super(compression_policy_mixin, self).finalize_options(
+            *args, **kwargs)
+        self.compression_policy = compression.get_compression_policy(
+            self.compression_policy)
+        if self.compression_report is None:
+            self.compression_report = compression.compression_report_enabled()
+        # Reported archives are written through the compression policy
+        if self.compression_report and self.compression_policy is None:
+            self.compression_policy = compression.CompressionPolicy()
+
+    def report_compression(self, path, records):
+        """Report the compression ``records`` of the archive ``path``, if
+        requested (see :func:`..compression.report_compression`)."""
+        if self.compression_report:
+            compression.report_compression(path, records)
@@ -1,9 +1,255 @@
+import os
+import shutil
+import stat
+import sys
+
+from contextlib import contextmanager
+from distutils import log
 
 from wheel.bdist_wheel import bdist_wheel as _bdist_wheel
 
-from . import set_build_base_mixin
-from ..utils import new_style
+from . import compression_policy_mixin, set_build_base_mixin
+from ..cmaker import get_cpu_count
+from ..exceptions import SKBuildError
+from ..utils import env_flag, mkdir_p, new_style
+from ..wheel_writer import default_file_mode, script_content, WheelWriter
+
+
+def _walk_order(arcname):
+    """Key sorting archive members like the directory walk done by
+    ``bdist_wheel``: files first, then sub-directories, both by name."""
+    parts = arcname.split("/")
+    return [(1, part) for part in parts[:-1]] + [(0, parts[-1])]
+
+
+class bdist_wheel(set_build_base_mixin, compression_policy_mixin,
+                  new_style(_bdist_wheel)):
+    user_options = _bdist_wheel.user_options + [
+        ('direct', None,
+         "write the wheel directly from the CMake install tree and the "
+         "source tree, without staging copies"),
+        ('archive-jobs=', None,
+         "number of threads compressing the wheel members "
+         "(0 or 'auto' for the number of CPUs) [default: 1]"),
+    ] + compression_policy_mixin.compression_user_options
+
+    boolean_options = _bdist_wheel.boolean_options + [
+        'direct', 'compression-report']
+
+    def initialize_options(self):
+        super(bdist_wheel, self).initialize_options()
+        self.direct = None
+        self.archive_jobs = None
+
+    def finalize_options(self):
+        super(bdist_wheel, self).finalize_options()
+        if self.archive_jobs is None:
+            self.archive_jobs = os.environ.get("SKBUILD_ARCHIVE_JOBS", 1)
+        if str(self.archive_jobs).lower() in ("0", "auto"):
+            self.archive_jobs = get_cpu_count()
+        try:
+            self.archive_jobs = int(self.archive_jobs)
+        except ValueError:
+            raise ValueError(
+                "Invalid number of archive jobs: {}".format(self.archive_jobs))
+        self.archive_jobs = max(1, self.archive_jobs)
+
+    @contextmanager
+    def _wheel_writer(self):
+        """Have the ``bdist_wheel`` base class write the wheel using a
+        :class:`.wheel_writer.WheelWriter` with :attr:`archive_jobs` worker
+        threads and :attr:`compression_policy`.
+
+        The base class creates the archive using the ``WheelFile`` class of
+        its module, which is replaced while the wheel is built. Raise
+        :class:`.exceptions.SKBuildError` if it can not be, instead of
+        silently ignoring the options.
+        """
+        if self.archive_jobs <= 1 and self.compression_policy is None:
+            yield
+            return
+        module = sys.modules[_bdist_wheel.__module__]
+        wheel_file = getattr(module, "WheelFile", None)
+        if wheel_file is None:
+            raise SKBuildError(
+                "This version of wheel does not support --archive-jobs and "
+                "--compression-policy ({}.WheelFile not found), use "
+                "--direct".format(module.__name__))
+        writers = []
+
+        def wheel_writer(path, mode="r", compression=None):
+            if mode != "w":
+                return wheel_file(path, mode, compression)
+            writers.append(WheelWriter(
+                path, compression=compression, jobs=self.archive_jobs,
+                policy=self.compression_policy))
+            return writers[-1]
+
+        module.WheelFile = wheel_writer
+        try:
+            yield
+        finally:
+            module.WheelFile = wheel_file
+        if not writers and not self.dry_run:
+            raise SKBuildError(
+                "This version of wheel does not support --archive-jobs and "
+                "--compression-policy (the wheel was not written using "
+                "{}.WheelFile), use --direct".format(module.__name__))
+        for writer in writers:
+            self.report_compression(writer.path, writer.compression_records)
+
+    def run(self):
+        """Build the wheel.
+
+        If the ``--direct`` option or the ``SKBUILD_DIRECT_WHEEL``
+        environment variable is set, the wheel is written by
+        :meth:`run_direct`.
+
+        If the ``--archive-jobs`` option or the ``SKBUILD_ARCHIVE_JOBS``
+        environment variable is greater than one, the wheel members are
+        compressed and hashed by that many threads.
+
+        The ``--compression-policy`` option or the
+        ``SKBUILD_COMPRESSION_POLICY`` environment variable select the
+        compression level of each member, see :mod:`..compression`.
+        """
+        if self.direct or env_flag("SKBUILD_DIRECT_WHEEL"):
+            reason = self._direct_unsupported_reason()
+            if reason is None:
+                return self.run_direct()
+            log.info("not writing the wheel directly (%s)", reason)
+        with self._wheel_writer():
+            super(bdist_wheel, self).run()
+
+    def _direct_unsupported_reason(self):
+        """Return why the distribution can not be packaged by
+        :meth:`run_direct`, or None if it can."""
+        dist = self.distribution
+        if dist.ext_modules or dist.libraries:
+            return "setuptools extensions or libraries must be built"
+        if dist.headers:
+            return "headers are not supported"
+        for entry in dist.data_files or []:
+            if not isinstance(entry, str) and os.path.isabs(entry[0]):
+                return "data files are installed in an absolute directory"
+        return None
+
+    def _wheel_members(self):
+        """Yield ``(path, arcname, mode)`` for the files of the wheel,
+        found where the build commands would copy them from.
+
+        ``mode`` is the mode of the file in the wheel, or None to use the
+        mode of ``path``. The content of scripts must be read using
+        :func:`.wheel_writer.script_content`.
+        """
+        file_mode = default_file_mode()
+
+        build_py = self.get_finalized_command('build_py')
+
+        def arcname(outfile):
+            return os.path.relpath(outfile, build_py.build_lib).replace(
+                os.sep, "/")
+
+        # Same outputs as build_py.build_modules() and build_packages()
+        modules = []
+        if build_py.py_modules:
+            modules.extend(build_py.find_modules())
+        for package in build_py.packages or []:
+            modules.extend(build_py.find_package_modules(
+                package, build_py.get_package_dir(package)))
+        for package, module, module_file in modules:
+            outfile = build_py.get_module_outfile(
+                build_py.build_lib, package.split('.'), module)
+            yield module_file, arcname(outfile), file_mode
+
+        # Same outputs as build_py.build_package_data()
+        if build_py.packages:
+            for _, src_dir, build_dir, filenames in build_py.data_files:
+                for filename in filenames:
+                    yield (os.path.join(src_dir, filename),
+                           arcname(os.path.join(build_dir, filename)),
+                           file_mode)
+
+        # Same outputs as install_scripts, see script_content()
+        for script in self.distribution.scripts or []:
+            yield script, "{}/scripts/{}".format(
+                self.data_dir, os.path.basename(script)), None
+
+        # Same outputs as install_data
+        for entry in self.distribution.data_files or []:
+            if isinstance(entry, str):
+                directory, filenames = "", [entry]
+            else:
+                directory, filenames = entry
+            for filename in filenames:
+                yield filename, "/".join(
+                    part for part in (
+                        self.data_dir, "data",
+                        directory.replace(os.sep, "/").strip("/"),
+                        os.path.basename(filename))
+                    if part), None
+
+    def run_direct(self):
+        """Write the wheel from the files found by :meth:`_wheel_members`.
+
+        Unlike :meth:`run`, the files are not copied by the ``build`` and
+        ``install`` commands into a staging directory before being
+        compressed: they are streamed into the archive, and their ``RECORD``
+        entry is computed at the same time. Only the ``.dist-info``
+        directory is written into :attr:`bdist_dir`.
+        """
+        self.run_command('egg_info')
+        egg_info = self.get_finalized_command('egg_info')
+
+        if os.path.exists(self.bdist_dir):
+            shutil.rmtree(self.bdist_dir)
+        mkdir_p(self.bdist_dir)
+        egginfo_dir = os.path.join(
+            self.bdist_dir, os.path.basename(egg_info.egg_info))
+        shutil.copytree(egg_info.egg_info, egginfo_dir)
+        # The wheel name may contain a build number, not the metadata
+        distinfo_dirname = "{}.dist-info".format(
+            "-".join(self.wheel_dist_name.split("-")[:2]))
+        distinfo_dir = os.path.join(self.bdist_dir, distinfo_dirname)
+        self.egg2dist(egginfo_dir, distinfo_dir)
+        self.write_wheelfile(distinfo_dir)
+
+        mkdir_p(self.dist_dir)
+        wheel_path = os.path.join(
+            self.dist_dir, "{}-{}.whl".format(
+                self.wheel_dist_name, "-".join(self.get_tag())))
+        log.info("creating '%s' from the install and source trees",
+                 wheel_path)
+
+        # Like the build commands copying them to the same location, files
+        # found more than once (e.g. both modules and package data) are only
+        # packaged once.
+        members = {}
+        for path, arcname, mode in self._wheel_members():
+            members.setdefault(arcname, (path, mode))
+        with WheelWriter(wheel_path, distinfo_dirname, self.compression,
+                         jobs=self.archive_jobs,
+                         policy=self.compression_policy) as wheel:
+            for arcname in sorted(members, key=_walk_order):
+                path, mode = members[arcname]
+                if arcname.startswith(self.data_dir + "/scripts/"):
+                    # Like install_scripts, scripts are made executable
+                    mode = (stat.S_IMODE(os.stat(path).st_mode)
+                            | 0o555) & 0o7777
+                    wheel.writestr(arcname, script_content(path), mode,
+                                   os.path.getmtime(path))
+                else:
+                    wheel.write(path, arcname, mode)
+            for filename in sorted(os.listdir(distinfo_dir)):
+                path = os.path.join(distinfo_dir, filename)
+                if os.path.isfile(path) and filename != "RECORD":
+                    wheel.write(path, distinfo_dirname + "/" + filename)
+        self.report_compression(wheel.path, wheel.compression_records)
 
+        getattr(self.distribution, 'dist_files', []).append(
+            ('bdist_wheel', "{}.{}".format(*sys.version_info[:2]), wheel_path))
 
-class bdist_wheel(set_build_base_mixin, new_style(_bdist_wheel)):
-    pass
+        if not self.keep_temp:
+            log.info("removing %s", self.bdist_dir)
+            if not self.dry_run:
+                shutil.rmtree(self.bdist_dir)
@@ -11,17 +11,41 @@ from shutil import rmtree
 from distutils import log
 
 from . import set_build_base_mixin
-from ..constants import (CMAKE_BUILD_DIR,
-                         CMAKE_INSTALL_DIR,
+from ..artifact_cache import get_artifact_cache_dir, LocalArtifactCache
+from ..constants import (get_cmake_build_dir,
+                         get_cmake_install_dir,
                          SKBUILD_DIR)
-from ..utils import new_style
+from ..cmaker import CMaker
+from ..platform_specifics.abstract import CMakePlatform
+from ..utils import get_cache_dir, new_style
 
 
 class clean(set_build_base_mixin, new_style(_clean)):
+    user_options = _clean.user_options + [
+        ('cache', None,
+         "remove scikit-build persistent caches (CMake generators, "
+         "Python paths and install trees)"),
+    ]
+
+    boolean_options = _clean.boolean_options + ['cache']
+
+    def initialize_options(self):
+        super(clean, self).initialize_options()
+        self.cache = None
+
     def run(self):
         super(clean, self).run()
-        for dir_ in (CMAKE_INSTALL_DIR,
-                     CMAKE_BUILD_DIR,
+        if self.cache:
+            log.info("removing scikit-build caches from '%s'",
+                     get_cache_dir())
+            log.info("removing cached install trees from '%s'",
+                     get_artifact_cache_dir())
+            if not self.dry_run:
+                CMakePlatform.clear_generator_cache()
+                CMaker.clear_python_info_cache()
+                LocalArtifactCache(get_artifact_cache_dir()).clear()
+        for dir_ in (get_cmake_install_dir(),
+                     get_cmake_build_dir(),
                      SKBUILD_DIR):
             if os.path.exists(dir_):
                 log.info("removing '%s'", dir_)
@@ -13,6 +13,27 @@ from ..utils import new_style
 SKBUILD_MARKER_FILE = os.path.join(SKBUILD_DIR, "_skbuild_MANIFEST")
 
 
+def _get_git_tree_id():
+    """Return the id of the git tree associated with ``HEAD``, or None if
+    it can not be determined."""
+    try:
+        with open(os.devnull, 'w') as devnull:
+            return subprocess.check_output(
+                ['git', 'rev-parse', 'HEAD^{tree}'],
+                stderr=devnull).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _read_file(path, mode='r'):
+    """Return the content of ``path`` or None if it can not be read."""
+    try:
+        with open(path, mode) as file:
+            return file.read()
+    except (IOError, OSError):
+        return None
+
+
 class egg_info(set_build_base_mixin, new_style(_egg_info)):
     def run(self):
         # If neither a MANIFEST, nor a a MANIFEST.in file is provided, and we
@@ -36,30 +57,39 @@ class egg_info(set_build_base_mixin, new_style(_egg_info)):
         )
 
         if do_generate:
-            try:
-                with open('MANIFEST', 'wb') as file:
-                    file.write(
-                        subprocess.check_output(
-                            ['git', 'ls-tree', '--name-only', '-r', 'HEAD'])
+            # The marker file contains the id of the git tree listed in the
+            # MANIFEST: listing the files is skipped if it did not change.
+            tree_id = _get_git_tree_id()
+            if (tree_id is None
+                    or tree_id != _read_file(SKBUILD_MARKER_FILE)
+                    or not os.path.exists('MANIFEST')):
+                try:
+                    manifest = subprocess.check_output(
+                        ['git', 'ls-tree', '--name-only', '-r', 'HEAD'])
+                except subprocess.CalledProcessError:
+                    sys.stderr.write(
+                        '\n\n'
+                        'Since scikit-build could not find MANIFEST.in or '
+                        'MANIFEST, it tried to generate a MANIFEST file '
+                        'automatically, but could not because it could not '
+                        'determine which source files to include.\n\n'
+                        'The command used was '
+                        '"git ls-tree --name-only -r HEAD"\n'
+                        '\n\n'
                     )
-            except subprocess.CalledProcessError:
-                sys.stderr.write(
-                    '\n\n'
-                    'Since scikit-build could not find MANIFEST.in or '
-                    'MANIFEST, it tried to generate a MANIFEST file '
-                    'automatically, but could not because it could not '
-                    'determine which source files to include.\n\n'
-                    'The command used was "git ls-tree --name-only -r HEAD"\n'
-                    '\n\n'
-                )
-
-                raise
+
+                    raise
+
+                # Keep the modification time of an unchanged MANIFEST
+                if manifest != _read_file('MANIFEST', 'rb'):
+                    with open('MANIFEST', 'wb') as file:
+                        file.write(manifest)
 
             if not os.path.exists(SKBUILD_DIR):
                 os.makedirs(SKBUILD_DIR)
 
-            with open(SKBUILD_MARKER_FILE, 'w') as file:  # touch
-                pass
+            with open(SKBUILD_MARKER_FILE, 'w') as file:
+                file.write(tree_id or '')
 
         super(egg_info, self).run()
 
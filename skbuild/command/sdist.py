@@ -1,11 +1,113 @@
 
+import os
+import tarfile
+import time
+
+from distutils import log
 from distutils.command.sdist import sdist as _sdist
 
-from . import set_build_base_mixin
-from ..utils import new_style
+try:
+    import grp
+    import pwd
+except ImportError:  # pragma: no cover
+    grp = pwd = None
+
+from . import compression_policy_mixin, set_build_base_mixin
+from ..utils import mkdir_p, new_style
+from ..wheel_writer import ZipWriter
+
+
+def _get_gid(name):
+    """Return the id of the group ``name``, or None if it does not exist."""
+    if grp is None or name is None:
+        return None
+    try:
+        return grp.getgrnam(name).gr_gid
+    except KeyError:
+        return None
+
+
+def _get_uid(name):
+    """Return the id of the user ``name``, or None if it does not exist."""
+    if pwd is None or name is None:
+        return None
+    try:
+        return pwd.getpwnam(name).pw_uid
+    except KeyError:
+        return None
+
 
+class sdist(set_build_base_mixin, compression_policy_mixin, new_style(_sdist)):
+    user_options = (_sdist.user_options
+                    + compression_policy_mixin.compression_user_options)
+
+    boolean_options = _sdist.boolean_options + ['compression-report']
 
-class sdist(set_build_base_mixin, new_style(_sdist)):
     def run(self, *args, **kwargs):
         self.run_command('egg_info')
         super(sdist, self).run(*args, **kwargs)
+
+    def make_archive(self, base_name, format, root_dir=None, base_dir=None,
+                     owner=None, group=None):
+        """Create the ``zip`` and ``gztar`` archives using
+        :attr:`compression_policy`, if set.
+
+        Each file of a zip archive is compressed at the level chosen by the
+        policy, while a gzip stream has a single level: tarballs are
+        compressed at the default level of the policy and reported as a
+        whole.
+        """
+        if (self.compression_policy is None or self.dry_run
+                or root_dir is not None or format not in ("zip", "gztar")):
+            return super(sdist, self).make_archive(
+                base_name, format, root_dir, base_dir, owner, group)
+        if base_dir is None:
+            base_dir = os.curdir
+        mkdir_p(os.path.dirname(base_name) or os.curdir)
+        if format == "zip":
+            return self._make_zipfile(base_name + ".zip", base_dir)
+        return self._make_tarball(base_name + ".tar.gz", base_dir,
+                                  owner, group)
+
+    def _make_zipfile(self, path, base_dir):
+        log.info("creating '%s' and adding '%s' to it", path, base_dir)
+        with ZipWriter(path, policy=self.compression_policy) as archive:
+            for root, dir_list, file_list in os.walk(base_dir):
+                dir_list.sort()
+                for filename in sorted(file_list):
+                    file_path = os.path.normpath(os.path.join(root, filename))
+                    if os.path.isfile(file_path):
+                        archive.write(file_path, file_path.replace(
+                            os.path.sep, "/"))
+        self.report_compression(path, archive.compression_records)
+        return path
+
+    def _make_tarball(self, path, base_dir, owner, group):
+        uid, gid = _get_uid(owner), _get_gid(group)
+
+        def set_owner(tarinfo):
+            if gid is not None:
+                tarinfo.gid = gid
+                tarinfo.gname = group
+            if uid is not None:
+                tarinfo.uid = uid
+                tarinfo.uname = owner
+            return tarinfo
+
+        log.info("creating '%s' and adding '%s' to it", path, base_dir)
+        level = self.compression_policy.level
+        if self.compression_policy.rules:
+            log.warn("warning: compression rules (%s) do not apply to a gzip "
+                     "stream, '%s' is compressed at level %d",
+                     ", ".join("{}={}".format(glob, rule_level) for
+                               glob, rule_level
+                               in self.compression_policy.rules),
+                     path, level)
+        start = time.time()
+        with tarfile.open(path, "w:gz", compresslevel=level) as archive:
+            archive.add(base_dir, filter=set_owner)
+            size = archive.offset
+        self.report_compression(path, [(
+            os.path.basename(path), size, os.path.getsize(path), level,
+            time.time() - start)])
+        return path
@@ -0,0 +1,45 @@
+"""Compiler launcher recording the duration of each compilation.
+
+Usage::
+
+    python compile_timer.py LOG_FILE COMMAND [ARGS ...]
+
+``COMMAND`` is executed and a JSON line describing its output file (the
+argument following ``-o``), its start and end times and its working
+directory is appended to ``LOG_FILE``.
+
+It is set as ``CMAKE_<LANG>_COMPILER_LAUNCHER`` when compile times are
+recorded with generators not writing a ``.ninja_log`` file
+(see :func:`.profiling.compile_times_enabled`). It is executed using its path,
+and only depends on the standard library, to keep its overhead low.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+
+
+def main(argv):
+    log_path, cmd = argv[0], argv[1:]
+    start = time.time()
+    returncode = subprocess.call(cmd)
+    end = time.time()
+
+    output = None
+    if "-o" in cmd[:-1]:
+        output = os.path.abspath(cmd[cmd.index("-o") + 1])
+
+    # Lines are written at once, in append mode, so that concurrent
+    # compilations do not interleave their records.
+    record = json.dumps({"output": output, "start": start, "end": end,
+                         "cwd": os.getcwd()})
+    with open(log_path, "a") as log:
+        log.write(record + "\n")
+
+    return returncode
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
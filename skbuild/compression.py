@@ -0,0 +1,196 @@
+"""This module provides the compression policy of the archives (wheels and
+sdists) and the report of the time spent compressing each of their files.
+
+A policy is selected by the ``SKBUILD_COMPRESSION_POLICY`` environment
+variable or by the ``--compression-policy`` option of ``bdist_wheel`` and
+``sdist``. Its value is a comma separated list of:
+
+* profile names (see :data:`PROFILES`), e.g. ``dev``;
+* ``GLOB=LEVEL`` rules, ``LEVEL`` being a compression level between 0 and 9,
+  ``store`` (no compression) or ``auto`` (level chosen from the entropy of
+  the file content). ``GLOB`` is matched against the archive name of the
+  file and against its basename, the first matching rule applies.
+
+For example, ``dev,*.so=store,*.txt=9``.
+"""
+
+import collections
+import fnmatch
+import math
+import os
+
+from .constants import get_skbuild_build_base
+from .utils import env_flag, save_json
+
+# Number of bytes whose entropy is measured
+SAMPLE_SIZE = 64 * 1024
+
+# Entropy (bits per byte) above which content is considered already
+# compressed, and above which it is only worth a fast compression.
+STORE_ENTROPY = 7.5
+FAST_ENTROPY = 6.0
+
+# profile: (level, detect entropy, maximum compressed/original size ratio)
+PROFILES = {
+    "default": (6, False, None),
+    "auto": (6, True, 0.9),
+    "dev": (1, True, 0.9),
+    "max": (9, False, 0.9),
+}
+
+COMPRESSION_REPORT_FILENAME = "compression-{}.json"
+
+
+def shannon_entropy(data):
+    """Return the entropy of ``data`` in bits per byte (0 to 8)."""
+    data = bytearray(data)
+    if not data:
+        return 0.0
+    entropy = 0.0
+    for count in collections.Counter(data).values():
+        frequency = float(count) / len(data)
+        entropy -= frequency * math.log(frequency, 2)
+    return entropy
+
+
+def entropy_level(sample, level):
+    """Return the compression level of content starting with ``sample``:
+    0 if it looks already compressed, at most 1 if it is hardly
+    compressible, ``level`` otherwise."""
+    entropy = shannon_entropy(sample)
+    if entropy >= STORE_ENTROPY:
+        return 0
+    if entropy >= FAST_ENTROPY:
+        return min(level, 1)
+    return level
+
+
+def _parse_level(value):
+    if value == "store":
+        return 0
+    if value == "auto":
+        return value
+    level = int(value)
+    if not 0 <= level <= 9:
+        raise ValueError(level)
+    return level
+
+
+class CompressionPolicy(object):
+    """Choose the compression level of each file of an archive.
+
+    ``rules`` is a list of ``(glob, level)``. Files not matching any rule
+    are compressed at ``level``, or at a level chosen from their entropy if
+    ``detect_entropy`` is True. If ``max_ratio`` is set, files whose
+    compressed size is larger than ``max_ratio`` times their size are
+    stored instead.
+    """
+
+    def __init__(self, level=6, rules=(), detect_entropy=False,
+                 max_ratio=None):
+        self.level = level
+        self.rules = list(rules)
+        self.detect_entropy = detect_entropy
+        self.max_ratio = max_ratio
+
+    @classmethod
+    def from_string(cls, value):
+        """Return the policy described by ``value`` (see module
+        documentation). Raise ValueError if it is invalid."""
+        policy = cls()
+        for item in (value or "").split(","):
+            item = item.strip()
+            if not item:
+                continue
+            if "=" not in item:
+                if item not in PROFILES:
+                    raise ValueError(
+                        "Unknown compression profile '{}' (expected one of: "
+                        "{})".format(item, ", ".join(sorted(PROFILES))))
+                (policy.level, policy.detect_entropy,
+                 policy.max_ratio) = PROFILES[item]
+                continue
+            glob, _, level = item.partition("=")
+            try:
+                policy.rules.append((glob.strip(),
+                                     _parse_level(level.strip())))
+            except ValueError:
+                raise ValueError(
+                    "Invalid compression level '{}' for '{}' (expected 0 to "
+                    "9, 'store' or 'auto')".format(level, glob))
+        return policy
+
+    def level_for(self, arcname, sample):
+        """Return the compression level of the file ``arcname`` whose content
+        starts with ``sample`` (at least :data:`SAMPLE_SIZE` bytes if the file
+        is that large). 0 means the file is stored."""
+        basename = arcname.rsplit("/", 1)[-1]
+        for glob, level in self.rules:
+            if (fnmatch.fnmatchcase(arcname, glob)
+                    or fnmatch.fnmatchcase(basename, glob)):
+                if level == "auto":
+                    return entropy_level(sample, self.level)
+                return level
+        if self.detect_entropy:
+            return entropy_level(sample, self.level)
+        return self.level
+
+
+def get_compression_policy(value=None):
+    """Return the policy described by ``value`` or by the
+    ``SKBUILD_COMPRESSION_POLICY`` environment variable, None if neither is
+    set."""
+    if value is None:
+        value = os.environ.get("SKBUILD_COMPRESSION_POLICY")
+    if not value:
+        return None
+    return CompressionPolicy.from_string(value)
+
+
+def compression_report_enabled():
+    """Return True if the ``SKBUILD_COMPRESSION_REPORT`` environment variable
+    requests the compression report of the archives."""
+    return env_flag("SKBUILD_COMPRESSION_REPORT")
+
+
+def compression_report(records):
+    """Return a dictionary summarizing the ``(name, size, compressed_size,
+    level, duration)`` ``records``, files sorted by decreasing duration."""
+    files = sorted(
+        ({"name": name, "size": size, "compressed_size": compressed_size,
+          "ratio": float(compressed_size) / size if size else 1.0,
+          "level": level, "duration": duration}
+         for name, size, compressed_size, level, duration in records),
+        key=lambda entry: (-entry["duration"], entry["name"]))
+    size = sum(entry["size"] for entry in files)
+    compressed_size = sum(entry["compressed_size"] for entry in files)
+    return {
+        "size": size,
+        "compressed_size": compressed_size,
+        "ratio": float(compressed_size) / size if size else 1.0,
+        "duration": sum(entry["duration"] for entry in files),
+        "files": files
+    }
+
+
+def report_compression(archive_path, records, directory=None, top=10):
+    """Write the compression report of ``archive_path`` into ``directory``
+    (by default, the build directory) and print the ``top`` slowest files.
+    """
+    if directory is None:
+        directory = get_skbuild_build_base()
+    report = compression_report(records)
+    report_path = os.path.join(
+        directory,
+        COMPRESSION_REPORT_FILENAME.format(os.path.basename(archive_path)))
+    save_json(report_path, report)
+
+    print("")
+    print("Compressed {} in {:.2f}s, ratio {:.2f} (see {}):".format(
+        os.path.basename(archive_path), report["duration"],
+        report["ratio"], report_path))
+    for entry in report["files"][:top]:
+        print("  {:>8.3f}s  {:>6.2f}  level {}  {}".format(
+            entry["duration"], entry["ratio"], entry["level"],
+            entry["name"]))
+    return report_path
@@ -1,6 +1,132 @@
+import hashlib
 import os
+import sys
+import sysconfig
+
+from distutils.util import get_platform
 
 SKBUILD_DIR = "_skbuild"
-CMAKE_BUILD_DIR = os.path.join(SKBUILD_DIR, "cmake-build")
-CMAKE_INSTALL_DIR = os.path.join(SKBUILD_DIR, "cmake-install")
-SETUPTOOLS_INSTALL_DIR = os.path.join(SKBUILD_DIR, "setuptools")
+
+_BUILD_CONFIGURATION = {"build_type": None, "generator": None}
+
+
+def _sanitize(name):
+    # Directory names must not contain dots: setuptools would interpret
+    # the install tree paths associated with py_modules as module names.
+    return name.replace(" ", "_").replace(".", "_")
+
+
+def _abi_flags():
+    """Return the ABI flags of the interpreter (e.g. ``d`` for debug builds,
+    ``t`` for free-threaded builds)."""
+    abi_flags = getattr(sys, "abiflags", None)
+    if abi_flags is not None:
+        return abi_flags
+    # Like wheel, derive them from the configuration on Windows and Python 2
+    abi_flags = ""
+    if sysconfig.get_config_var("Py_GIL_DISABLED"):
+        abi_flags += "t"
+    if (sysconfig.get_config_var("Py_DEBUG")
+            or hasattr(sys, "gettotalrefcount")):
+        abi_flags += "d"
+    if sys.version_info < (3, 8) and sysconfig.get_config_var("WITH_PYMALLOC"):
+        abi_flags += "m"
+    if sys.version_info < (3, 3) and sysconfig.get_config_var(
+            "Py_UNICODE_SIZE") == 4:
+        abi_flags += "u"
+    return abi_flags
+
+
+def skbuild_plat_name():
+    """Return the platform tag and the python tag, including the ABI flags,
+    used to name the build directories (e.g. ``linux_x86_64-cp36m``).
+
+    Like for wheels, dashes and dots of the platform name are replaced
+    by underscores.
+    """
+    implementation = {"cpython": "cp", "pypy": "pp"}.get(
+        getattr(getattr(sys, "implementation", None), "name", "cpython"),
+        "py")
+    return "{}-{}{}{}{}".format(
+        _sanitize(get_platform().replace("-", "_")),
+        implementation, sys.version_info[0], sys.version_info[1],
+        _sanitize(_abi_flags()))
+
+
+def interpreter_prefix_hash():
+    """Return a short hash of ``sys.prefix``, identifying the interpreter
+    among the ones sharing a python tag (e.g. virtual environments created
+    from the same interpreter)."""
+    prefix = os.path.normcase(os.path.abspath(sys.prefix))
+    return hashlib.sha1(prefix.encode("utf-8")).hexdigest()[:8]
+
+
+def set_build_configuration(build_type=None, generator=None):
+    """Set the CMake build type and generator associated with the build
+    directories returned by the functions of this module.
+
+    This allows builds done for different configurations to coexist. It is
+    called by :func:`.setuptools_wrap.setup` once the command line has been
+    parsed. The module constants (e.g. :data:`CMAKE_BUILD_DIR`) are updated
+    accordingly.
+    """
+    _BUILD_CONFIGURATION["build_type"] = build_type
+    _BUILD_CONFIGURATION["generator"] = generator
+    _update_constants()
+
+
+def build_configuration_key():
+    """Return the name of the directory associated with the current build
+    configuration (e.g. ``linux_x86_64-cp36m-1a2b3c4d-Release``).
+
+    It is derived from the platform tag, the python version and ABI flags,
+    the interpreter prefix (see :func:`interpreter_prefix_hash`) and, if
+    set, the build type and the generator (see
+    :func:`set_build_configuration`). Like CMaker, the generator defaults to
+    the ``CMAKE_GENERATOR`` environment variable.
+    """
+    parts = [skbuild_plat_name(), interpreter_prefix_hash()]
+    generator = (_BUILD_CONFIGURATION["generator"]
+                 or os.environ.get("CMAKE_GENERATOR"))
+    for value in (_BUILD_CONFIGURATION["build_type"], generator):
+        if value:
+            parts.append(_sanitize(value))
+    return "-".join(parts)
+
+
+def get_skbuild_build_base():
+    """Directory containing all the files specific to the current build
+    configuration."""
+    return os.path.join(SKBUILD_DIR, build_configuration_key())
+
+
+def get_cmake_build_dir():
+    return os.path.join(get_skbuild_build_base(), "cmake-build")
+
+
+def get_cmake_install_dir():
+    return os.path.join(get_skbuild_build_base(), "cmake-install")
+
+
+def get_setuptools_install_dir():
+    return os.path.join(get_skbuild_build_base(), "setuptools")
+
+
+def get_build_state_file():
+    return os.path.join(get_skbuild_build_base(), "build-state.json")
+
+
+def _update_constants():
+    # The constants are kept for backward compatibility: they are the paths
+    # of the configuration current when they are read, code importing them
+    # before the command line is parsed should use the functions above.
+    global SKBUILD_BUILD_BASE, CMAKE_BUILD_DIR, CMAKE_INSTALL_DIR
+    global SETUPTOOLS_INSTALL_DIR, SKBUILD_BUILD_STATE_FILE
+    SKBUILD_BUILD_BASE = get_skbuild_build_base()
+    CMAKE_BUILD_DIR = get_cmake_build_dir()
+    CMAKE_INSTALL_DIR = get_cmake_install_dir()
+    SETUPTOOLS_INSTALL_DIR = get_setuptools_install_dir()
+    SKBUILD_BUILD_STATE_FILE = get_build_state_file()
+
+
+_update_constants()
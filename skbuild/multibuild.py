@@ -0,0 +1,177 @@
+"""Build wheels of a scikit-build project for several python interpreters
+at once.
+
+Usage::
+
+    python -m skbuild.multibuild --pythons python3.5 python3.6 [-j N]
+                                 [--dist-dir DIR] [-- SETUP_ARGS ...]
+
+Each interpreter runs ``setup.py bdist_wheel`` in a sub-process. Builds use
+their own build directories (see :func:`.constants.build_configuration_key`)
+and share the persistent scikit-build caches, they can then run
+concurrently. The global job budget (see :func:`.cmaker.get_build_jobs`) is
+split across the builds running at the same time.
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+
+from multiprocessing.pool import ThreadPool
+
+from .cmaker import get_build_jobs
+from .constants import SKBUILD_DIR
+from .utils import mkdir_p, replace_file
+
+MULTIBUILD_DIR = os.path.join(SKBUILD_DIR, "multibuild")
+
+
+def create_multibuild_argparser():
+    """Create and return the ``skbuild.multibuild`` argument parser."""
+    parser = argparse.ArgumentParser(
+        prog="python -m skbuild.multibuild",
+        description="Build one wheel per python interpreter, concurrently.")
+    parser.add_argument(
+        '--pythons', nargs='+', required=True, metavar='PYTHON',
+        help='python interpreters to build wheels for')
+    parser.add_argument(
+        '-j', metavar='N', type=int, dest='jobs',
+        help='total number of build jobs shared by all the builds')
+    parser.add_argument(
+        '--parallel-builds', metavar='N', type=int,
+        help='maximum number of builds running at once '
+             '(default: one per interpreter)')
+    parser.add_argument(
+        '--setup-py', default='setup.py', metavar='PATH',
+        help='setup script of the project (default: %(default)s)')
+    parser.add_argument(
+        '--dist-dir', default='dist', metavar='DIR',
+        help='directory where the wheels are created (default: %(default)s)')
+    return parser
+
+
+def split_jobs(jobs, count):
+    """Return a list of ``count`` numbers of jobs whose sum is ``jobs``
+    (or ``count`` if ``jobs`` is smaller), differing by at most one."""
+    jobs = max(jobs, count)
+    return [jobs // count + (1 if index < jobs % count else 0)
+            for index in range(count)]
+
+
+def _interpreter_identity(python):
+    """Return the ``(sys.prefix, sys.executable)`` of the interpreter
+    ``python``, symbolic links resolved, or its path if it can not run."""
+    try:
+        output = subprocess.check_output([
+            python, "-c",
+            "import os, sys; print(sys.prefix); "
+            "print(os.path.realpath(sys.executable))"])
+    except (OSError, subprocess.CalledProcessError):
+        return os.path.abspath(python)
+    return tuple(output.decode("utf-8", "replace").splitlines())
+
+
+def _unique_interpreters(pythons):
+    """Return ``pythons`` without the interpreters found more than once:
+    they would share the same build directories.
+
+    Interpreters are identified by their prefix and executable: virtual
+    environments of the same base interpreter are different interpreters.
+    """
+    unique = []
+    seen = set()
+    for python in pythons:
+        key = _interpreter_identity(python)
+        if key not in seen:
+            seen.add(key)
+            unique.append(python)
+    return unique
+
+
+def build_wheel(index, python, jobs, setup_py, dist_dir, setup_args=()):
+    """Build a wheel using interpreter ``python`` and ``jobs`` build jobs.
+
+    The output of the build is written into ``<index>-<python>.log``
+    in the ``_skbuild/multibuild`` directory, which also contains the
+    ``egg-info`` and ``dist`` directories of the build. Once built, the
+    wheel is moved into ``dist_dir``: builds of wheels having the same name
+    never write the same file. Returns ``(python, returncode, log_path)``.
+    """
+    name = "{}-{}".format(index, os.path.basename(python))
+    egg_base = os.path.abspath(os.path.join(MULTIBUILD_DIR, name))
+    build_dist_dir = os.path.join(egg_base, "dist")
+    if os.path.isdir(build_dist_dir):
+        shutil.rmtree(build_dist_dir)
+    mkdir_p(egg_base)
+    log_path = os.path.join(MULTIBUILD_DIR, "{}.log".format(name))
+
+    cmd = [python, setup_py,
+           "egg_info", "--egg-base", egg_base,
+           "bdist_wheel", "--dist-dir", build_dist_dir,
+           "-j", str(jobs)] + list(setup_args)
+
+    with open(log_path, "w") as log:
+        log.write("{}\n".format(" ".join(cmd)))
+        log.flush()
+        try:
+            returncode = subprocess.call(
+                cmd, stdout=log, stderr=subprocess.STDOUT)
+        except OSError as e:
+            log.write("{}\n".format(e))
+            returncode = 1
+
+    if returncode == 0:
+        mkdir_p(dist_dir)
+        for filename in os.listdir(build_dist_dir):
+            replace_file(os.path.join(build_dist_dir, filename),
+                         os.path.join(dist_dir, filename))
+    return python, returncode, log_path
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    setup_args = []
+    if '--' in argv:
+        separator = argv.index('--')
+        argv, setup_args = argv[:separator], argv[separator + 1:]
+
+    parser = create_multibuild_argparser()
+    args = parser.parse_args(argv)
+
+    pythons = _unique_interpreters(args.pythons)
+    parallel_builds = min(len(pythons), args.parallel_builds or len(pythons))
+    jobs_per_build = split_jobs(get_build_jobs(args.jobs), parallel_builds)
+
+    print("building wheels for {} interpreter(s), {} at once, "
+          "using {} job(s) each".format(
+              len(pythons), parallel_builds,
+              "/".join(str(jobs) for jobs in sorted(set(jobs_per_build)))))
+
+    mkdir_p(MULTIBUILD_DIR)
+    pool = ThreadPool(parallel_builds)
+    try:
+        results = [
+            pool.apply_async(build_wheel, (
+                index, python, jobs_per_build[index % parallel_builds],
+                args.setup_py, args.dist_dir, setup_args))
+            for index, python in enumerate(pythons)
+        ]
+        results = [result.get() for result in results]
+    finally:
+        pool.close()
+        pool.join()
+
+    failed = False
+    for python, returncode, log_path in results:
+        status = "ok" if returncode == 0 else "FAILED"
+        print("{}: {} (see {})".format(python, status, log_path))
+        failed = failed or returncode != 0
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
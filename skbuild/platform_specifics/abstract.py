@@ -1,17 +1,41 @@
 
+import hashlib
+import json
 import os
+import re
 import shutil
+import signal
 import subprocess
+import sys
+import time
 
-from ..utils import push_dir
+from distutils.spawn import find_executable
+
+from ..profiling import profile_phase
+from ..utils import (env_flag, get_cache_dir, load_json, mkdir_p, push_dir,
+                     save_json)
 
 test_folder = "_cmake_test_compile"
 
+GENERATOR_CACHE_FILENAME = "generators.json"
+
+# Environment variables changing the compilers found by CMake. They are
+# part of the key identifying a cached generator.
+GENERATOR_CACHE_ENV_VARS = ("CC", "CXX", "FC", "PATH")
+
+# CMake cache entries describing the toolchain detected while testing a
+# generator. See :meth:`CMakePlatform.write_probe_toolchain`.
+RE_TOOLCHAIN_CACHE_ENTRY = re.compile(
+    r"^(CMAKE_(?:\w+_COMPILER\w*|AR|RANLIB|LINKER|NM|OBJCOPY|OBJDUMP|STRIP|"
+    r"ADDR2LINE|READELF|DLLTOOL|MT|MAKE_PROGRAM|UNAME|EXECUTABLE_FORMAT|"
+    r"PLATFORM_INFO_INITIALIZED)):(\w+)=(.*)$")
+
 
 class CMakePlatform(object):
 
     def __init__(self):
         self._default_generators = list()
+        self._probe_toolchain = None
 
     @property
     def default_generators(self):
@@ -22,19 +46,35 @@ class CMakePlatform(object):
         self._default_generators = generators
 
     @staticmethod
-    def write_test_cmakelist(languages):
-        if not os.path.exists(test_folder):
-            os.makedirs(test_folder)
-        with open("{:s}/{:s}".format(test_folder, "CMakeLists.txt"), "w") as f:
+    def get_ninja_generators():
+        """Return ``["Ninja"]`` if a ``ninja`` executable can be found in the
+        ``PATH``, an empty list otherwise. Platforms prepend this list to
+        their default generators so that Ninja is preferred when available.
+        """
+        return ["Ninja"] if find_executable("ninja") else []
+
+    @staticmethod
+    def get_test_folder():
+        """Return the folder where :meth:`get_best_generator` tests the
+        generators: :data:`test_folder` suffixed with the process id, so that
+        builds running concurrently in the same directory do not share it.
+        """
+        return "{}-{}".format(test_folder, os.getpid())
+
+    @staticmethod
+    def write_test_cmakelist(languages, folder=test_folder):
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+        with open("{:s}/{:s}".format(folder, "CMakeLists.txt"), "w") as f:
             f.write("cmake_minimum_required(VERSION 2.8)\n")
             f.write("PROJECT(compiler_test NONE)\n")
             for language in languages:
                 f.write("ENABLE_LANGUAGE({:s})\n".format(language))
 
     @staticmethod
-    def cleanup_test():
-        if os.path.exists(test_folder):
-            shutil.rmtree(test_folder)
+    def cleanup_test(folder=test_folder):
+        if os.path.exists(folder):
+            shutil.rmtree(folder)
 
     def get_cmake_exe_path(self):
         """Override this method with additional logic where necessary
@@ -44,8 +84,10 @@ class CMakePlatform(object):
 
     # TODO: this method name is not great.  Does anyone have a better idea for
     # renaming it?
+    @profile_phase("get_best_generator")
     def get_best_generator(
-            self, generator=None, languages=("CXX", "C"), cleanup=True):
+            self, generator=None, languages=("CXX", "C"), cleanup=True,
+            parallel=None):
         """Loop over generators to find one that works.
 
         Parameters:
@@ -56,8 +98,20 @@ class CMakePlatform(object):
             the languages you'll need for your project, in terms that
             CMake recognizes.
         cleanup: bool
-            If True, cleans up temporary folder used to test generators.
-            Set to False for debugging to see CMake's output files.
+            If True, cleans up temporary folder used to test generators
+            (see :meth:`get_test_folder`). Set to False for debugging to see
+            CMake's output files.
+        parallel: bool or None
+            If True, all the candidate generators are tried at once. If None,
+            the value of the ``SKBUILD_PARALLEL_GENERATOR_PROBE`` environment
+            variable is used. See :meth:`compile_test_cmakelist`.
+
+        If the ``SKBUILD_GENERATOR_CACHE_TTL`` environment variable is set
+        to a positive number of seconds, the generator found is cached
+        (see :meth:`get_generator_cache_path`) and reused by subsequent
+        calls done with the same CMake executable, compilers and arguments.
+        The toolchain detected while testing the generator is cached along
+        with it, see :meth:`write_probe_toolchain`.
         """
 
         candidate_generators = self.default_generators
@@ -67,19 +121,205 @@ class CMakePlatform(object):
 
         cmake_exe_path = self.get_cmake_exe_path()
 
-        self.write_test_cmakelist(languages)
+        self._probe_toolchain = None
+
+        cache_key = None
+        cache_ttl = CMakePlatform.get_generator_cache_ttl()
+        if cache_ttl > 0:
+            cache_key = CMakePlatform._generator_cache_key(
+                cmake_exe_path, candidate_generators, languages)
+            entry = CMakePlatform._get_cached_generator(cache_key, cache_ttl)
+            if entry is not None:
+                self._probe_toolchain = entry.get("toolchain")
+                return entry["generator"]
+
+        if parallel is None:
+            parallel = env_flag("SKBUILD_PARALLEL_GENERATOR_PROBE")
+
+        folder = CMakePlatform.get_test_folder()
+        self.write_test_cmakelist(languages, folder)
 
         working_generator = self.compile_test_cmakelist(
-            cmake_exe_path, candidate_generators)
+            cmake_exe_path, candidate_generators, parallel=parallel,
+            folder=folder)
+
+        if working_generator is not None:
+            self._probe_toolchain = CMakePlatform._read_probe_toolchain(
+                working_generator, folder)
 
         if cleanup:
-            CMakePlatform.cleanup_test()
+            CMakePlatform.cleanup_test(folder)
+
+        if cache_key is not None and working_generator is not None:
+            CMakePlatform._cache_generator(
+                cache_key, working_generator, self._probe_toolchain,
+                cache_ttl)
 
         return working_generator
 
+    def write_probe_toolchain(self, build_dir, generator):
+        """Seed ``build_dir`` with the toolchain detected by the last call
+        to :meth:`get_best_generator`.
+
+        This copies the ``CMakeFiles/<version>/*.cmake`` platform files and
+        writes an initial cache file setting the compiler related entries
+        found in the test project cache. When configuring a new build tree
+        with ``-C <initial cache file>``, CMake then reuses these and skips
+        the compiler identification.
+
+        It returns the path of the initial cache file, or None if there is no
+        toolchain matching ``generator`` or if ``build_dir`` already contains
+        a ``CMakeCache.txt``.
+        """
+        toolchain = self._probe_toolchain
+        if (toolchain is None
+                or toolchain["generator"] != generator
+                or os.path.exists(os.path.join(build_dir, "CMakeCache.txt"))):
+            return None
+
+        platform_dir = os.path.join(
+            build_dir, "CMakeFiles", toolchain["version_dir"])
+        mkdir_p(platform_dir)
+        for filename, content in toolchain["platform_files"].items():
+            with open(os.path.join(platform_dir, filename), "w") as fp:
+                fp.write(content)
+
+        initial_cache = os.path.join(build_dir, "skbuild-toolchain.cmake")
+        with open(initial_cache, "w") as fp:
+            for name, type_, value in toolchain["cache_entries"]:
+                fp.write('set({} "{}" CACHE {} "")\n'.format(
+                    name, value.replace("\\", "/").replace('"', '\\"'),
+                    type_))
+        return os.path.abspath(initial_cache)
+
     @staticmethod
-    @push_dir(directory=test_folder)
-    def compile_test_cmakelist(cmake_exe_path, candidate_generators):
+    def _read_probe_toolchain(generator, folder=test_folder):
+        """Return the toolchain detected in the test project build tree or
+        None if it can not be found."""
+        build_dir = os.path.join(folder, "build")
+        cache_path = os.path.join(build_dir, "CMakeCache.txt")
+        files_dir = os.path.join(build_dir, "CMakeFiles")
+        if not os.path.exists(cache_path) or not os.path.isdir(files_dir):
+            return None
+
+        version_dirs = [
+            name for name in os.listdir(files_dir)
+            if re.match(r"^\d+\.\d+", name)
+            and os.path.exists(os.path.join(files_dir, name,
+                                            "CMakeSystem.cmake"))
+        ]
+        if len(version_dirs) != 1:
+            return None
+        version_dir = version_dirs[0]
+
+        platform_files = {}
+        for filename in os.listdir(os.path.join(files_dir, version_dir)):
+            if os.path.splitext(filename)[1] != ".cmake":
+                continue
+            with open(os.path.join(files_dir, version_dir, filename)) as fp:
+                platform_files[filename] = fp.read()
+
+        cache_entries = []
+        with open(cache_path) as fp:
+            for line in fp:
+                match = RE_TOOLCHAIN_CACHE_ENTRY.match(line.rstrip("\r\n"))
+                if match is not None:
+                    cache_entries.append(match.groups())
+
+        return {
+            "generator": generator,
+            "version_dir": version_dir,
+            "platform_files": platform_files,
+            "cache_entries": cache_entries
+        }
+
+    @staticmethod
+    def get_generator_cache_ttl():
+        """Return the number of seconds a cached generator is considered
+        valid. This is read from the ``SKBUILD_GENERATOR_CACHE_TTL``
+        environment variable. Zero means caching is disabled.
+        """
+        try:
+            return max(0, int(os.environ.get("SKBUILD_GENERATOR_CACHE_TTL",
+                                             0)))
+        except ValueError:
+            return 0
+
+    @staticmethod
+    def get_generator_cache_path():
+        """Return the path of the file caching the generators found by
+        :meth:`get_best_generator`."""
+        return os.path.join(get_cache_dir(), GENERATOR_CACHE_FILENAME)
+
+    @staticmethod
+    def clear_generator_cache():
+        """Remove all cached generators."""
+        cache_path = CMakePlatform.get_generator_cache_path()
+        if os.path.exists(cache_path):
+            os.remove(cache_path)
+
+    @staticmethod
+    def _generator_cache_key(cmake_exe_path, candidate_generators, languages):
+        cmake_exe_path = find_executable(cmake_exe_path) or cmake_exe_path
+        try:
+            cmake_mtime = os.path.getmtime(cmake_exe_path)
+        except OSError:
+            cmake_mtime = None
+        key = [
+            os.path.abspath(cmake_exe_path),
+            cmake_mtime,
+            [os.environ.get(var) for var in GENERATOR_CACHE_ENV_VARS],
+            list(candidate_generators),
+            list(languages)
+        ]
+        return hashlib.sha1(
+            json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _get_cached_generator(cache_key, cache_ttl):
+        cache = load_json(CMakePlatform.get_generator_cache_path(), {})
+        entry = cache.get(cache_key)
+        if entry is None or time.time() - entry["timestamp"] > cache_ttl:
+            return None
+        return entry
+
+    @staticmethod
+    def _cache_generator(cache_key, generator, toolchain, cache_ttl):
+        cache_path = CMakePlatform.get_generator_cache_path()
+        now = time.time()
+        # Drop expired entries so that the file does not grow forever
+        cache = {
+            key: entry
+            for key, entry in load_json(cache_path, {}).items()
+            if now - entry["timestamp"] <= cache_ttl
+        }
+        cache[cache_key] = {"generator": generator, "toolchain": toolchain,
+                            "timestamp": now}
+        save_json(cache_path, cache)
+
+    @staticmethod
+    def compile_test_cmakelist(cmake_exe_path, candidate_generators,
+                               parallel=False, folder=test_folder):
+        """Return the first generator of ``candidate_generators`` able to
+        configure the test project written in ``folder``, or None if none of
+        them work.
+
+        If ``parallel`` is True, the generators are tried concurrently
+        (see :meth:`_compile_test_cmakelist_parallel`). In both cases, the
+        build tree associated with the working generator is left in the
+        ``build`` directory of ``folder``.
+        """
+        with push_dir(folder):
+            if parallel and len(candidate_generators) > 1:
+                return CMakePlatform._compile_test_cmakelist_parallel(
+                    cmake_exe_path, candidate_generators)
+            return CMakePlatform._compile_test_cmakelist_serial(
+                cmake_exe_path, candidate_generators)
+
+    @staticmethod
+    def _compile_test_cmakelist_serial(cmake_exe_path, candidate_generators):
+        """Try ``candidate_generators`` one after the other in the
+        ``build`` directory."""
 
         # working generator is the first generator we find that works.
         working_generator = None
@@ -107,3 +347,86 @@ class CMakePlatform(object):
                 break
 
         return working_generator
+
+    @staticmethod
+    def _compile_test_cmakelist_parallel(cmake_exe_path, candidate_generators):
+        """Start one CMake process per candidate generator, each one in its
+        own ``build-<index>`` directory.
+
+        Processes are then waited for in order of priority: as soon as one
+        succeeds, the remaining lower-priority ones are killed. This means
+        failing high-priority generators do not delay the selection of a
+        working one.
+
+        Since processes run concurrently, their output is written into a
+        ``probe.log`` file and only the log associated with the selected
+        generator (or all of them if none work) is displayed.
+
+        Each CMake process is started in its own process group: killing it
+        also kills the build tools it started, so that nothing writes into
+        the probe directories once they are removed.
+        """
+        if os.path.isdir('build'):
+            shutil.rmtree('build')
+
+        probes = []
+        working_index = None
+        try:
+            for index, generator in enumerate(candidate_generators):
+                probe_dir = 'build-{}'.format(index)
+                if os.path.isdir(probe_dir):
+                    shutil.rmtree(probe_dir)
+                mkdir_p(probe_dir)
+                with open(os.path.join(probe_dir, 'probe.log'), 'w') as log:
+                    process = CMakePlatform._start_probe(
+                        [cmake_exe_path, '..', '-G', generator],
+                        cwd=probe_dir, stdout=log, stderr=subprocess.STDOUT)
+                probes.append((generator, probe_dir, process))
+
+            for index, (_, _, process) in enumerate(probes):
+                if process.wait() == 0:
+                    working_index = index
+                    break
+        finally:
+            # Processes not waited for yet are still running
+            for _, _, process in probes:
+                if process.returncode is None:
+                    CMakePlatform._kill_probe(process)
+                    process.wait()
+
+        for index, (generator, probe_dir, _) in enumerate(probes):
+            if working_index is None or index == working_index:
+                with open(os.path.join(probe_dir, 'probe.log')) as log:
+                    sys.stdout.write(log.read())
+            if index != working_index:
+                shutil.rmtree(probe_dir)
+
+        if working_index is None:
+            return None
+        os.rename(probes[working_index][1], 'build')
+        return candidate_generators[working_index]
+
+    @staticmethod
+    def _start_probe(args, **kwargs):
+        """Start ``args`` in a new process group, see :meth:`_kill_probe`."""
+        if sys.platform == "win32":
+            kwargs["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP
+        else:
+            kwargs["preexec_fn"] = os.setsid
+        return subprocess.Popen(args, **kwargs)
+
+    @staticmethod
+    def _kill_probe(process):
+        """Kill ``process`` started by :meth:`_start_probe` and all the
+        processes of its group."""
+        if sys.platform == "win32":
+            with open(os.devnull, "w") as devnull:
+                subprocess.call(
+                    ["taskkill", "/F", "/T", "/PID", str(process.pid)],
+                    stdout=devnull, stderr=devnull)
+            return
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except OSError:
+            # The whole group already exited
+            pass
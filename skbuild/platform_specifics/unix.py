@@ -5,4 +5,5 @@ class UnixPlatform(abstract.CMakePlatform):
 
     def __init__(self):
         super(UnixPlatform, self).__init__()
-        self.default_generators = ["Unix Makefiles", ]
+        self.default_generators = \
+            self.get_ninja_generators() + ["Unix Makefiles", ]
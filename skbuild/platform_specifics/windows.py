@@ -1,6 +1,8 @@
 import sys
 import platform
 
+from distutils.spawn import find_executable
+
 from . import abstract
 
 
@@ -42,3 +44,9 @@ class WindowsPlatform(abstract.CMakePlatform):
         # string IDs seem to be just the vs_base.
 
         self.default_generators.insert(0, vs_base)
+
+        # Ninja does not select a compiler by itself, only prefer it if the
+        # environment of a Visual Studio command prompt is set up. Otherwise,
+        # it could pick a MinGW compiler incompatible with Python.
+        if find_executable("cl"):
+            self.default_generators[0:0] = self.get_ninja_generators()
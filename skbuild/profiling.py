@@ -0,0 +1,316 @@
+"""This module provides the timing instrumentation of the build phases and
+of the compilation of each object and target.
+
+Profiling is enabled by setting the ``SKBUILD_PROFILE`` environment variable
+or by passing ``--profile`` to ``setup.py``. Each phase then records its wall
+time, the CPU time of the current process and the resources used by the
+sub-processes (e.g. CMake, the compilers) it waited for. At exit, the records
+are written into a JSON report and summarized.
+"""
+
+import atexit
+import json
+import os
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None
+
+from .constants import get_skbuild_build_base
+from .utils import ContextDecorator, env_flag, save_json
+
+PROFILE_REPORT_FILENAME = "build-profile.json"
+
+_PROFILE = {"enabled": None, "phases": [], "stack": []}
+
+try:
+    _process_time = time.process_time
+except AttributeError:  # pragma: no cover
+    _process_time = time.clock
+
+
+def _children_usage():
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime, usage.ru_stime, usage.ru_maxrss
+
+
+def profiling_enabled():
+    """Return True if build phases are profiled."""
+    if _PROFILE["enabled"] is None:
+        enable_profiling(env_flag("SKBUILD_PROFILE"))
+    return _PROFILE["enabled"]
+
+
+def enable_profiling(enabled=True):
+    """Enable (or disable) profiling of the build phases.
+
+    The report is written, and its summary printed, when the interpreter
+    exits (see :func:`write_report`).
+    """
+    if enabled and not _PROFILE["enabled"]:
+        atexit.register(_report_at_exit)
+    _PROFILE["enabled"] = enabled
+
+
+def get_phases():
+    """Return the list of phases recorded so far.
+
+    Each phase is a dictionary with the keys ``name``, ``depth`` (the number
+    of enclosing phases), ``start`` (time stamp), ``wall`` and ``cpu`` (in
+    seconds), ``failed`` and ``children`` (user and system time of the
+    sub-processes, in seconds, and their maximum resident set size, or None
+    on platforms lacking the :mod:`resource` module).
+    """
+    return _PROFILE["phases"]
+
+
+class profile_phase(ContextDecorator):
+    """Context manager and decorator recording the duration of the build
+    phase ``name``. It does nothing if profiling is not enabled."""
+
+    def __init__(self, name):
+        super(profile_phase, self).__init__(name=name)
+
+    def __enter__(self):
+        if profiling_enabled():
+            _PROFILE["stack"].append(
+                (time.time(), _process_time(), _children_usage()))
+        return self
+
+    def __exit__(self, typ, val, traceback):
+        if not profiling_enabled() or not _PROFILE["stack"]:
+            return
+        wall_start, cpu_start, children_start = _PROFILE["stack"].pop()
+        wall_end, cpu_end = time.time(), _process_time()
+        children_end = _children_usage()
+        children = None
+        if children_start is not None:
+            children = {
+                "user": children_end[0] - children_start[0],
+                "system": children_end[1] - children_start[1],
+                "maxrss": children_end[2]
+            }
+        _PROFILE["phases"].append({
+            "name": self.name,
+            "depth": len(_PROFILE["stack"]),
+            "start": wall_start,
+            "wall": wall_end - wall_start,
+            "cpu": cpu_end - cpu_start,
+            "children": children,
+            "failed": typ is not None
+        })
+
+
+def _sorted_phases():
+    """Return the recorded phases sorted by start time, with their start
+    time made relative to the first phase."""
+    phases = sorted(get_phases(), key=lambda phase: phase["start"])
+    if not phases:
+        return []
+    origin = phases[0]["start"]
+    report = []
+    for phase in phases:
+        phase = dict(phase)
+        phase["start"] -= origin
+        report.append(phase)
+    return report
+
+
+def write_report(path=None):
+    """Write the recorded phases into the JSON file ``path`` (by default
+    ``build-profile.json`` in the build directory of the current
+    configuration) and return its path."""
+    if path is None:
+        path = os.path.join(get_skbuild_build_base(), PROFILE_REPORT_FILENAME)
+    save_json(path, {
+        "python": sys.version,
+        "argv": sys.argv,
+        "phases": _sorted_phases()
+    })
+    return path
+
+
+def format_summary(phases):
+    """Return a summary table of ``phases`` (see :func:`get_phases`)."""
+    lines = ["{:<32} {:>9} {:>9} {:>9}".format(
+        "phase", "wall (s)", "cpu (s)", "sub (s)")]
+    for phase in phases:
+        children = phase["children"]
+        lines.append("{:<32} {:>9.2f} {:>9.2f} {:>9}".format(
+            ("  " * phase["depth"] + phase["name"])[:32],
+            phase["wall"], phase["cpu"],
+            "{:.2f}".format(children["user"] + children["system"])
+            if children is not None else "-"))
+    return "\n".join(lines)
+
+
+def _report_at_exit():
+    if not _PROFILE["enabled"] or not get_phases():
+        return
+    path = write_report()
+    print("")
+    print("scikit-build build profile (see {}):".format(path))
+    print(format_summary(_sorted_phases()))
+
+
+COMPILE_TIMES_FILENAME = "compile-times.json"
+COMPILE_TRACE_FILENAME = "compile-trace.json"
+
+
+def compile_times_enabled():
+    """Return True if the ``SKBUILD_COMPILE_TIMES`` environment variable
+    requests to record the compile time of each object and target."""
+    return env_flag("SKBUILD_COMPILE_TIMES")
+
+
+def get_compile_times_top():
+    """Return the number of objects and targets summarized after the build,
+    10 by default or the value of ``SKBUILD_COMPILE_TIMES_TOP``."""
+    try:
+        return max(1, int(os.environ.get("SKBUILD_COMPILE_TIMES_TOP", 10)))
+    except ValueError:
+        return 10
+
+
+def parse_ninja_log(path, offset=0):
+    """Return the ``(output, start, end)`` records (in seconds) found in the
+    ``.ninja_log`` file ``path`` after ``offset`` bytes.
+
+    If the file is smaller than ``offset`` (ninja recompacted it), all its
+    records are returned.
+    """
+    records = []
+    try:
+        with open(path, "r") as ninja_log:
+            ninja_log.seek(0, os.SEEK_END)
+            if ninja_log.tell() < offset:
+                offset = 0
+            ninja_log.seek(offset)
+            for line in ninja_log:
+                fields = line.rstrip("\n").split("\t")
+                if line.startswith("#") or len(fields) < 4:
+                    continue
+                try:
+                    start, end = int(fields[0]), int(fields[1])
+                except ValueError:
+                    continue
+                records.append((fields[3], start / 1000.0, end / 1000.0))
+    except (IOError, OSError):
+        pass
+    return records
+
+
+def parse_compile_timer_log(path, build_dir):
+    """Return the ``(output, start, end)`` records written by
+    :mod:`.compile_timer` in ``path``, with outputs relative to
+    ``build_dir``."""
+    records = []
+    try:
+        with open(path, "r") as log:
+            for line in log:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                output = record.get("output") or "<unknown>"
+                if os.path.isabs(output):
+                    output = os.path.relpath(output, build_dir)
+                records.append((output.replace("\\", "/"),
+                                record["start"], record["end"]))
+    except (IOError, OSError):
+        pass
+    return records
+
+
+def _target_name(output):
+    """Return the CMake target associated with the object file ``output``
+    (e.g. ``_hello`` for ``CMakeFiles/_hello.dir/_hello.cxx.o``), or None."""
+    for part in output.split("/"):
+        if part.endswith(".dir"):
+            return part[:-len(".dir")]
+    return None
+
+
+def compile_times_report(records):
+    """Return a dictionary with the ``objects`` and ``targets`` of the
+    ``(output, start, end)`` ``records``, each sorted by decreasing duration.
+
+    Outputs not associated with a target (e.g. linked libraries or custom
+    commands) are reported as objects only.
+    """
+    objects = sorted(
+        ({"output": output, "target": _target_name(output),
+          "duration": end - start}
+         for output, start, end in records),
+        key=lambda entry: (-entry["duration"], entry["output"]))
+    targets = {}
+    for entry in objects:
+        if entry["target"] is None:
+            continue
+        target = targets.setdefault(
+            entry["target"],
+            {"target": entry["target"], "duration": 0.0, "objects": 0})
+        target["duration"] += entry["duration"]
+        target["objects"] += 1
+    return {
+        "objects": objects,
+        "targets": sorted(
+            targets.values(),
+            key=lambda entry: (-entry["duration"], entry["target"]))
+    }
+
+
+def chrome_trace(records):
+    """Return the ``(output, start, end)`` ``records`` as a Chrome trace
+    (viewable using ``chrome://tracing`` or https://ui.perfetto.dev).
+
+    Overlapping records are placed on different lanes (threads)."""
+    events = []
+    lanes = []
+    origin = min([start for _, start, _ in records] or [0])
+    for output, start, end in sorted(records, key=lambda r: (r[1], r[2])):
+        for lane, lane_end in enumerate(lanes):
+            if lane_end <= start:
+                break
+        else:
+            lane = len(lanes)
+            lanes.append(end)
+        lanes[lane] = end
+        events.append({
+            "name": output,
+            "cat": _target_name(output) or "other",
+            "ph": "X",
+            "pid": 0,
+            "tid": lane,
+            "ts": int((start - origin) * 1e6),
+            "dur": int((end - start) * 1e6)
+        })
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def report_compile_times(records, directory, top=None):
+    """Write the compile times report and the Chrome trace of ``records``
+    into ``directory`` and print the ``top`` slowest targets and objects.
+    """
+    if top is None:
+        top = get_compile_times_top()
+    report = compile_times_report(records)
+    report_path = os.path.join(directory, COMPILE_TIMES_FILENAME)
+    trace_path = os.path.join(directory, COMPILE_TRACE_FILENAME)
+    save_json(report_path, report)
+    save_json(trace_path, chrome_trace(records))
+
+    print("")
+    print("Slowest targets (see {} and {}):".format(report_path, trace_path))
+    for entry in report["targets"][:top]:
+        print("  {:>8.2f}s  {} ({} objects)".format(
+            entry["duration"], entry["target"], entry["objects"]))
+    print("Slowest objects:")
+    for entry in report["objects"][:top]:
+        print("  {:>8.2f}s  {}".format(entry["duration"], entry["output"]))
+    return report_path, trace_path
@@ -2,6 +2,8 @@
 from distutils and setuptools.
 """
 
+import hashlib
+import json
 import os
 import os.path
 import sys
@@ -11,13 +13,18 @@ from contextlib import contextmanager
 from distutils.errors import (DistutilsArgError,
                               DistutilsError,
                               DistutilsGetoptError)
-from shutil import copyfile
 
 from . import cmaker
-from .command import build, install, clean, bdist, bdist_wheel, egg_info, sdist
-from .constants import CMAKE_INSTALL_DIR
+from .artifact_cache import (artifact_key, get_artifact_cache,
+                             restore_install_tree, store_install_tree)
+from .constants import (get_cmake_build_dir, get_cmake_install_dir,
+                        set_build_configuration, get_build_state_file,
+                        SKBUILD_DIR)
 from .exceptions import SKBuildError
-from .utils import (mkdir_p, PythonModuleFinder, to_platform_path, to_unix_path)
+from .profiling import enable_profiling, profile_phase
+from .utils import (env_flag, link_or_copy, LINK_MODES, load_json, mkdir_p,
+                    PythonModuleFinder, save_json, to_platform_path,
+                    to_unix_path)
 
 # XXX If 'six' becomes a dependency, use 'six.StringIO' instead.
 try:
@@ -42,6 +49,15 @@ def create_skbuild_argparser():
     parser.add_argument(
         '-j', metavar='N', type=int, dest='jobs',
         help='allow N build jobs at once')
+    parser.add_argument(
+        '--build-target', action='append', metavar='',
+        help='build only this CMake target (may be repeated)')
+    parser.add_argument(
+        '--install-component', action='append', metavar='',
+        help='install only this CMake install component (may be repeated)')
+    parser.add_argument(
+        '--profile', action='store_true',
+        help='report the time spent in each build phase')
     return parser
 
 
@@ -54,6 +70,12 @@ def parse_skbuild_args(args, cmake_args, build_tool_args):
     parser = create_skbuild_argparser()
     ns, remaining_args = parser.parse_known_args(args)
 
+    # Use dedicated build directories for this configuration
+    set_build_configuration(ns.build_type, ns.generator)
+
+    if ns.profile:
+        enable_profiling()
+
     # Construct CMake argument list
     cmake_args.append('-DCMAKE_BUILD_TYPE:STRING=' + ns.build_type)
     if ns.generator is not None:
@@ -63,6 +85,10 @@ def parse_skbuild_args(args, cmake_args, build_tool_args):
     build_tool_args.extend(['--config', ns.build_type])
     if ns.jobs is not None:
         build_tool_args.extend(['-j', str(ns.jobs)])
+    for target in ns.build_target or []:
+        build_tool_args.extend(['--target', target])
+    for component in ns.install_component or []:
+        build_tool_args.extend(['--component', component])
 
     return remaining_args
 
@@ -104,6 +130,50 @@ def _capture_output():
         out[1] = out[1].getvalue()
 
 
+METADATA_COMMANDS = {
+    # command: options expecting a value
+    'dist_info': ('--egg-base', '-e', '--output-dir', '-o'),
+    'egg_info': ('--egg-base', '-e', '--tag-build', '-b'),
+    'sdist': ('--dist-dir', '-d', '--formats', '--template', '-t',
+              '--manifest', '-m', '--owner', '-u', '--group', '-g'),
+}
+"""Commands only generating metadata or source distributions, associated
+with their options expecting a value."""
+
+
+def _is_metadata_only(args):
+    """Return True if the setup.py arguments ``args`` only request
+    metadata: they are either metadata display options (e.g. ``--version``
+    or ``--name``), or metadata commands (see :data:`METADATA_COMMANDS`)
+    with their options.
+
+    Any unknown argument makes this function return False, the command line
+    is then parsed by :func:`_parse_setuptools_arguments`.
+    """
+    if not args:
+        return False
+
+    display_options = set(
+        "--{}".format(option[0])
+        for option in upstream_Distribution.display_options
+        if option[0] not in ('help-commands',))
+    if all(arg in display_options for arg in args):
+        return True
+
+    command = None
+    expects_value = False
+    for arg in args:
+        if expects_value:
+            expects_value = False
+        elif arg in METADATA_COMMANDS:
+            command = arg
+        elif command is None or not arg.startswith("-"):
+            return False
+        elif arg in METADATA_COMMANDS[command]:
+            expects_value = True
+    return not expects_value
+
+
 def _parse_setuptools_arguments(setup_attrs):
     """This function instantiates a Distribution object and
     parses the command line arguments.
@@ -164,6 +234,13 @@ def _check_skbuild_parameters(skbuild_kw):
             os.getcwd(), cmake_source_dir
         ))
 
+    for param in ('cmake_targets', 'cmake_install_components'):
+        value = skbuild_kw[param]
+        if value is not None and not isinstance(value, (list, tuple)):
+            raise SKBuildError((
+                "\n  setup parameter '{}' is set to {!r}. "
+                "A list is expected.\n").format(param, value))
+
 
 def strip_package(package_parts, module_file):
     """Given ``package_parts`` (e.g. ``['foo', 'bar']``) and a
@@ -218,6 +295,11 @@ def setup(*args, **kw):  # noqa: C901
     """
     sys.argv, cmake_args, make_args = parse_args()
 
+    # Command modules import setuptools, distutils and wheel commands, they
+    # are only loaded when needed.
+    from .command import (build, install, clean, bdist, bdist_wheel,
+                          egg_info, sdist)
+
     # work around https://bugs.python.org/issue1011113
     # (patches provided, but no updates since 2014)
     cmdclass = kw.get('cmdclass', {})
@@ -238,7 +320,10 @@ def setup(*args, **kw):  # noqa: C901
     parameters = {
         'cmake_args': [],
         'cmake_install_dir': '',
-        'cmake_source_dir': ''
+        'cmake_source_dir': '',
+        'cmake_compiler_cache': None,
+        'cmake_targets': None,
+        'cmake_install_components': None
     }
     skbuild_kw = {param: kw.pop(param, parameters[param])
                   for param in parameters}
@@ -253,6 +338,12 @@ def setup(*args, **kw):  # noqa: C901
         print('')
         sys.exit(e)
 
+    # Commands like "egg_info" (used by pip to collect the metadata of
+    # packages) or "--version" never run CMake: skip parsing the command
+    # line using a throwaway Distribution.
+    if _is_metadata_only(sys.argv[1:]):
+        return upstream_setup(*args, **kw)
+
     # Convert source dir to a path relative to the root
     # of the project
     cmake_source_dir = skbuild_kw['cmake_source_dir']
@@ -278,10 +369,14 @@ def setup(*args, **kw):  # noqa: C901
     if not has_cmakelists:
         print('skipping skbuild (no CMakeLists.txt found)')
 
+    # "egg_info" followed by a build command (e.g. "egg_info --egg-base
+    # <dir> bdist_wheel", see skbuild.multibuild) still runs CMake.
     skip_cmake = (display_only
                   or has_invalid_arguments
                   or 'clean' in commands
-                  or 'egg_info' in commands
+                  or ('egg_info' in commands
+                      and all(command in METADATA_COMMANDS
+                              for command in commands))
                   or 'sdist' in commands
                   or not has_cmakelists)
     if skip_cmake:
@@ -305,7 +400,10 @@ def setup(*args, **kw):  # noqa: C901
 
     packages = kw.get('packages', [])
     package_dir = kw.get('package_dir', {})
-    package_data = kw.get('package_data', {}).copy()
+    # The lists are extended with the files installed by CMake: they must not
+    # be shared with ``kw``, whose content identifies the build state.
+    package_data = {package: list(file_list) for package, file_list
+                    in kw.get('package_data', {}).items()}
 
     py_modules = kw.get('py_modules', [])
     new_py_modules = {py_module: False for py_module in py_modules}
@@ -323,19 +421,6 @@ def setup(*args, **kw):  # noqa: C901
     # one is considered, let's prepend the one provided in the setup call.
     cmake_args = skbuild_kw['cmake_args'] + cmake_args
 
-    try:
-        cmkr = cmaker.CMaker()
-        cmkr.configure(cmake_args,
-                       cmake_source_dir=cmake_source_dir,
-                       cmake_install_dir=skbuild_kw['cmake_install_dir'])
-        cmkr.make(make_args)
-    except SKBuildError as e:
-        import traceback
-        print("Traceback (most recent call last):")
-        traceback.print_tb(sys.exc_info()[2])
-        print('')
-        sys.exit(e)
-
     # If needed, set reasonable defaults for package_dir
     for package in packages:
         if package not in package_dir:
@@ -343,31 +428,79 @@ def setup(*args, **kw):  # noqa: C901
 
     package_prefixes = _collect_package_prefixes(package_dir, packages)
 
-    _classify_files(cmkr.install(), package_data, package_prefixes,
-                    py_modules, new_py_modules,
-                    scripts, new_scripts,
-                    data_files,
-                    cmake_source_dir, skbuild_kw['cmake_install_dir'])
+    incremental_build = env_flag("SKBUILD_INCREMENTAL_BUILD")
+    build_state = None
+    if incremental_build:
+        build_state_inputs = _build_state_inputs(
+            kw, skbuild_kw, cmake_args, make_args)
+        build_state = _load_build_state(build_state_inputs)
+
+    if build_state is not None:
+        print("skipping CMake build (no changes since the last build, "
+              "see {})".format(get_build_state_file()))
+        (package_data, new_py_modules, new_scripts,
+         data_files) = build_state
+    else:
+        # Remove the state of the last build: it must not be used if this
+        # one fails.
+        if os.path.exists(get_build_state_file()):
+            os.remove(get_build_state_file())
 
-    _consolidate(cmake_source_dir,
-                 packages, package_dir, py_modules, package_data)
+        try:
+            cmkr = cmaker.CMaker()
+            artifact_cache = get_artifact_cache()
+            key = None
+            if artifact_cache is not None:
+                key = _artifact_key(cmkr, cmake_args, make_args,
+                                    cmake_source_dir, skbuild_kw)
+            if key is None or not _restore_artifact(artifact_cache, key):
+                cmkr.configure(
+                    cmake_args,
+                    cmake_source_dir=cmake_source_dir,
+                    cmake_install_dir=skbuild_kw['cmake_install_dir'],
+                    compiler_cache=skbuild_kw['cmake_compiler_cache'])
+                cmkr.make(make_args,
+                          targets=skbuild_kw['cmake_targets'],
+                          install_components=skbuild_kw[
+                              'cmake_install_components'])
+                if key is not None:
+                    _store_artifact(artifact_cache, key, cmkr.install())
+        except SKBuildError as e:
+            import traceback
+            print("Traceback (most recent call last):")
+            traceback.print_tb(sys.exc_info()[2])
+            print('')
+            sys.exit(e)
+
+        _classify_files(cmkr.install(), package_data, package_prefixes,
+                        py_modules, new_py_modules,
+                        scripts, new_scripts,
+                        data_files,
+                        cmake_source_dir, skbuild_kw['cmake_install_dir'])
+
+        _consolidate(cmake_source_dir,
+                     packages, package_dir, py_modules, package_data)
+
+        if incremental_build:
+            _save_build_state(build_state_inputs, package_data,
+                              new_py_modules, new_scripts, data_files)
 
     kw['package_data'] = package_data
     kw['package_dir'] = {
         package: (
-            os.path.join(CMAKE_INSTALL_DIR, prefix)
-            if os.path.exists(os.path.join(CMAKE_INSTALL_DIR, prefix))
+            os.path.join(get_cmake_install_dir(), prefix)
+            if os.path.exists(os.path.join(get_cmake_install_dir(), prefix))
             else prefix)
         for prefix, package in package_prefixes
     }
 
     kw['py_modules'] = [
-        os.path.join(CMAKE_INSTALL_DIR, py_module) if mask else py_module
+        os.path.join(get_cmake_install_dir(), py_module) if mask else py_module
         for py_module, mask in new_py_modules.items()
     ]
 
     kw['scripts'] = [
-        os.path.join(CMAKE_INSTALL_DIR, script) if mask else script
+        os.path.join(get_cmake_install_dir(), script) if mask else script
         for script, mask in new_scripts.items()
     ]
 
@@ -384,7 +517,182 @@ def setup(*args, **kw):  # noqa: C901
 
     print("")
 
-    return upstream_setup(*args, **kw)
+    with profile_phase("setuptools"):
+        return upstream_setup(*args, **kw)
+
+
+def _source_tree_files(directory):
+    """Yield the path of every file found in ``directory``.
+
+    Hidden directories, scikit-build directories, CMake build trees and
+    directories generated by setuptools (``dist``, ``*.egg-info``,
+    ``__pycache__``) are not searched, and compiled python files are
+    ignored.
+    """
+    for root, dir_list, file_list in os.walk(directory):
+        dir_list[:] = [
+            name for name in dir_list
+            if not name.startswith(".")
+            and name not in (SKBUILD_DIR, "dist", "__pycache__")
+            and not name.endswith(".egg-info")
+            and not os.path.exists(os.path.join(root, name, "CMakeCache.txt"))
+        ]
+        for filename in file_list:
+            if os.path.splitext(filename)[1] in (".pyc", ".pyo"):
+                continue
+            yield os.path.join(root, filename)
+
+
+def _source_tree_fingerprint(directory):
+    """Return a sorted list of ``(path, size, mtime)`` for every file found
+    in ``directory`` (see :func:`_source_tree_files`).
+    """
+    fingerprint = []
+    for path in _source_tree_files(directory):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        fingerprint.append((os.path.relpath(path, directory),
+                            stat.st_size, stat.st_mtime))
+    return sorted(fingerprint)
+
+
+def _source_tree_digest(directory):
+    """Return a digest of the relative path, the content and the executable
+    bit of every file found in ``directory`` (see
+    :func:`_source_tree_files`).
+
+    Unlike :func:`_source_tree_fingerprint`, it does not depend on the
+    modification times: it is the same for all the checkouts of a commit.
+    """
+    digest = hashlib.sha1()
+    for path in sorted(_source_tree_files(directory)):
+        try:
+            with open(path, "rb") as fp:
+                content_digest = hashlib.sha1(fp.read()).hexdigest()
+            executable = os.access(path, os.X_OK)
+        except (IOError, OSError):
+            continue
+        relative_path = os.path.relpath(path, directory).replace(os.sep, "/")
+        digest.update("{}\0{}\0{}\n".format(
+            relative_path, content_digest, executable).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _build_state_inputs(kw, skbuild_kw, cmake_args, make_args):
+    """Return a digest of the inputs of the CMake build: the setup keywords
+    describing the distribution content, the scikit-build keywords,
+    the CMake and build tool arguments, the relevant environment variables,
+    the python interpreter and the files of the project.
+    """
+    from . import __version__
+    inputs = {
+        "setup": {
+            key: kw.get(key) for key in (
+                "packages", "package_dir", "package_data", "py_modules",
+                "scripts", "data_files")
+        },
+        "skbuild": skbuild_kw,
+        "cmake_args": cmake_args,
+        "make_args": make_args,
+        "environment": {
+            name: value for name, value in os.environ.items()
+            if name.startswith(("SKBUILD_", "CMAKE_"))
+            or name in ("CC", "CXX", "FC", "CFLAGS", "CXXFLAGS", "LDFLAGS",
+                        "PATH")
+        },
+        "python": [sys.executable, sys.version],
+        "scikit-build": __version__,
+        "sources": _source_tree_fingerprint(os.curdir)
+    }
+    return hashlib.sha1(json.dumps(
+        inputs, sort_keys=True, default=repr).encode("utf-8")).hexdigest()
+
+
+def _load_build_state(inputs):
+    """Return the ``(package_data, new_py_modules, new_scripts, data_files)``
+    recorded by the last build if it was done with the same ``inputs`` and
+    its install tree still exists, None otherwise.
+
+    See :func:`_save_build_state`.
+    """
+    state = load_json(get_build_state_file())
+    if (not isinstance(state, dict)
+            or state.get("inputs") != inputs
+            or not os.path.isdir(get_cmake_install_dir())):
+        return None
+    outputs = state["outputs"]
+    return (outputs["package_data"],
+            outputs["py_modules"],
+            outputs["scripts"],
+            {parent_dir: set(file_list)
+             for parent_dir, file_list in outputs["data_files"].items()})
+
+
+def _save_build_state(inputs, package_data, new_py_modules, new_scripts,
+                      data_files):
+    """Record the ``inputs`` of the build and the classified install
+    tree files in :func:`.constants.get_build_state_file`."""
+    save_json(get_build_state_file(), {
+        "inputs": inputs,
+        "outputs": {
+            "package_data": package_data,
+            "py_modules": new_py_modules,
+            "scripts": new_scripts,
+            "data_files": {
+                parent_dir: sorted(file_set)
+                for parent_dir, file_set in data_files.items()
+            }
+        }
+    })
+
+
+def _artifact_key(cmkr, cmake_args, make_args, cmake_source_dir,
+                  skbuild_kw):
+    """Return the key of the install tree in the artifact cache: it is
+    computed from the content of the project files and the configure
+    command line (see :func:`.artifact_cache.artifact_key`)."""
+    _, configure_command = cmkr.get_configure_command(
+        cmake_args,
+        cmake_source_dir=cmake_source_dir,
+        cmake_install_dir=skbuild_kw['cmake_install_dir'],
+        compiler_cache=skbuild_kw['cmake_compiler_cache'])
+    build_args = list(make_args)
+    for target in skbuild_kw['cmake_targets'] or []:
+        build_args.append("target=" + target)
+    for component in skbuild_kw['cmake_install_components'] or []:
+        build_args.append("component=" + component)
+    return artifact_key(
+        _source_tree_digest(os.curdir), configure_command, build_args)
+
+
+@profile_phase("artifact_cache")
+def _restore_artifact(artifact_cache, key):
+    """Restore the install tree and the install manifest associated with
+    ``key``. Return False if it is not in ``artifact_cache``."""
+    manifest_path = os.path.join(get_cmake_build_dir(), "install_manifest.txt")
+    # Manifests of previous builds (e.g. component installs) are obsolete
+    for path in cmaker.CMaker.get_install_manifests():
+        os.remove(path)
+    if not restore_install_tree(
+            artifact_cache, key, get_cmake_install_dir(), manifest_path):
+        print("CMake install tree not found in the artifact cache "
+              "({})".format(artifact_cache))
+        return False
+    print("skipping CMake configure and build steps (install tree {} "
+          "restored from the artifact cache {})".format(key, artifact_cache))
+    return True
+
+
+@profile_phase("artifact_cache")
+def _store_artifact(artifact_cache, key, installed_paths):
+    """Store the install tree associated with ``key`` in
+    ``artifact_cache``."""
+    if store_install_tree(
+            artifact_cache, key, get_cmake_install_dir(), installed_paths):
+        print("CMake install tree {} stored in the artifact cache "
+              "({})".format(key, artifact_cache))
 
 
 def _collect_package_prefixes(package_dir, packages):
@@ -429,6 +737,46 @@ def _collect_package_prefixes(package_dir, packages):
     ))
 
 
+def _build_package_prefix_trie(package_prefixes):
+    """Build a trie of ``package_prefixes`` keyed by path components.
+
+    Each node is a dictionary mapping a path component to its child node.
+    The ``(prefix, package)`` tuple of a package is stored in the node of its
+    last component under the ``None`` key. If several packages share a
+    prefix, the first one found in ``package_prefixes`` is kept, like with
+    a linear scan of the list.
+    """
+    trie = {}
+    for prefix, package in package_prefixes:
+        node = trie
+        for part in _split_path(prefix):
+            node = node.setdefault(part, {})
+        node.setdefault(None, (prefix, package))
+    return trie
+
+
+def _match_package_prefix(trie, path):
+    """Return the ``(prefix, package)`` tuple of the package with the longest
+    prefix containing ``path`` or ``None`` if there is no such package.
+
+    See :func:`_build_package_prefix_trie`.
+    """
+    match = trie.get(None)
+    node = trie
+    # Only the parent directories of path can be package prefixes
+    for part in _split_path(path)[:-1]:
+        node = node.get(part)
+        if node is None:
+            break
+        match = node.get(None, match)
+    return match
+
+
+def _split_path(path):
+    return [part for part in to_unix_path(path).split("/") if part]
+
+
+@profile_phase("classify_files")
 def _classify_files(install_paths, package_data, package_prefixes,
                     py_modules, new_py_modules,
                     scripts, new_scripts,
@@ -439,15 +787,20 @@ def _classify_files(install_paths, package_data, package_prefixes,
 
     cmake_source_dir = to_unix_path(cmake_source_dir)
 
-    install_root = os.path.join(os.getcwd(), CMAKE_INSTALL_DIR)
-    for path in install_paths:
-        found_package = False
-        found_module = False
-        found_script = False
+    # Index packages, modules and scripts once so that classifying a path
+    # does not depend on how many of them the project declares.
+    package_trie = _build_package_prefix_trie(package_prefixes)
+    module_files = {}
+    for module in py_modules:
+        module_files.setdefault(".".join((module, "py")), module)
+    script_set = set(scripts)
 
+    install_dir = get_cmake_install_dir()
+    install_root = os.path.join(os.getcwd(), install_dir)
+    for path in install_paths:
         # if this installed file is not within the project root, complain and
         # exit
-        if not to_platform_path(path).startswith(CMAKE_INSTALL_DIR):
+        if not to_platform_path(path).startswith(install_dir):
             raise SKBuildError((
                 "\n  CMake-installed files must be within the project root.\n"
                 "    Project Root  : {}\n"
@@ -455,7 +808,7 @@ def _classify_files(install_paths, package_data, package_prefixes,
                     install_root, to_platform_path(path)))
 
         # peel off the 'skbuild' prefix
-        path = to_unix_path(os.path.relpath(path, CMAKE_INSTALL_DIR))
+        path = to_unix_path(os.path.relpath(path, install_dir))
 
         # If the CMake project lives in a sub-directory (e.g src), its
         # include rules are relative to it. If the project is not already
@@ -471,43 +824,30 @@ def _classify_files(install_paths, package_data, package_prefixes,
             path = to_unix_path(os.path.join(cmake_source_dir, path))
 
         # check to see if path is part of a package
-        for prefix, package in package_prefixes:
-            if path.startswith(prefix):
-                # peel off the package prefix
-                path = os.path.relpath(path, prefix)
-
-                package_file_list = package_data.get(package, [])
-                package_file_list.append(path)
-                package_data[package] = package_file_list
-
-                found_package = True
-                break
-
-        if found_package:
+        match = _match_package_prefix(package_trie, path)
+        if match is not None:
+            prefix, package = match
+            # peel off the package prefix
+            path = os.path.relpath(path, prefix)
+
+            package_file_list = package_data.get(package, [])
+            package_file_list.append(path)
+            package_data[package] = package_file_list
             continue
         # If control reaches this point, then this installed file is not part of
         # a package.
 
         # check if path is a module
-        for module in py_modules:
-            if path.replace("/", ".") == ".".join((module, "py")):
-                new_py_modules[module] = True
-                found_module = True
-                break
-
-        if found_module:
+        module = module_files.get(path.replace("/", "."))
+        if module is not None:
+            new_py_modules[module] = True
             continue
         # If control reaches this point, then this installed file is not a
         # module
 
         # if the file is a script, mark the corresponding script
-        for script in scripts:
-            if path == script:
-                new_scripts[script] = True
-                found_script = True
-                break
-
-        if found_script:
+        if path in script_set:
+            new_scripts[path] = True
             continue
         # If control reaches this point, then this installed file is not a
         # script
@@ -520,17 +860,26 @@ def _classify_files(install_paths, package_data, package_prefixes,
         if file_set is None:
             file_set = set()
             data_files[parent_dir] = file_set
-        file_set.add(os.path.join(CMAKE_INSTALL_DIR, path))
+        file_set.add(os.path.join(install_dir, path))
         del parent_dir, file_set
 
 
+_LINK_METHOD_VERBS = {
+    "copy": "copying",
+    "hardlink": "hard linking",
+    "reflink": "reflinking",
+    "symlink": "symlinking",
+}
+
+
+@profile_phase("consolidate")
 def _consolidate(
         cmake_source_dir, packages, package_dir, py_modules, package_data):
     """This function consolidates packages having modules located in
     both the source tree and the CMake install tree into one location.
 
     The one location is the CMake install tree
-    (see data::`.constants.CMAKE_INSTALL_DIR`).
+    (see :func:`.constants.get_cmake_install_dir`).
 
     Why ? This is a necessary evil because ``Setuptools`` keeps track of
     packages and modules files to install using a dictionary of lists where
@@ -545,9 +894,13 @@ def _consolidate(
     one are either already included or missing from the distribution.
 
     Once a module has been identified as ``missing``, it is both copied
-    into the data::`.constants.CMAKE_INSTALL_DIR` and added to the
+    into the :func:`.constants.get_cmake_install_dir` and added to the
     ``package_data`` dictionary so that it can be considered by
     the upstream setup function.
+
+    Setting the ``SKBUILD_LINK_MODE`` environment variable to ``link``
+    links the module files instead of copying them
+    (see :func:`.utils.link_or_copy`). Files already up-to-date are skipped.
     """
 
     try:
@@ -555,11 +908,17 @@ def _consolidate(
         # and cmake install tree.
         modules = PythonModuleFinder(
             packages, package_dir, py_modules,
-            alternative_build_base=CMAKE_INSTALL_DIR
+            alternative_build_base=get_cmake_install_dir()
         ).find_all_modules()
     except DistutilsError as msg:
         raise SystemExit("error: {}".format(str(msg)))
 
+    link_mode = os.environ.get("SKBUILD_LINK_MODE", "copy")
+    if link_mode not in LINK_MODES:
+        raise SystemExit(
+            "error: SKBUILD_LINK_MODE must be one of {}, got '{}'".format(
+                ", ".join(LINK_MODES), link_mode))
+
     print("")
 
     for entry in modules:
@@ -571,7 +930,8 @@ def _consolidate(
         (package, _, src_module_file) = entry
 
         # Copy missing module file
-        dest_module_file = os.path.join(CMAKE_INSTALL_DIR, src_module_file)
+        dest_module_file = os.path.join(
+            get_cmake_install_dir(), src_module_file)
 
         # Create directory if needed
         dest_module_dir = os.path.dirname(dest_module_file)
@@ -579,9 +939,13 @@ def _consolidate(
             print("creating directory {}".format(dest_module_dir))
             mkdir_p(dest_module_dir)
 
-        # Copy file
-        print("copying {} -> {}".format(src_module_file, dest_module_file))
-        copyfile(src_module_file, dest_module_file)
+        # Copy (or link) file
+        method = link_or_copy(src_module_file, dest_module_file, link_mode)
+        if method == "skip":
+            print("not copying {} (output up-to-date)".format(src_module_file))
+        else:
+            print("{} {} -> {}".format(
+                _LINK_METHOD_VERBS[method], src_module_file, dest_module_file))
 
         # Since the mapping in package_data expects the package to be associated
         # with a list of files relative to the directory containing the package,
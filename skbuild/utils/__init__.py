@@ -1,10 +1,19 @@
 
 import errno
+import json
 import os
+import sys
 
 from collections import namedtuple
 from distutils.command.build_py import build_py as distutils_build_py
 from functools import wraps
+from shutil import copyfile
+
+LINK_MODES = ("copy", "link")
+"""Supported values for the ``mode`` argument of :func:`link_or_copy`."""
+
+# From linux/fs.h: _IOW(0x94, 9, int)
+_FICLONE = 0x40049409
 
 
 class ContextDecorator(object):
@@ -40,6 +49,179 @@ def mkdir_p(path):
             raise
 
 
+def get_cache_dir():
+    """Return the directory where scikit-build keeps its persistent caches.
+
+    The location can be set using the ``SKBUILD_CACHE_DIR`` environment
+    variable. It otherwise defaults to a ``scikit-build`` sub-directory of
+    ``XDG_CACHE_HOME`` (or ``LOCALAPPDATA`` on Windows), falling back to
+    ``~/.cache/scikit-build``.
+    """
+    cache_dir = os.environ.get("SKBUILD_CACHE_DIR")
+    if cache_dir:
+        return cache_dir
+    cache_home = (os.environ.get("XDG_CACHE_HOME")
+                  or os.environ.get("LOCALAPPDATA")
+                  or os.path.join(os.path.expanduser("~"), ".cache"))
+    return os.path.join(cache_home, "scikit-build")
+
+
+def parse_flag(value, default=None):
+    """Return False if ``value`` is ``0``, ``false``, ``no``, ``off`` (case
+    insensitive) or the empty string, True if it is ``1``, ``true``, ``yes``
+    or ``on``, and ``default`` otherwise."""
+    value = str(value).strip().lower()
+    if value in ("", "0", "false", "no", "off"):
+        return False
+    if value in ("1", "true", "yes", "on"):
+        return True
+    return default
+
+
+def env_flag(name, default=False):
+    """Return the boolean value of the environment variable ``name``.
+
+    Values like ``0``, ``false``, ``no`` or ``off`` (case insensitive) and the
+    empty string are considered false, any other value is considered true.
+    If the variable is not set, ``default`` is returned.
+    """
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return parse_flag(value, True)
+
+
+def load_json(path, default=None):
+    """Return the content of the JSON file ``path``, or ``default`` if
+    the file does not exist or can not be decoded."""
+    try:
+        with open(path, "r") as fp:
+            return json.load(fp)
+    except (IOError, OSError, ValueError):
+        return default
+
+
+def save_json(path, data):
+    """Write ``data`` into the JSON file ``path``.
+
+    The content is first written to a temporary file that is then renamed,
+    this ensures concurrent readers never see a partially written file.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        mkdir_p(directory)
+    tmp_path = "{}.{}.tmp".format(path, os.getpid())
+    with open(tmp_path, "w") as fp:
+        json.dump(data, fp, indent=2, sort_keys=True)
+    replace_file(tmp_path, path)
+
+
+def replace_file(src, dest):
+    """Rename ``src`` to ``dest``, replacing ``dest`` if it exists."""
+    try:
+        os.rename(src, dest)
+    except OSError:
+        # On Windows, rename fails if the destination exists.
+        os.remove(dest)
+        os.rename(src, dest)
+
+
+def _is_up_to_date(src, dest):
+    """Return True if ``dest`` exists and has the same size and modification
+    time as ``src``."""
+    try:
+        dest_stat = os.stat(dest)
+    except OSError:
+        return False
+    src_stat = os.stat(src)
+    if src_stat.st_size != dest_stat.st_size:
+        return False
+    if hasattr(src_stat, "st_mtime_ns"):
+        return src_stat.st_mtime_ns == dest_stat.st_mtime_ns
+    return src_stat.st_mtime == dest_stat.st_mtime
+
+
+def _copy_times(src, dest):
+    src_stat = os.stat(src)
+    if hasattr(src_stat, "st_mtime_ns"):
+        os.utime(dest, ns=(src_stat.st_atime_ns, src_stat.st_mtime_ns))
+    else:
+        os.utime(dest, (src_stat.st_atime, src_stat.st_mtime))
+
+
+def _reflink(src, dest):
+    """Clone ``src`` into ``dest`` using the Linux ``FICLONE`` ioctl.
+
+    This only succeeds on file systems supporting copy-on-write (e.g. Btrfs
+    or XFS), ``dest`` is removed if the cloning fails.
+    """
+    if not sys.platform.startswith("linux"):
+        return False
+    import fcntl
+    try:
+        with open(src, "rb") as src_file, open(dest, "wb") as dest_file:
+            fcntl.ioctl(dest_file.fileno(), _FICLONE, src_file.fileno())
+    except (IOError, OSError):
+        if os.path.exists(dest):
+            os.remove(dest)
+        return False
+    _copy_times(src, dest)
+    return True
+
+
+def _hardlink(src, dest):
+    try:
+        os.link(src, dest)
+    except (AttributeError, OSError):
+        return False
+    return True
+
+
+def _symlink(src, dest):
+    try:
+        os.symlink(os.path.abspath(src), dest)
+    except (AttributeError, NotImplementedError, OSError):
+        return False
+    return True
+
+
+def link_or_copy(src, dest, mode="copy"):
+    """Make the file ``src`` available as ``dest``.
+
+    If ``dest`` already has the same size and modification time as ``src``,
+    nothing is done and ``"skip"`` is returned. Otherwise ``dest`` is removed
+    and, depending on ``mode``:
+
+    - ``copy``: ``src`` is copied, preserving its modification time.
+    - ``link``: a reflink, a hard link and a symbolic link are tried in that
+      order, ``src`` is only copied if none of them could be created.
+
+    The method used is returned: ``"reflink"``, ``"hardlink"``,
+    ``"symlink"`` or ``"copy"``.
+    """
+    if mode not in LINK_MODES:
+        raise ValueError("Unknown link mode '{}', expected one of {}".format(
+            mode, ", ".join(LINK_MODES)))
+
+    if _is_up_to_date(src, dest):
+        return "skip"
+
+    # Never write into an existing destination: it could be a link to src.
+    if os.path.lexists(dest):
+        os.remove(dest)
+
+    if mode == "link":
+        for method, link in (("reflink", _reflink),
+                             ("hardlink", _hardlink),
+                             ("symlink", _symlink)):
+            if link(src, dest):
+                return method
+
+    copyfile(src, dest)
+    _copy_times(src, dest)
+    return "copy"
+
+
 class push_dir(ContextDecorator):
     """Context manager to change current directory.
     """
@@ -119,7 +301,7 @@ class PythonModuleFinder(new_style(distutils_build_py)):
     def find_package_modules(self, package, package_dir):
         """Temporally prepend the ``alternative_build_base`` to ``module_file``.
         Doing so will ensure modules can also be found in other location
-        (e.g ``skbuild.constants.CMAKE_INSTALL_DIR``).
+        (e.g ``skbuild.constants.get_cmake_install_dir()``).
         """
         if (package_dir != ""
             and not os.path.exists(package_dir)
@@ -0,0 +1,398 @@
+"""This module provides a wheel archive writer fed with the files to package
+in place (e.g. in the CMake install tree and in the source tree).
+
+Files are streamed into the archive and their ``RECORD`` entry is computed in
+the same pass. See :meth:`.command.bdist_wheel.bdist_wheel.run_direct`.
+
+Members can also be compressed and hashed by a pool of worker threads, the
+archive is then written in the same order, and with the same content, as
+when members are processed one at a time.
+"""
+
+import base64
+import collections
+import hashlib
+import mmap
+import os
+import re
+import stat
+import sys
+import time
+import zipfile
+import zlib
+
+from contextlib import contextmanager
+from multiprocessing.pool import ThreadPool
+
+from .compression import SAMPLE_SIZE
+
+# Chunk size used when streaming files into the archive
+CHUNK_SIZE = 1024 * 1024
+
+# Files larger than this are memory-mapped by the worker threads instead of
+# being read into memory.
+MMAP_THRESHOLD = 4 * 1024 * 1024
+
+# Compressions supported by the worker threads
+PARALLEL_COMPRESSIONS = (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED)
+
+# Compressed members are written using zipfile internals (see
+# ZipWriter._write_compressed), checked with these versions only by
+# tests/test_wheel_writer.py::test_raw_writes_match_zipfile. Others write
+# members one at a time using the zipfile API.
+RAW_WRITES_SUPPORTED = (3, 6) <= sys.version_info[:2] <= (3, 13)
+
+# Zip timestamps can not represent earlier dates (1980-01-01)
+MINIMUM_TIMESTAMP = 315532800
+
+# From distutils.command.build_scripts
+RE_FIRST_LINE = re.compile(b'^#!.*python[0-9.]*([ \t].*)?$')
+
+
+def get_zipinfo_datetime(timestamp=None):
+    """Return the date of an archive member whose file was last modified at
+    ``timestamp``. ``SOURCE_DATE_EPOCH`` takes precedence, this allows
+    reproducible wheels."""
+    timestamp = int(os.environ.get(
+        "SOURCE_DATE_EPOCH", timestamp or time.time()))
+    return time.gmtime(max(timestamp, MINIMUM_TIMESTAMP))[0:6]
+
+
+def default_file_mode():
+    """Return the mode of the files created by the current process, like
+    the copies done by the setuptools build commands."""
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+def record_hash(digest):
+    """Return the ``RECORD`` representation of a sha256 ``digest``."""
+    return "sha256=" + base64.urlsafe_b64encode(
+        digest).rstrip(b"=").decode("ascii")
+
+
+def script_content(path, executable="python"):
+    """Return the content of the script ``path`` with its python shebang
+    line, if any, pointing at ``executable``. Like ``build_scripts`` does
+    for wheels, the installer replaces ``#!python`` by the interpreter."""
+    with open(path, "rb") as fp:
+        first_line = fp.readline()
+        rest = fp.read()
+    match = RE_FIRST_LINE.match(first_line.rstrip(b"\r\n"))
+    if match is None:
+        return first_line + rest
+    post_interp = match.group(1) or b""
+    return b"#!" + executable.encode("utf-8") + post_interp + b"\n" + rest
+
+
+@contextmanager
+def _file_content(path):
+    """Yield the content of ``path``, memory-mapped if it is larger than
+    :data:`MMAP_THRESHOLD`."""
+    with open(path, "rb") as fp:
+        if os.fstat(fp.fileno()).st_size <= MMAP_THRESHOLD:
+            yield fp.read()
+            return
+        content = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            yield content
+        finally:
+            content.close()
+
+
+def _compress(data, compression, arcname=None, policy=None):
+    """Return the CRC, the sha256 digest, the compressed chunks of ``data``,
+    the compression level and the time spent. ``zlib`` and ``hashlib``
+    release the GIL while processing large buffers: worker threads run
+    concurrently.
+
+    The level is chosen by the :class:`.compression.CompressionPolicy`
+    ``policy``, if any. Stored content (level 0) is not copied: None is
+    returned instead of the chunks.
+    """
+    start = time.time()
+    view = memoryview(data)
+    level = 0
+    if compression == zipfile.ZIP_DEFLATED:
+        level = 6 if policy is None else policy.level_for(
+            arcname, view[:SAMPLE_SIZE])
+    crc = 0
+    digest = hashlib.sha256()
+    compressor = None
+    chunks = None
+    if level:
+        # Same compressor as zipfile
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+        chunks = []
+    for offset in range(0, len(view), CHUNK_SIZE):
+        chunk = view[offset:offset + CHUNK_SIZE]
+        crc = zlib.crc32(chunk, crc)
+        digest.update(chunk)
+        if compressor is not None:
+            chunks.append(compressor.compress(chunk))
+    if compressor is not None:
+        chunks.append(compressor.flush())
+        # Poorly compressed files are stored
+        if (policy is not None and policy.max_ratio is not None
+                and sum(len(chunk) for chunk in chunks)
+                > policy.max_ratio * len(view)):
+            level, chunks = 0, None
+    return (crc & 0xffffffff, digest.digest(), chunks, level,
+            time.time() - start)
+
+
+def _compress_file(path, compression, arcname=None, policy=None):
+    with _file_content(path) as content:
+        return _compress(content, compression, arcname, policy)
+
+
+class _Result(object):
+    """Result of a function called in the current thread, with the
+    interface of :meth:`multiprocessing.pool.Pool.apply_async` results."""
+
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+
+class ZipWriter(object):
+    """Write the zip archive ``path``.
+
+    Members are added using :meth:`write` (files) or :meth:`writestr`
+    (data), their hash and size are recorded while they are written.
+
+    If ``jobs`` is greater than one, members are compressed and hashed by
+    that many worker threads while the previous ones are written.
+
+    If the :class:`.compression.CompressionPolicy` ``policy`` is set, it
+    chooses the compression level of each member of a deflated archive, and
+    :attr:`compression_records` lists the ``(arcname, size,
+    compressed_size, level, duration)`` of the members.
+
+    Both require :data:`RAW_WRITES_SUPPORTED`. Otherwise, members are
+    written one at a time and the policy only chooses which ones are stored.
+    """
+
+    def __init__(self, path, compression=zipfile.ZIP_DEFLATED, jobs=1,
+                 policy=None):
+        self.path = path
+        self.compression = compression
+        self.policy = policy
+        self.compression_records = []
+        self._zip = zipfile.ZipFile(path, "w", compression, allowZip64=True)
+        self._records = []
+        self._pool = None
+        self._compressed = False
+        if compression in PARALLEL_COMPRESSIONS and RAW_WRITES_SUPPORTED:
+            if jobs > 1:
+                self._pool = ThreadPool(jobs)
+            self._compressed = jobs > 1 or policy is not None
+        # Members being compressed, in archive order. Their number is
+        # bounded to limit the memory used by compressed chunks.
+        self._pending = collections.deque()
+        self._max_pending = 4 * jobs
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, typ, val, traceback):
+        if typ is None:
+            self.close()
+            return
+        # Do not leave an incomplete archive behind
+        if self._pool is not None:
+            self._pool.terminate()
+        self._zip.close()
+        os.remove(self.path)
+
+    def _zipinfo(self, arcname, mtime, mode):
+        zinfo = zipfile.ZipInfo(arcname, get_zipinfo_datetime(mtime))
+        zinfo.external_attr = mode << 16
+        zinfo.compress_type = self.compression
+        return zinfo
+
+    def write(self, path, arcname, mode=None):
+        """Stream the file ``path`` into the archive as ``arcname``.
+
+        ``mode`` defaults to the mode of ``path``.
+        """
+        st = os.stat(path)
+        if mode is None:
+            mode = stat.S_IMODE(st.st_mode)
+        zinfo = self._zipinfo(arcname, st.st_mtime, mode | stat.S_IFREG)
+        zinfo.file_size = st.st_size
+        if self._compressed:
+            self._enqueue(zinfo, path, _compress_file, (
+                path, self.compression, arcname, self.policy))
+            return
+        start = time.time()
+        digest = hashlib.sha256()
+        with open(path, "rb") as src:
+            sample = src.read(SAMPLE_SIZE)
+            level = self._apply_policy(zinfo, sample)
+            if sys.version_info < (3, 6):
+                data = sample + src.read()
+                digest.update(data)
+                self._zip.writestr(zinfo, data)
+            else:
+                with self._zip.open(zinfo, "w") as dest:
+                    digest.update(sample)
+                    dest.write(sample)
+                    for chunk in iter(lambda: src.read(CHUNK_SIZE), b""):
+                        digest.update(chunk)
+                        dest.write(chunk)
+        self._records.append((arcname, record_hash(digest.digest()),
+                              st.st_size))
+        self._record_compression(zinfo, level, start)
+
+    def writestr(self, arcname, data, mode=0o664, mtime=None):
+        """Add the bytes ``data`` to the archive as ``arcname``."""
+        zinfo = self._zipinfo(arcname, mtime, mode | stat.S_IFREG)
+        if self._compressed:
+            zinfo.file_size = len(data)
+            self._enqueue(zinfo, data, _compress, (
+                data, self.compression, arcname, self.policy))
+            return
+        start = time.time()
+        level = self._apply_policy(zinfo, data[:SAMPLE_SIZE])
+        self._zip.writestr(zinfo, data)
+        self._records.append((arcname, record_hash(
+            hashlib.sha256(data).digest()), len(data)))
+        self._record_compression(zinfo, level, start)
+
+    def _apply_policy(self, zinfo, sample):
+        """Apply the policy to a member written using the zipfile API, which
+        can only store it or deflate it at the default level. Return the
+        level used, or None if there is no policy."""
+        if self.policy is None or self.compression != zipfile.ZIP_DEFLATED:
+            return None
+        if not self.policy.level_for(zinfo.filename, sample):
+            zinfo.compress_type = zipfile.ZIP_STORED
+            return 0
+        return 6
+
+    def _record_compression(self, zinfo, level, start):
+        if level is not None:
+            self.compression_records.append(
+                (zinfo.filename, zinfo.file_size, zinfo.compress_size,
+                 level, time.time() - start))
+
+    def _enqueue(self, zinfo, source, func, args):
+        if self._pool is None:
+            result = _Result(func(*args))
+        else:
+            result = self._pool.apply_async(func, args)
+        self._pending.append((zinfo, source, result))
+        self._flush(self._max_pending)
+
+    def _flush(self, max_pending=0):
+        """Write the pending members until at most ``max_pending`` remain."""
+        while len(self._pending) > max_pending:
+            zinfo, source, result = self._pending.popleft()
+            crc, digest, chunks, level, duration = result.get()
+            if not level:
+                zinfo.compress_type = zipfile.ZIP_STORED
+            self._write_compressed(zinfo, crc, source, chunks)
+            self._records.append(
+                (zinfo.filename, record_hash(digest), zinfo.file_size))
+            self.compression_records.append(
+                (zinfo.filename, zinfo.file_size, zinfo.compress_size,
+                 level, duration))
+
+    def _write_compressed(self, zinfo, crc, source, chunks):
+        """Write the member ``zinfo`` whose content was compressed into
+        ``chunks``. If ``chunks`` is None, the content is stored: it is
+        copied from ``source`` (data or path).
+
+        :mod:`zipfile` can not write compressed data: this writes the same
+        local header as :meth:`zipfile.ZipFile.open` and registers the
+        member for the central directory.
+        """
+        archive = self._zip
+        zinfo.CRC = crc
+        zinfo.compress_size = (
+            zinfo.file_size if chunks is None
+            else sum(len(chunk) for chunk in chunks))
+        zip64 = zinfo.file_size * 1.05 > zipfile.ZIP64_LIMIT
+        if getattr(archive, "_seekable", True):
+            archive.fp.seek(archive.start_dir)
+        zinfo.header_offset = archive.fp.tell()
+        archive._writecheck(zinfo)
+        archive._didModify = True
+        archive.fp.write(zinfo.FileHeader(zip64))
+        if chunks is not None:
+            for chunk in chunks:
+                archive.fp.write(chunk)
+        elif isinstance(source, bytes):
+            archive.fp.write(source)
+        else:
+            with _file_content(source) as content:
+                archive.fp.write(content)
+        archive.filelist.append(zinfo)
+        archive.NameToInfo[zinfo.filename] = zinfo
+        archive.start_dir = archive.fp.tell()
+
+    def close(self):
+        """Write the pending members and close the archive."""
+        if self._zip.fp is None:
+            return
+        self._flush()
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+        self._zip.close()
+
+
+class WheelWriter(ZipWriter):
+    """Write the wheel archive ``path``.
+
+    Like :class:`ZipWriter`, members can also be added using
+    :meth:`write_files` (directory). The ``RECORD`` file of
+    ``dist_info_dir`` (by default, the one associated with the name of the
+    wheel) is written by :meth:`close`.
+    """
+
+    def __init__(self, path, dist_info_dir=None,
+                 compression=zipfile.ZIP_DEFLATED, jobs=1, policy=None):
+        if dist_info_dir is None:
+            dist_info_dir = "-".join(
+                os.path.basename(path).split("-")[:2]) + ".dist-info"
+        super(WheelWriter, self).__init__(path, compression, jobs, policy)
+        self.record_path = dist_info_dir + "/RECORD"
+
+    def write_files(self, base_dir):
+        """Add the files found in ``base_dir``, like
+        :meth:`wheel.wheelfile.WheelFile.write_files`: in directory walk
+        order, the ``.dist-info`` directory last."""
+        deferred = []
+        for root, dir_list, file_list in os.walk(base_dir):
+            dir_list.sort()
+            for filename in sorted(file_list):
+                path = os.path.normpath(os.path.join(root, filename))
+                if not os.path.isfile(path):
+                    continue
+                arcname = os.path.relpath(path, base_dir).replace(
+                    os.path.sep, "/")
+                if arcname == self.record_path:
+                    continue
+                if root.endswith(".dist-info"):
+                    deferred.append((path, arcname))
+                else:
+                    self.write(path, arcname)
+        for path, arcname in sorted(deferred):
+            self.write(path, arcname)
+
+    def close(self):
+        """Write the ``RECORD`` file and close the archive."""
+        if self._zip.fp is None:
+            return
+        self._flush()
+        lines = ["{},{},{}\n".format(arcname, hash_, size)
+                 for arcname, hash_, size in self._records]
+        lines.append("{},,\n".format(self.record_path))
+        zinfo = self._zipinfo(self.record_path, None, 0o664 | stat.S_IFREG)
+        self._zip.writestr(zinfo, "".join(lines).encode("utf-8"))
+        super(WheelWriter, self).close()
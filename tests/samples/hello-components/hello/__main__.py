@@ -0,0 +1,4 @@
+
+if __name__ == "__main__":
+    from . import _hello as hello
+    hello.hello("World")
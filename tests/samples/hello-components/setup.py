@@ -0,0 +1,12 @@
+from skbuild import setup
+
+setup(
+    name="hello",
+    version="1.2.3",
+    description="a minimal example package with a test suite",
+    author='The scikit-build team',
+    license="MIT",
+    packages=['hello'],
+    cmake_targets=['_hello'],
+    cmake_install_components=['python'],
+)
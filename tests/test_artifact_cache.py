@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""test_artifact_cache
+----------------------------------
+
+Tests for the content-addressed cache of CMake install trees.
+"""
+
+import io
+import os
+import pytest
+import sys
+import tarfile
+import threading
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+except ImportError:  # pragma: no cover
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+
+from skbuild.artifact_cache import (HTTPArtifactCache, LocalArtifactCache,
+                                    parse_size, restore_install_tree,
+                                    store_install_tree)
+from skbuild.utils import push_dir
+
+
+@pytest.mark.parametrize("value, expected", (
+    ("1024", 1024),
+    ("10K", 10 * 1024),
+    ("500M", 500 * 1024 ** 2),
+    ("2gb", 2 * 1024 ** 3),
+    ("", None),
+    ("lots", None),
+))
+def test_parse_size(value, expected):
+    assert parse_size(value) == expected
+
+
+def _write_archive(path, size):
+    path.write("x" * size)
+    return str(path)
+
+
+def test_local_artifact_cache_lru(tmpdir):
+    cache = LocalArtifactCache(str(tmpdir.join("cache")), max_size=250)
+    for index, key in enumerate(("a", "b")):
+        cache.put(key, _write_archive(tmpdir.join(key), 100))
+        os.utime(str(tmpdir.join("cache", key + ".tar.gz")),
+                 (1000 + index, 1000 + index))
+
+    # Using "a" makes "b" the least recently used archive
+    assert cache.get("a", str(tmpdir.join("restored")))
+    assert tmpdir.join("restored").read() == "x" * 100
+    assert not cache.get("unknown", str(tmpdir.join("unknown")))
+
+    cache.put("c", _write_archive(tmpdir.join("c"), 100))
+    assert sorted(os.listdir(str(tmpdir.join("cache")))) == [
+        "a.tar.gz", "c.tar.gz"]
+
+    # Archives larger than the cache are not kept
+    cache.put("d", _write_archive(tmpdir.join("d"), 300))
+    assert os.listdir(str(tmpdir.join("cache"))) == []
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    archives = {}
+
+    def do_GET(self):
+        if self.path not in self.archives:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.write(self.archives[self.path])
+
+    def do_PUT(self):
+        length = int(self.headers["Content-Length"])
+        self.archives[self.path] = self.rfile.read(length)
+        self.send_response(201)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def http_server():
+    server = HTTPServer(("127.0.0.1", 0), _StandInHandler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield "http://127.0.0.1:{}/cache/".format(server.server_address[1])
+    server.shutdown()
+    server.server_close()
+    _StandInHandler.archives.clear()
+
+
+def test_http_artifact_cache(tmpdir, http_server):
+    cache = HTTPArtifactCache(http_server)
+    assert not cache.get("key", str(tmpdir.join("missing")))
+
+    cache.put("key", _write_archive(tmpdir.join("archive"), 100))
+    assert list(_StandInHandler.archives) == ["/cache/key.tar.gz"]
+
+    assert cache.get("key", str(tmpdir.join("restored")))
+    assert tmpdir.join("restored").read() == "x" * 100
+
+
+def test_http_artifact_cache_unreachable(tmpdir, capsys):
+    cache = HTTPArtifactCache("http://127.0.0.1:1/cache", timeout=5)
+    assert not cache.get("key", str(tmpdir.join("restored")))
+    cache.put("key", _write_archive(tmpdir.join("archive"), 100))
+    out, _ = capsys.readouterr()
+    assert "Failed to download" in out
+    assert "Failed to upload" in out
+
+
+def test_store_and_restore_install_tree(tmpdir):
+    cache = LocalArtifactCache(str(tmpdir.join("cache")))
+    with push_dir(str(tmpdir.mkdir("first"))):
+        tmpdir.join("first", "install", "pkg", "module.py").ensure().write(
+            "x = 1")
+        tmpdir.join("first", "install", "stale.txt").ensure()
+        assert store_install_tree(
+            cache, "key", "install", [os.path.join("install", "pkg",
+                                                   "module.py")])
+        assert not store_install_tree(
+            cache, "outside", "install", ["module.py"])
+
+    with push_dir(str(tmpdir.mkdir("second"))):
+        tmpdir.join("second", "install", "previous.txt").ensure()
+        assert not restore_install_tree(
+            cache, "unknown", "install", "manifest.txt")
+        assert restore_install_tree(
+            cache, "key", "install", os.path.join("build", "manifest.txt"))
+
+        install_dir = tmpdir.join("second", "install")
+        assert install_dir.join("pkg", "module.py").read() == "x = 1"
+        assert not install_dir.join("stale.txt").exists()
+        assert not install_dir.join("previous.txt").exists()
+        assert tmpdir.join("second", "build", "manifest.txt").read() == (
+            str(install_dir.join("pkg", "module.py")) + "\n")
+
+
+def _add_member(archive, name, data=None, symlink=None):
+    info = tarfile.TarInfo(name)
+    if symlink is not None:
+        info.type = tarfile.SYMTYPE
+        info.linkname = symlink
+        archive.addfile(info)
+    else:
+        info.size = len(data)
+        archive.addfile(info, io.BytesIO(data))
+
+
+@pytest.mark.parametrize("members", (
+    # Link pointing outside, then a file written through it
+    [("install/escape", None, "../../outside"),
+     ("install/escape/evil.txt", b"evil", None)],
+    [("install/escape", None, "/"),
+     ("install/escape/evil.txt", b"evil", None)],
+    # Links only pointing outside once combined
+    [("install/a/b/up", None, ".."),
+     ("install/a/b/escape", None, "up/../../.."),
+     ("install/a/b/escape/evil.txt", b"evil", None)],
+))
+def test_restore_install_tree_malicious_links(tmpdir, members):
+    archive_path = str(tmpdir.join("archive.tar.gz"))
+    with tarfile.open(archive_path, "w:gz") as archive:
+        _add_member(archive, "install_manifest.txt", b"evil.txt\n")
+        for name, data, symlink in members:
+            _add_member(archive, name, data, symlink)
+    cache = LocalArtifactCache(str(tmpdir.join("cache")))
+    cache.put("key", archive_path)
+
+    with push_dir(str(tmpdir.mkdir("project").mkdir("build"))):
+        assert not restore_install_tree(
+            cache, "key", "install", "manifest.txt")
+        assert os.listdir("install") == []
+
+    assert not tmpdir.join("outside").exists()
+    assert not tmpdir.join("project", "evil.txt").exists()
+    assert not tmpdir.join("project", "outside").exists()
+
+
+@pytest.mark.skipif(sys.platform.startswith("win"),
+                    reason="Creating symbolic links requires privileges")
+def test_restore_install_tree_links(tmpdir):
+    archive_path = str(tmpdir.join("archive.tar.gz"))
+    with tarfile.open(archive_path, "w:gz") as archive:
+        _add_member(archive, "install_manifest.txt", b"lib/libhello.so\n")
+        _add_member(archive, "install/lib/libhello.so.1", b"library")
+        _add_member(archive, "install/lib/libhello.so", symlink="libhello.so.1")
+    cache = LocalArtifactCache(str(tmpdir.join("cache")))
+    cache.put("key", archive_path)
+
+    with push_dir(str(tmpdir.mkdir("project"))):
+        assert restore_install_tree(cache, "key", "install", "manifest.txt")
+        assert os.readlink(os.path.join("install", "lib", "libhello.so")) \
+            == "libhello.so.1"
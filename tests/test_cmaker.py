@@ -7,16 +7,29 @@
 Tests for CMaker functionality.
 """
 
+import json
 import os
 import pytest
 import re
+import subprocess
+import sys
 import textwrap
 
-from skbuild.cmaker import (CMAKE_BUILD_DIR, CMaker)
+from skbuild.cmaker import (_get_launcher_compiler_cache,
+                            COMPILE_TIMER_SCRIPT, CONFIGURE_STAMP_FILENAME,
+                            CMaker, find_compiler_cache, get_build_jobs,
+                            get_build_tool_jobs_args, get_compiler_cache_stats,
+                            get_compiler_launcher_args,
+                            get_cpu_count)
+from skbuild import constants
+from skbuild.constants import (build_configuration_key, get_cmake_build_dir,
+                               get_cmake_install_dir, interpreter_prefix_hash,
+                               set_build_configuration, skbuild_plat_name)
 from skbuild.exceptions import SKBuildError
-from skbuild.utils import push_dir
+from skbuild.platform_specifics.abstract import CMakePlatform
+from skbuild.utils import push_dir, to_unix_path
 
-from . import _tmpdir
+from . import (_tmpdir, push_env)
 
 
 def test_get_python_version():
@@ -29,6 +42,71 @@ def test_get_python_library():
     assert os.path.exists(python_library)
 
 
+@pytest.mark.parametrize("generator, jobs, expected_args", (
+    ("Unix Makefiles", None, ['-j', '8']),
+    ("Unix Makefiles", '2', ['-j', '2']),
+    ("MinGW Makefiles", None, ['-j', '8']),
+    ("Ninja", None, ['-j', '8']),
+    ("Ninja", '2', ['-j', '2']),
+    ("Visual Studio 14 2015 Win64", None, ['/m:8']),
+    ("Visual Studio 14 2015", '2', ['/m:2']),
+    ("Xcode", None, ['-jobs', '8']),
+    ("Xcode", '2', ['-jobs', '2']),
+    ("NMake Makefiles", '2', []),
+    (None, None, ['-j', '8']),
+    (None, '2', ['-j', '2']),
+))
+def test_get_build_tool_jobs_args(generator, jobs, expected_args, mocker):
+    mocker.patch('skbuild.cmaker.get_cpu_count', return_value=8)
+    with push_env(SKBUILD_PARALLEL_LEVEL=None,
+                  CMAKE_BUILD_PARALLEL_LEVEL=None,
+                  SKBUILD_BUILD_MEMORY_PER_JOB=None):
+        assert get_build_tool_jobs_args(generator, jobs) == expected_args
+
+
+@pytest.mark.parametrize("jobs, env, expected_jobs", (
+    (None, {}, 8),
+    ('3', {'SKBUILD_PARALLEL_LEVEL': '4'}, 3),
+    (None, {'SKBUILD_PARALLEL_LEVEL': '4',
+            'CMAKE_BUILD_PARALLEL_LEVEL': '5'}, 4),
+    (None, {'CMAKE_BUILD_PARALLEL_LEVEL': '5'}, 5),
+    (None, {'SKBUILD_PARALLEL_LEVEL': 'invalid'}, 8),
+    # 3 GB available with 1 GB per job
+    (None, {'SKBUILD_BUILD_MEMORY_PER_JOB': '1024'}, 3),
+    (None, {'SKBUILD_BUILD_MEMORY_PER_JOB': '4096'}, 1),
+    ('2', {'SKBUILD_BUILD_MEMORY_PER_JOB': '1024'}, 2),
+))
+def test_get_build_jobs(jobs, env, expected_jobs, mocker):
+    mocker.patch('skbuild.cmaker.get_cpu_count', return_value=8)
+    mocker.patch('skbuild.cmaker.get_available_memory',
+                 return_value=3 * 1024 ** 3)
+    variables = {'SKBUILD_PARALLEL_LEVEL': None,
+                 'CMAKE_BUILD_PARALLEL_LEVEL': None,
+                 'SKBUILD_BUILD_MEMORY_PER_JOB': None}
+    variables.update(env)
+    with push_env(**variables):
+        assert get_build_jobs(jobs) == expected_jobs
+
+
+@pytest.mark.parametrize("cgroup_files, expected_count", (
+    ({}, 8),
+    ({"/sys/fs/cgroup/cpu.max": "max 100000"}, 8),
+    ({"/sys/fs/cgroup/cpu.max": "200000 100000"}, 2),
+    ({"/sys/fs/cgroup/cpu.max": "50000 100000"}, 1),
+    ({"/sys/fs/cgroup/cpu/cpu.cfs_quota_us": "400000",
+      "/sys/fs/cgroup/cpu/cpu.cfs_period_us": "100000"}, 4),
+    ({"/sys/fs/cgroup/cpu/cpu.cfs_quota_us": "-1",
+      "/sys/fs/cgroup/cpu/cpu.cfs_period_us": "100000"}, 8),
+))
+def test_get_cpu_count(cgroup_files, expected_count, mocker):
+    mocker.patch('multiprocessing.cpu_count', return_value=8)
+    if hasattr(os, 'sched_getaffinity'):
+        mocker.patch('os.sched_getaffinity', return_value=set(range(8)))
+    mocker.patch('skbuild.cmaker._read_first_line',
+                 side_effect=cgroup_files.get)
+    assert get_cpu_count() == expected_count
+
+
 def test_make_without_build_dir_fails():
     src_dir = _tmpdir('test_make_without_build_dir_fails')
     with push_dir(str(src_dir)), pytest.raises(SKBuildError) as excinfo:
@@ -38,7 +116,7 @@ def test_make_without_build_dir_fails():
 
 def test_make_without_configure_fails(capfd):
     src_dir = _tmpdir('test_make_without_configure_fails')
-    src_dir.ensure(CMAKE_BUILD_DIR, dir=1)
+    src_dir.ensure(get_cmake_build_dir(), dir=1)
     with push_dir(str(src_dir)), pytest.raises(SKBuildError) as excinfo:
         CMaker().make()
     _, err = capfd.readouterr()
@@ -63,7 +141,7 @@ def test_make(has_config_src_dir, capfd):
             message(STATUS "CMAKE_BINARY_DIR:${CMAKE_BINARY_DIR}")
             """
         ))
-        src_dir.ensure(CMAKE_BUILD_DIR, dir=1)
+        src_dir.ensure(get_cmake_build_dir(), dir=1)
 
         with push_dir(str(src_dir)
                       if not has_config_src_dir
@@ -78,14 +156,370 @@ def test_make(has_config_src_dir, capfd):
         messages = ["Project has been installed"]
 
         if has_config_src_dir:
-            messages += ["/SRC",
-                         "/BUILD/_skbuild/cmake-build",
-                         "/BUILD/_skbuild/cmake-install/./foo.txt"]
+            root = "/BUILD"
         else:
-            messages += ["/SRC",
-                         "/SRC/_skbuild/cmake-build",
-                         "/SRC/_skbuild/cmake-install/./foo.txt"]
+            root = "/SRC"
+        messages += ["/SRC",
+                     "{}/{}".format(root, to_unix_path(get_cmake_build_dir())),
+                     "{}/{}/./foo.txt".format(
+                         root, to_unix_path(get_cmake_install_dir()))]
 
         out, _ = capfd.readouterr()
         for message in messages:
             assert message in out
+
+
+@pytest.mark.parametrize("clargs, expected_identifications", (
+    ([], 1),
+    (['-DCMAKE_C_COMPILER:FILEPATH=cc'], 2),
+))
+def test_configure_reuses_probe_toolchain(
+        clargs, expected_identifications, capfd):
+    tmp_dir = _tmpdir('test_configure_reuses_probe_toolchain')
+    with push_dir(str(tmp_dir)):
+        tmp_dir.join('CMakeLists.txt').write(textwrap.dedent(
+            """
+            cmake_minimum_required(VERSION 3.5.0)
+            project(foobar C)
+            message(STATUS "C_COMPILER:${CMAKE_C_COMPILER}")
+            """
+        ))
+        CMaker().configure(clargs)
+
+        out, _ = capfd.readouterr()
+        # Compilers are identified while testing the generator, the toolchain
+        # is then reused unless a compiler is explicitly selected.
+        assert (out.count("The C compiler identification")
+                == expected_identifications)
+        assert re.search(r"C_COMPILER:\S+", out)
+        assert tmp_dir.join(get_cmake_build_dir(), 'CMakeCache.txt').exists()
+
+
+def test_configure_reuses_cached_probe_toolchain(mocker, capfd):
+    tmp_dir = _tmpdir('test_configure_reuses_cached_probe_toolchain')
+    with push_dir(str(tmp_dir)), \
+            push_env(SKBUILD_CACHE_DIR=str(tmp_dir.join('cache')),
+                     SKBUILD_GENERATOR_CACHE_TTL='3600'):
+        tmp_dir.join('CMakeLists.txt').write(textwrap.dedent(
+            """
+            cmake_minimum_required(VERSION 3.5.0)
+            project(foobar C)
+            """
+        ))
+        call = mocker.spy(subprocess, 'call')
+
+        def configure():
+            if os.path.exists(get_cmake_build_dir()):
+                tmp_dir.join(get_cmake_build_dir()).remove()
+            CMaker().configure()
+            out, _ = capfd.readouterr()
+            return call.call_args[0][0], out
+
+        # The generator is probed and cached along with its toolchain
+        cold_cmd, out = configure()
+        assert out.count("The C compiler identification") == 1
+
+        # The cached generator comes with the toolchain, the build tree is
+        # configured with the same arguments.
+        cmd, out = configure()
+        assert "The C compiler identification" not in out
+        assert cmd == cold_cmd
+        assert '-C' in cmd
+
+
+def test_incremental_configure(mocker, capfd):
+    tmp_dir = _tmpdir('test_incremental_configure')
+    with push_dir(str(tmp_dir)):
+        cmakelists = tmp_dir.join('CMakeLists.txt')
+        cmakelists.write(textwrap.dedent(
+            """
+            cmake_minimum_required(VERSION 3.5.0)
+            project(foobar NONE)
+            message(STATUS "Configuring foobar")
+            """
+        ))
+        stamp = tmp_dir.join(get_cmake_build_dir(), CONFIGURE_STAMP_FILENAME)
+
+        def configure(clargs=()):
+            CMaker().configure(clargs, incremental=True)
+            out, _ = capfd.readouterr()
+            return json.loads(stamp.read())["decision"], out
+
+        decision, out = configure()
+        assert decision == "configure"
+        assert "Configuring foobar" in out
+
+        get_best_generator = mocker.spy(CMakePlatform, 'get_best_generator')
+
+        # Nothing changed
+        decision, out = configure()
+        assert decision == "skip"
+        assert "Configuring foobar" not in out
+        assert get_best_generator.call_count == 0
+
+        # CMakeLists.txt changed
+        cmakelists.write("# Updated\n", mode='a')
+        decision, out = configure()
+        assert decision == "regenerate"
+        assert "Configuring foobar" in out
+
+        # Command line changed
+        decision, out = configure(['-DFOO:BOOL=1'])
+        assert decision == "configure"
+        assert "Configuring foobar" in out
+        assert get_best_generator.call_count == 0
+
+        # Non incremental configure always runs CMake
+        CMaker().configure(['-DFOO:BOOL=1'], incremental=False)
+        assert json.loads(stamp.read())["decision"] == "configure"
+        assert get_best_generator.call_count == 1
+
+
+@pytest.mark.parametrize("compiler_cache, env, found, expected", (
+    (None, None, ['ccache'], None),
+    (False, 'ccache', ['ccache'], 'ccache'),
+    (True, None, ['ccache', 'sccache'], 'ccache'),
+    ('auto', None, ['sccache'], 'sccache'),
+    (True, None, [], None),
+    ('sccache', None, ['ccache', 'sccache'], 'sccache'),
+    (True, '0', ['ccache'], None),
+))
+def test_find_compiler_cache(compiler_cache, env, found, expected, mocker):
+    mocker.patch('skbuild.cmaker.find_executable',
+                 side_effect=lambda name: name if name in found else None)
+    with push_env(SKBUILD_COMPILER_CACHE=env):
+        assert find_compiler_cache(compiler_cache) == expected
+
+
+def test_find_compiler_cache_not_found(mocker):
+    mocker.patch('skbuild.cmaker.find_executable', return_value=None)
+    with push_env(SKBUILD_COMPILER_CACHE=None), \
+            pytest.raises(SKBuildError) as excinfo:
+        find_compiler_cache('/path/to/ccache')
+    assert "Compiler cache '/path/to/ccache' could not be found" in str(
+        excinfo.value)
+
+
+def test_get_compiler_launcher_args(mocker):
+    mocker.patch('skbuild.cmaker.find_executable',
+                 side_effect=lambda name: "/usr/bin/" + name)
+    with push_env(SKBUILD_COMPILER_CACHE=None):
+        assert get_compiler_launcher_args() == []
+        assert get_compiler_launcher_args("ccache")[0] == \
+            "-DCMAKE_C_COMPILER_LAUNCHER:STRING=/usr/bin/ccache"
+
+        args = get_compiler_launcher_args("ccache", "/build/times.log")
+    assert len(args) == 3
+    launcher = args[1].split("=", 1)[1]
+    assert launcher.split(";") == [
+        sys.executable, COMPILE_TIMER_SCRIPT, "/build/times.log",
+        "/usr/bin/ccache"]
+    assert _get_launcher_compiler_cache(launcher) == "/usr/bin/ccache"
+    assert _get_launcher_compiler_cache("/usr/bin/sccache") == \
+        "/usr/bin/sccache"
+    assert _get_launcher_compiler_cache(None) is None
+
+
+@pytest.mark.parametrize("compiler_cache, output, expected_stats", (
+    ('/usr/bin/ccache',
+     b"direct_cache_hit\t3\npreprocessed_cache_hit\t2\ncache_miss\t4\n",
+     (5, 4)),
+    ('/usr/bin/sccache',
+     b'{"stats": {"cache_hits": {"counts": {"C/C++": 3, "Rust": 1}},'
+     b' "cache_misses": {"counts": {"C/C++": 2}}}}',
+     (4, 2)),
+    ('/usr/bin/ccache', b"invalid\tstats\n", None),
+    ('/usr/bin/sccache', b"invalid", None),
+    ('/usr/bin/unknown', b"", None),
+))
+def test_get_compiler_cache_stats(
+        compiler_cache, output, expected_stats, mocker):
+    mocker.patch('subprocess.check_output', return_value=output)
+    assert get_compiler_cache_stats(compiler_cache) == expected_stats
+
+
+@pytest.mark.skipif(sys.platform.startswith("win"),
+                    reason="Requires a POSIX shell")
+def test_configure_with_compiler_cache(capfd):
+    tmp_dir = _tmpdir('test_configure_with_compiler_cache')
+    with push_dir(str(tmp_dir)):
+        # Fake compiler cache forwarding the compiler command line and
+        # counting each compilation as a miss.
+        counter = tmp_dir.join('misses')
+        counter.write('0')
+        ccache = tmp_dir.join('ccache')
+        ccache.write(textwrap.dedent(
+            """
+            #!/bin/sh
+            if [ "$1" = "--print-stats" ]; then
+              printf "direct_cache_hit\\t0\\ncache_miss\\t%s\\n" \\
+                "$(cat {counter})"
+              exit 0
+            fi
+            echo $(( $(cat {counter}) + 1 )) > {counter}
+            exec "$@"
+            """.format(counter=str(counter))
+        ).lstrip())
+        ccache.chmod(0o755)
+
+        tmp_dir.join('CMakeLists.txt').write(textwrap.dedent(
+            """
+            cmake_minimum_required(VERSION 3.5.0)
+            project(foobar C)
+            message(STATUS "LAUNCHER:${CMAKE_C_COMPILER_LAUNCHER}")
+            add_library(foo STATIC foo.c)
+            install(TARGETS foo DESTINATION lib)
+            """
+        ))
+        tmp_dir.join('foo.c').write("int foo(void) { return 0; }\n")
+
+        with push_env(SKBUILD_COMPILER_CACHE=None):
+            cmkr = CMaker()
+            cmkr.configure(compiler_cache=str(ccache))
+            cmkr.make()
+
+        out, _ = capfd.readouterr()
+        assert "LAUNCHER:{}".format(ccache) in out
+        assert "Compiler cache (ccache): 0 hits, 1 misses" in out
+
+
+def test_get_python_info_cache(tmpdir, mocker):
+    get_python_library = mocker.spy(CMaker, 'get_python_library')
+    with push_env(SKBUILD_CACHE_DIR=str(tmpdir)):
+        info = CMaker.get_python_info()
+        assert get_python_library.call_count == 1
+        assert info[0] == CMaker.get_python_version()
+        assert os.path.exists(info[1])
+
+        # Cache hit
+        assert CMaker.get_python_info() == info
+        assert get_python_library.call_count == 1
+
+        # Different interpreter
+        mocker.patch.object(sys, 'executable', sys.executable + '-other')
+        assert CMaker.get_python_info() == info
+        assert get_python_library.call_count == 2
+
+        # Cache is removed
+        CMaker.clear_python_info_cache()
+        assert not tmpdir.listdir()
+        CMaker.get_python_info()
+        assert get_python_library.call_count == 3
+
+
+@pytest.mark.parametrize("follow_includes", (True, False))
+def test_check_for_bad_installs(follow_includes, mocker):
+    tmp_dir = _tmpdir('test_check_for_bad_installs')
+    with push_dir(str(tmp_dir)):
+        outside_dir = tmp_dir.join('outside').strpath.replace('\\', '/')
+        tmp_dir.join('CMakeLists.txt').write(textwrap.dedent(
+            """
+            cmake_minimum_required(VERSION 3.5.0)
+            project(foobar NONE)
+            file(WRITE "${CMAKE_BINARY_DIR}/foo.txt" "# foo")
+            install(FILES "${CMAKE_BINARY_DIR}/foo.txt" DESTINATION ".")
+            add_subdirectory(sub)
+            """
+        ))
+        tmp_dir.ensure('sub', 'subsub', dir=1)
+        tmp_dir.join('sub', 'CMakeLists.txt').write(textwrap.dedent(
+            """
+            install(FILES "${CMAKE_BINARY_DIR}/foo.txt" DESTINATION "bar")
+            add_subdirectory(subsub)
+            """
+        ))
+        tmp_dir.join('sub', 'subsub', 'CMakeLists.txt').write(textwrap.dedent(
+            """
+            install(FILES "${{CMAKE_BINARY_DIR}}/foo.txt"
+                    DESTINATION "{}")
+            """.format(outside_dir)
+        ))
+
+        if not follow_includes:
+            mocker.patch.object(
+                CMaker, '_find_bad_installs_from_install_scripts',
+                return_value=None)
+        scan = mocker.spy(CMaker, '_scan_install_script')
+
+        with pytest.raises(SKBuildError) as excinfo:
+            CMaker().configure()
+
+        message = str(excinfo.value)
+        assert "CMake-installed files must be within the project root" \
+            in message
+        assert os.path.join(os.path.normpath(outside_dir), 'foo.txt') \
+            in message
+        assert message.count("foo.txt") == 1
+
+        scanned = [os.path.basename(call[0][0])
+                   for call in scan.call_args_list]
+        if follow_includes:
+            # Only the install scripts have been scanned
+            assert scanned == ["cmake_install.cmake"] * 3
+        else:
+            assert len(scanned) > 3
+
+
+def test_install_merges_manifests():
+    tmp_dir = _tmpdir('test_install_merges_manifests')
+    with push_dir(str(tmp_dir)):
+        build_dir = tmp_dir.ensure(get_cmake_build_dir(), dir=1)
+        install_dir = os.path.join(str(tmp_dir), get_cmake_install_dir())
+        build_dir.join("install_manifest.txt").write("\n".join(
+            os.path.join(install_dir, name) for name in ("a.py", "b.py")))
+        build_dir.join("install_manifest_extra.txt").write("\n".join(
+            os.path.join(install_dir, name) for name in ("b.py", "c.so")))
+
+        paths = CMaker().install()
+        # Manifests are parsed lazily
+        assert not isinstance(paths, list)
+        assert list(paths) == [
+            os.path.join(get_cmake_install_dir(), name)
+            for name in ("a.py", "b.py", "c.so")]
+
+
+def test_build_configuration_key():
+    interpreter = "{}-{}".format(skbuild_plat_name(), interpreter_prefix_hash())
+    try:
+        with push_env(CMAKE_GENERATOR=None):
+            set_build_configuration()
+            assert build_configuration_key() == interpreter
+            assert get_cmake_build_dir() == os.path.join(
+                "_skbuild", interpreter, "cmake-build")
+
+            set_build_configuration("Release")
+            assert build_configuration_key() == \
+                "{}-Release".format(interpreter)
+
+            set_build_configuration("Debug", "Unix Makefiles")
+            assert build_configuration_key() == \
+                "{}-Debug-Unix_Makefiles".format(interpreter)
+            assert get_cmake_install_dir() == os.path.join(
+                "_skbuild",
+                "{}-Debug-Unix_Makefiles".format(interpreter),
+                "cmake-install")
+
+            # The constants follow the configuration
+            assert constants.CMAKE_INSTALL_DIR == get_cmake_install_dir()
+
+        # Like CMaker, the generator defaults to the environment
+        with push_env(CMAKE_GENERATOR="Ninja"):
+            set_build_configuration("Release")
+            assert build_configuration_key() == \
+                "{}-Release-Ninja".format(interpreter)
+    finally:
+        set_build_configuration()
+
+
+def test_build_configuration_key_interpreter_prefix(mocker):
+    # Virtual environments of the same interpreter share its python tag
+    key = build_configuration_key()
+    mocker.patch.object(sys, "prefix", os.path.join(sys.prefix, "venv"))
+    assert build_configuration_key() != key
+    assert build_configuration_key().startswith(skbuild_plat_name() + "-")
+
+
+def test_skbuild_plat_name_abi_flags(mocker):
+    mocker.patch.object(sys, "abiflags", "td", create=True)
+    assert skbuild_plat_name().endswith("{}{}td".format(
+        *sys.version_info[:2]))
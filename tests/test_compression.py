@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""test_compression
+----------------------------------
+
+Tests for the compression policy of the archives.
+"""
+
+import pytest
+
+from skbuild.compression import (compression_report, CompressionPolicy,
+                                 entropy_level, get_compression_policy,
+                                 shannon_entropy)
+
+from . import push_env
+
+
+def test_shannon_entropy():
+    assert shannon_entropy(b"") == 0.0
+    assert shannon_entropy(b"a" * 100) == 0.0
+    assert shannon_entropy(b"ab" * 100) == 1.0
+    assert shannon_entropy(bytearray(range(256)) * 4) == 8.0
+
+
+def test_entropy_level():
+    assert entropy_level(b"x = 1\n" * 100, 6) == 6
+    assert entropy_level(bytearray(range(256)) * 4, 6) == 0
+    assert entropy_level(bytearray(range(100)) * 4, 6) == 1
+
+
+def test_compression_policy():
+    policy = CompressionPolicy.from_string(
+        "dev, lib/*.so=store, *.txt=9, *.bin=auto")
+    assert policy.level == 1
+    assert policy.max_ratio == 0.9
+
+    text = b"hello " * 100
+    random = bytearray(range(256)) * 4
+    assert policy.level_for("lib/_hello.so", text) == 0
+    assert policy.level_for("other/_hello.so", text) == 1
+    assert policy.level_for("pkg/data/notes.txt", random) == 9
+    assert policy.level_for("pkg/data.bin", random) == 0
+    assert policy.level_for("pkg/module.py", random) == 0
+
+    assert CompressionPolicy.from_string("default").level_for(
+        "data.bin", random) == 6
+
+
+@pytest.mark.parametrize("value, message", (
+    ("fastest", "Unknown compression profile"),
+    ("*.so=10", "Invalid compression level"),
+    ("*.so=fast", "Invalid compression level"),
+))
+def test_invalid_compression_policy(value, message):
+    with pytest.raises(ValueError) as excinfo:
+        CompressionPolicy.from_string(value)
+    assert message in str(excinfo.value)
+
+
+def test_get_compression_policy():
+    with push_env(SKBUILD_COMPRESSION_POLICY=None):
+        assert get_compression_policy() is None
+    with push_env(SKBUILD_COMPRESSION_POLICY="max"):
+        assert get_compression_policy().level == 9
+        assert get_compression_policy("dev").level == 1
+
+
+def test_compression_report():
+    report = compression_report([
+        ("fast.txt", 100, 10, 6, 0.5),
+        ("slow.so", 300, 290, 0, 1.5),
+        ("empty", 0, 0, 6, 0.0),
+    ])
+    assert [entry["name"] for entry in report["files"]] == [
+        "slow.so", "fast.txt", "empty"]
+    assert report["files"][1]["ratio"] == 0.1
+    assert report["files"][2]["ratio"] == 1.0
+    assert report["size"] == 400
+    assert report["compressed_size"] == 300
+    assert report["ratio"] == 0.75
+    assert report["duration"] == 2.0
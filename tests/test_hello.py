@@ -8,19 +8,25 @@ Tries to build and test the `hello` sample project.
 """
 
 import glob
+import json
 import os
 import pytest
+import sys
 import tarfile
 
-from skbuild.constants import SKBUILD_DIR
+from skbuild.constants import (get_cmake_build_dir, get_cmake_install_dir,
+                               get_skbuild_build_base,
+                               get_setuptools_install_dir,
+                               get_build_state_file, SKBUILD_DIR)
 from skbuild.exceptions import SKBuildError
 from skbuild.platform_specifics import get_platform
 from skbuild.utils import push_dir
 
-from zipfile import ZipFile
+from zipfile import ZIP_DEFLATED, ZIP_STORED, ZipFile
 
 from . import project_setup_py_test
-from . import (_copy_dir, _tmpdir, SAMPLES_DIR)
+from . import (_copy_dir, _tmpdir, execute_setup_py,
+               initialize_git_repo_and_commit, push_env, SAMPLES_DIR)
 
 
 def test_hello_builds():
@@ -187,10 +193,316 @@ def test_hello_cleans(capfd):
     clean2_out = clean2_out.strip()
 
     assert "running clean" == clean1_out.splitlines()[0]
-    assert "removing '_skbuild{}cmake-install'".format(os.path.sep) \
+    assert "removing '{}'".format(get_cmake_install_dir()) \
            == clean1_out.splitlines()[1]
-    assert "removing '_skbuild{}cmake-build'".format(os.path.sep) \
+    assert "removing '{}'".format(get_cmake_build_dir()) \
            == clean1_out.splitlines()[2]
     assert "removing '_skbuild'" == clean1_out.splitlines()[3]
 
     assert "running clean" == clean2_out
+
+
+def test_hello_clean_cache(tmpdir, capfd):
+    with push_dir(), push_env(SKBUILD_CACHE_DIR=str(tmpdir),
+                              SKBUILD_GENERATOR_CACHE_TTL='3600'):
+
+        @project_setup_py_test("hello", ["build"])
+        def run_build():
+            pass
+
+        tmp_dir = run_build()[0]
+        assert sorted(os.listdir(str(tmpdir))) == [
+            "generators.json", "python-info"]
+
+        @project_setup_py_test("hello", ["clean", "--cache"], tmp_dir=tmp_dir)
+        def run_clean():
+            pass
+
+        run_clean()
+        assert not tmpdir.listdir()
+        assert not tmp_dir.join(SKBUILD_DIR).exists()
+
+    out, _ = capfd.readouterr()
+    assert "removing scikit-build caches from '{}'".format(tmpdir) in out
+
+
+def test_hello_clean_artifact_cache(tmpdir, capfd):
+    artifacts_dir = tmpdir.join("artifacts")
+    with push_dir(), push_env(SKBUILD_CACHE_DIR=str(tmpdir.join("cache")),
+                              SKBUILD_ARTIFACT_CACHE=str(artifacts_dir)):
+
+        @project_setup_py_test("hello", ["build"])
+        def run_build():
+            pass
+
+        tmp_dir = run_build()[0]
+        assert len(artifacts_dir.listdir()) == 1
+
+        @project_setup_py_test("hello", ["clean", "--cache"], tmp_dir=tmp_dir)
+        def run_clean():
+            pass
+
+        run_clean()
+        assert not artifacts_dir.listdir()
+
+    out, _ = capfd.readouterr()
+    assert "removing cached install trees from '{}'".format(
+        artifacts_dir) in out
+
+
+@pytest.mark.parametrize("package_data", (None, {'hello': ['*.cxx']}))
+def test_hello_incremental_build(capfd, package_data):
+    with push_dir(), push_env(SKBUILD_INCREMENTAL_BUILD='1'):
+
+        tmp_dir = _tmpdir("test_hello_incremental_build")
+        _copy_dir(tmp_dir, os.path.join(SAMPLES_DIR, "hello"))
+        if package_data is not None:
+            # The files installed by CMake are added to the package data
+            # of the build, this must not change its state.
+            setup_py = tmp_dir.join("setup.py")
+            setup_py.write(setup_py.read().replace(
+                "packages=['bonjour', 'hello'],",
+                "packages=['bonjour', 'hello'],\n"
+                "    package_data={!r},".format(package_data)))
+        initialize_git_repo_and_commit(tmp_dir)
+
+        @project_setup_py_test("hello", ["build"], tmp_dir=tmp_dir)
+        def run_build():
+            pass
+
+        run_build()
+        assert tmp_dir.join(get_build_state_file()).exists()
+        out, _ = capfd.readouterr()
+        assert "skipping CMake build" not in out
+
+        @project_setup_py_test("hello", ["build"], tmp_dir=tmp_dir)
+        def run_build_again():
+            pass
+
+        run_build_again()
+        out, _ = capfd.readouterr()
+        assert "skipping CMake build" in out
+        assert "Configuring done" not in out
+        assert glob.glob(str(tmp_dir.join(
+            get_setuptools_install_dir(), "lib*", "hello", "_hello*")))
+
+        # Modifying a source file triggers a build
+        source = tmp_dir.join("hello", "_hello.cxx")
+        source.setmtime(source.mtime() + 10)
+
+        run_build_again()
+        out, _ = capfd.readouterr()
+        assert "skipping CMake build" not in out
+
+
+def test_hello_egg_info_manifest_cache(mocker):
+    import subprocess
+    check_output = mocker.spy(subprocess, 'check_output')
+
+    def ls_tree_calls():
+        return [args for args, _ in check_output.call_args_list
+                if 'ls-tree' in args[0]]
+
+    with push_dir():
+
+        @project_setup_py_test("hello", ["egg_info"])
+        def run():
+            pass
+
+        tmp_dir = run()[0]
+        manifest = tmp_dir.join("MANIFEST")
+        assert "setup.py" in manifest.read().splitlines()
+        assert len(ls_tree_calls()) == 1
+
+        # MANIFEST is not regenerated if HEAD tree did not change
+        manifest.setmtime(manifest.mtime() - 100)
+        mtime = manifest.mtime()
+
+        @project_setup_py_test("hello", ["egg_info"], tmp_dir=tmp_dir)
+        def run_again():
+            pass
+
+        run_again()
+        assert len(ls_tree_calls()) == 1
+        assert manifest.mtime() == mtime
+
+        # MANIFEST is not rewritten if the list of files is unchanged
+        with push_dir(str(tmp_dir)):
+            tmp_dir.join("setup.py").write("\n", mode="a")
+            subprocess.check_call(
+                ['git', 'commit', '-q', '-a', '-m', 'Update setup.py'])
+        run_again()
+        assert len(ls_tree_calls()) == 2
+        assert manifest.mtime() == mtime
+
+        with push_dir(str(tmp_dir)):
+            tmp_dir.join("NEWS").write("")
+            subprocess.check_call(['git', 'add', 'NEWS'])
+            subprocess.check_call(['git', 'commit', '-q', '-m', 'Add NEWS'])
+        run_again()
+        assert len(ls_tree_calls()) == 3
+        assert "NEWS" in manifest.read().splitlines()
+
+
+def test_hello_compile_times(capfd):
+    with push_dir(), push_env(SKBUILD_COMPILE_TIMES='1'):
+
+        @project_setup_py_test("hello", ["build"])
+        def run_build():
+            pass
+
+        tmp_dir = run_build()[0]
+
+    out, _ = capfd.readouterr()
+    assert "Slowest targets" in out
+    assert "_hello (1 objects)" in out
+    assert tmp_dir.join(get_skbuild_build_base(), "compile-times.json").exists()
+    assert tmp_dir.join(get_skbuild_build_base(), "compile-trace.json").exists()
+
+
+def test_hello_artifact_cache(capfd, tmpdir):
+    with push_dir(), push_env(SKBUILD_ARTIFACT_CACHE=str(tmpdir)):
+
+        @project_setup_py_test("hello", ["build"])
+        def run_build():
+            pass
+
+        run_build()
+        out, _ = capfd.readouterr()
+        assert "stored in the artifact cache" in out
+        assert len(tmpdir.listdir()) == 1
+
+        # A build of another checkout restores the install tree
+        @project_setup_py_test("hello", ["build"])
+        def run_build_elsewhere():
+            pass
+
+        tmp_dir = run_build_elsewhere()[0]
+        out, _ = capfd.readouterr()
+        assert "restored from the artifact cache" in out
+        assert not tmp_dir.join(
+            get_cmake_build_dir(), "CMakeCache.txt").exists()
+        assert glob.glob(str(tmp_dir.join(
+            get_setuptools_install_dir(), "lib*", "hello", "_hello*")))
+
+
+def _build_hello_wheel_with_scripts(name, setup_args):
+    tmp_dir = _tmpdir(name)
+    _copy_dir(tmp_dir, os.path.join(SAMPLES_DIR, "hello"))
+    tmp_dir.join("scripts", "hello-script").ensure().write(
+        "#!/usr/bin/env python\nprint('hello')\n")
+    tmp_dir.join("data", "hello.txt").ensure().write("hello")
+    setup_py = tmp_dir.join("setup.py")
+    setup_py.write(setup_py.read().replace(
+        "packages=['bonjour', 'hello'],",
+        "packages=['bonjour', 'hello'],\n"
+        "    scripts=['scripts/hello-script'],\n"
+        "    data_files=[('share/hello', ['data/hello.txt'])],"))
+    initialize_git_repo_and_commit(tmp_dir)
+    with execute_setup_py(tmp_dir, ["bdist_wheel"] + setup_args):
+        pass
+    whls = glob.glob(str(tmp_dir.join("dist", "*.whl")))
+    assert len(whls) == 1
+    return tmp_dir, ZipFile(whls[0])
+
+
+def test_hello_direct_wheel():
+    with push_dir():
+        _, expected = _build_hello_wheel_with_scripts("staged", [])
+        tmp_dir, direct = _build_hello_wheel_with_scripts(
+            "direct", ["--direct"])
+
+    # Nothing is staged in the setuptools build directory
+    assert not tmp_dir.join(get_setuptools_install_dir()).listdir(
+        lambda path: path.basename.startswith(("lib", "scripts")))
+
+    assert "hello-1.2.3.data/scripts/hello-script" in direct.namelist()
+    assert "hello-1.2.3.data/data/share/hello/hello.txt" in direct.namelist()
+    assert direct.namelist() == expected.namelist()
+    for name in expected.namelist():
+        assert direct.read(name) == expected.read(name), name
+        assert (direct.getinfo(name).external_attr
+                == expected.getinfo(name).external_attr), name
+
+
+@pytest.mark.parametrize("setup_args", (
+    ["--archive-jobs", "4"], ["--direct", "--archive-jobs", "auto"]))
+def test_hello_parallel_archive(setup_args):
+    with push_dir():
+        _, expected = _build_hello_wheel_with_scripts("serial", [])
+        _, parallel = _build_hello_wheel_with_scripts("parallel", setup_args)
+
+    assert parallel.namelist() == expected.namelist()
+    assert parallel.testzip() is None
+    for name in expected.namelist():
+        assert parallel.read(name) == expected.read(name), name
+        assert (parallel.getinfo(name).external_attr
+                == expected.getinfo(name).external_attr), name
+
+
+@pytest.mark.parametrize("command, archive", (
+    (["bdist_wheel"], "hello-1.2.3-*.whl"),
+    (["bdist_wheel", "--direct"], "hello-1.2.3-*.whl"),
+    (["sdist", "--formats=zip"], "hello-1.2.3.zip"),
+    (["sdist", "--formats=gztar"], "hello-1.2.3.tar.gz"),
+))
+def test_hello_compression_policy(capfd, command, archive):
+    with push_dir():
+
+        @project_setup_py_test("hello", command + [
+            "--compression-policy", "dev,*.py=9", "--compression-report"])
+        def run_command():
+            pass
+
+        tmp_dir = run_command()[0]
+
+    out, err = capfd.readouterr()
+    archives = tmp_dir.join("dist").listdir(archive)
+    assert len(archives) == 1
+    assert "Compressed {}".format(archives[0].basename) in out
+    # Rules can not apply to the files of a gzip stream
+    assert ("compression rules (*.py=9) do not apply to a gzip stream"
+            in out + err) == archive.endswith(".tar.gz")
+    report = tmp_dir.join(
+        get_skbuild_build_base(),
+        "compression-{}.json".format(archives[0].basename))
+    assert report.exists()
+
+    if archive.endswith(".tar.gz"):
+        assert tarfile.open(str(archives[0])).getnames()
+        return
+    with ZipFile(str(archives[0])) as zip_file:
+        assert zip_file.testzip() is None
+        levels = dict((entry["name"], entry["level"])
+                      for entry in json.loads(report.read())["files"])
+        for info in zip_file.infolist():
+            # Empty files are stored, deflating would make them larger
+            if info.filename.endswith(".py") and info.file_size:
+                assert levels[info.filename] == 9, info.filename
+            if not info.filename.endswith("/RECORD"):
+                assert info.compress_type == (
+                    ZIP_DEFLATED if levels[info.filename] else ZIP_STORED)
+
+
+@pytest.mark.skipif(sys.platform.startswith("win"),
+                    reason="Requires the pwd and grp modules")
+def test_hello_compression_policy_tarball_owner():
+    import grp
+    import pwd
+    owner = pwd.getpwuid(0).pw_name
+    group = grp.getgrgid(0).gr_name
+    with push_dir():
+
+        @project_setup_py_test("hello", [
+            "sdist", "--formats=gztar", "--compression-policy", "dev",
+            "--owner", owner, "--group", group])
+        def run_command():
+            pass
+
+        tmp_dir = run_command()[0]
+
+    with tarfile.open(str(tmp_dir.join("dist", "hello-1.2.3.tar.gz"))) as tar:
+        members = tar.getmembers()
+    assert members
+    assert set((member.uid, member.uname, member.gid, member.gname)
+               for member in members) == set([(0, owner, 0, group)])
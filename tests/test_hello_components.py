@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""test_hello_components
+----------------------------------
+
+Tries to build the `hello-components` sample project, building only the
+python extension and installing only the ``python`` install component.
+"""
+
+import glob
+import os
+
+from zipfile import ZipFile
+
+from skbuild.constants import get_cmake_build_dir, get_cmake_install_dir
+from skbuild.utils import push_dir
+
+from . import project_setup_py_test
+
+
+def _installed_files():
+    with open(os.path.join(get_cmake_build_dir(),
+                           "install_manifest_python.txt")) as manifest:
+        return sorted(
+            os.path.relpath(path.strip(),
+                            os.path.abspath(get_cmake_install_dir()))
+            for path in manifest)
+
+
+@project_setup_py_test("hello-components", ["bdist_wheel"])
+def test_hello_components_wheel():
+    # The test executable is neither built nor installed
+    assert not glob.glob(
+        os.path.join(get_cmake_build_dir(), "**", "hello_tests*"))
+    assert not os.path.exists(os.path.join(get_cmake_install_dir(), "bin"))
+    assert glob.glob(
+        os.path.join(get_cmake_build_dir(), "install_manifest*")) == [
+        os.path.join(get_cmake_build_dir(), "install_manifest_python.txt")]
+
+    installed_files = _installed_files()
+    assert installed_files[:2] == [
+        os.path.join("hello", "__init__.py"),
+        os.path.join("hello", "__main__.py")]
+    assert installed_files[2].startswith(os.path.join("hello", "_hello"))
+
+    whls = glob.glob('dist/*.whl')
+    assert len(whls) == 1
+    assert sorted(
+        name for name in ZipFile(whls[0]).namelist()
+        if not name.startswith("hello-1.2.3.dist-info/")
+    ) == [path.replace(os.sep, "/") for path in installed_files]
+
+
+def test_hello_components_command_line():
+    with push_dir():
+
+        @project_setup_py_test("hello-components", [
+            "build", "--build-target", "hello_tests",
+            "--build-target", "_hello",
+            "--install-component", "tests",
+            "--install-component", "python"])
+        def run_build():
+            pass
+
+        tmp_dir = run_build()[0]
+        assert glob.glob(
+            str(tmp_dir.join(get_cmake_build_dir(), "**", "hello_tests*")))
+        assert tmp_dir.join(get_cmake_install_dir(), "bin").listdir()
+        assert sorted(
+            os.path.basename(path) for path in glob.glob(
+                str(tmp_dir.join(get_cmake_build_dir(), "install_manifest*")))
+        ) == ["install_manifest_python.txt", "install_manifest_tests.txt"]
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""test_multibuild
+----------------------------------
+
+Tests for the multi-interpreter build orchestrator.
+"""
+
+import glob
+import os
+import pytest
+import subprocess
+import sys
+
+from skbuild.multibuild import _unique_interpreters, main, split_jobs
+from skbuild.utils import push_dir
+
+from . import (initialize_git_repo_and_commit, prepare_project, push_env,
+               _tmpdir)
+
+
+@pytest.mark.parametrize("jobs, count, expected", (
+    (8, 1, [8]),
+    (8, 3, [3, 3, 2]),
+    (2, 4, [1, 1, 1, 1]),
+))
+def test_split_jobs(jobs, count, expected):
+    assert split_jobs(jobs, count) == expected
+
+
+def _create_venv(tmp_dir, *args):
+    venv_dir = tmp_dir.join("venv")
+    subprocess.check_call([sys.executable, "-m", "venv", "--without-pip"]
+                          + list(args) + [str(venv_dir)])
+    return glob.glob(os.path.join(
+        str(venv_dir), "Scripts" if sys.platform == "win32" else "bin",
+        "python*"))[0]
+
+
+@pytest.mark.skipif(sys.version_info < (3, 3),
+                    reason="Requires the venv module")
+def test_unique_interpreters_keeps_virtual_environments():
+    tmp_dir = _tmpdir('test_unique_interpreters_keeps_virtual_environments')
+    venv_python = _create_venv(tmp_dir)
+
+    # A virtual environment links to the base interpreter, it is
+    # nevertheless another interpreter
+    pythons = [sys.executable, venv_python, sys.executable, venv_python]
+    assert _unique_interpreters(pythons) == [sys.executable, venv_python]
+
+
+@pytest.mark.skipif(sys.version_info < (3, 3),
+                    reason="Requires the venv module")
+def test_multibuild_hello(capsys):
+    tmp_dir = _tmpdir('test_multibuild_hello')
+    prepare_project('hello', tmp_dir)
+    initialize_git_repo_and_commit(tmp_dir)
+    # The virtual environment uses the setuptools and wheel packages of the
+    # interpreter running the tests.
+    venv_python = _create_venv(tmp_dir, "--system-site-packages")
+
+    pythonpath = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with push_dir(str(tmp_dir)), push_env(PYTHONPATH=pythonpath):
+        # The same interpreter is only built once, the two interpreters are
+        # built at the same time in the same project.
+        assert main(["--pythons", sys.executable, venv_python, sys.executable,
+                     "-j", "2"]) == 0
+
+    out, _ = capsys.readouterr()
+    assert "building wheels for 2 interpreter(s), 2 at once, " \
+           "using 1 job(s) each" in out
+    assert "{}: ok".format(sys.executable) in out
+    assert "{}: ok".format(venv_python) in out
+    # Both interpreters have the same python tag, they build the same wheel
+    assert len(glob.glob(str(tmp_dir.join("dist", "*.whl")))) == 1
+    for index, python in enumerate((sys.executable, venv_python)):
+        assert tmp_dir.join(
+            "_skbuild", "multibuild",
+            "{}-{}.log".format(index, os.path.basename(python))).exists()
+    # Each interpreter has its own build directories
+    assert len(glob.glob(str(tmp_dir.join(
+        "_skbuild", "*", "cmake-build", "CMakeCache.txt")))) == 2
+
+
+def test_multibuild_failure(capsys):
+    tmp_dir = _tmpdir('test_multibuild_failure')
+    tmp_dir.join("setup.py").write("raise SystemExit('failed')")
+
+    with push_dir(str(tmp_dir)):
+        assert main(["--pythons", sys.executable, "-j", "1"]) == 1
+
+    out, _ = capsys.readouterr()
+    assert "{}: FAILED".format(sys.executable) in out
@@ -11,10 +11,11 @@ its value.
 
 import pytest
 
+from skbuild.constants import get_cmake_install_dir
 from skbuild.exceptions import SKBuildError
 from skbuild.utils import push_dir
 
-from . import project_setup_py_test
+from . import project_setup_py_test, push_env
 
 
 @pytest.mark.parametrize("option", [
@@ -52,3 +53,25 @@ def test_outside_project_root_fails(option):
 
     if expected_failure:
         assert "CMake-installed files must be within the project root." in msg
+
+
+def test_outside_project_root_fails_incremental():
+
+    with push_dir(), push_env(SKBUILD_INCREMENTAL_CONFIGURE='1'):
+
+        @project_setup_py_test("fail-outside-project-root",
+                               ["install", "--", '-DINSTALL_FILE:BOOL=1'])
+        def should_fail():
+            pass
+
+        # The configure step rejected by check_for_bad_installs must not be
+        # skipped the second time
+        for _ in range(2):
+            with pytest.raises(SystemExit) as excinfo:
+                should_fail()
+            assert isinstance(excinfo.value.code, SKBuildError)
+            assert ("CMake-installed files must be within the project root."
+                    in str(excinfo.value))
+
+        tmp_dir = should_fail.tmp_dir
+        assert not tmp_dir.join(get_cmake_install_dir(), '..', 'dummy').exists()
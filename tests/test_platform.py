@@ -9,10 +9,17 @@ Tests for platforms, to verify that CMake correctly does a test compilation.
 
 import os
 import pytest
+import subprocess
+import sys
+import textwrap
+import time
 
 from skbuild.platform_specifics import get_platform
+from skbuild.platform_specifics.abstract import CMakePlatform
 from skbuild.utils import mkdir_p
 
+from . import push_env
+
 # XXX This should probably be a constant imported from skbuild.constants
 test_folder = "_cmake_test_compile"
 
@@ -42,7 +49,8 @@ def test_write_compiler_test_file():
 def test_cxx_compiler():
 
     # Create a unique subdirectory 'foo' that is expected to be removed.
-    test_build_folder = os.path.join(test_folder, 'build', 'foo')
+    process_test_folder = CMakePlatform.get_test_folder()
+    test_build_folder = os.path.join(process_test_folder, 'build', 'foo')
     mkdir_p(test_build_folder)
 
     generator = platform.get_best_generator(languages=["CXX", "C"],
@@ -59,7 +67,7 @@ def test_cxx_compiler():
     except:
         raise
     finally:
-        platform.cleanup_test()
+        platform.cleanup_test(process_test_folder)
 
 
 @pytest.mark.fortran
@@ -79,10 +87,77 @@ def test_fortran_compiler():
         platform.cleanup_test()
 
 
+@pytest.mark.parametrize("parallel", [True, False])
+def test_compile_test_cmakelist_parallel(parallel):
+    candidate_generators = \
+        ["Invalid Generator"] + platform.default_generators
+
+    platform.write_test_cmakelist(["CXX", "C"])
+    try:
+        generator = platform.compile_test_cmakelist(
+            "cmake", candidate_generators, parallel=parallel)
+        assert generator == platform.default_generators[0]
+
+        # Only the build tree of the working generator is kept
+        assert sorted(os.listdir(test_folder)) == ["CMakeLists.txt", "build"]
+        assert os.path.exists(
+            os.path.join(test_folder, "build", "CMakeCache.txt"))
+
+        generator = platform.compile_test_cmakelist(
+            "cmake", ["Invalid Generator", "Another Invalid Generator"],
+            parallel=parallel)
+        assert generator is None
+    finally:
+        platform.cleanup_test()
+
+
+@pytest.mark.skipif(sys.platform == "win32",
+                    reason="Checks the process ids of a POSIX process group")
+def test_kill_probe_kills_process_group(tmpdir):
+    # The probe starts a child process, like CMake starting a build tool
+    pid_file = tmpdir.join("child.pid")
+    process = CMakePlatform._start_probe([sys.executable, "-c", textwrap.dedent(
+        """
+        import subprocess, sys, time
+        child = subprocess.Popen(
+            [sys.executable, "-c", "import time; time.sleep(60)"])
+        with open(sys.argv[1], "w") as fp:
+            fp.write(str(child.pid))
+        time.sleep(60)
+        """), str(pid_file)])
+    try:
+        while not pid_file.exists() or not pid_file.read():
+            time.sleep(0.05)
+        child_pid = int(pid_file.read())
+    finally:
+        CMakePlatform._kill_probe(process)
+        process.wait()
+
+    # The orphaned child is reaped by init, it is gone once it is killed
+    for _ in range(100):
+        try:
+            os.kill(child_pid, 0)
+        except OSError:
+            break
+        if "Z" in subprocess.check_output(
+                ["ps", "-o", "stat=", "-p", str(child_pid)]).decode():
+            break
+        time.sleep(0.05)
+    else:
+        pytest.fail("child process {} is still running".format(child_pid))
+
+
+def test_get_test_folder():
+    # Concurrent builds of a project test the generators in their own folder
+    assert CMakePlatform.get_test_folder() == "{}-{}".format(
+        test_folder, os.getpid())
+
+
 def test_generator_cleanup():
     # TODO: this isn't a true unit test.  It is checking that none of the
     # other tests have left a mess.
     assert(not os.path.exists(test_folder))
+    assert(not os.path.exists(CMakePlatform.get_test_folder()))
 
 
 @pytest.mark.parametrize("supported_platform",
@@ -99,6 +174,31 @@ def test_known_platform(supported_platform, mocker):
     assert get_platform().__class__.__name__ == expected_platform_classname
 
 
+@pytest.mark.parametrize("has_ninja", [True, False])
+def test_ninja_generator(has_ninja, mocker):
+    mocker.patch('platform.system', return_value='linux')
+    mocker.patch('skbuild.platform_specifics.abstract.find_executable',
+                 return_value='/usr/bin/ninja' if has_ninja else None)
+    expected = ["Ninja"] if has_ninja else []
+    assert get_platform().default_generators == expected + ["Unix Makefiles"]
+
+
+@pytest.mark.parametrize("has_ninja, has_cl, ninja_first", (
+    (True, True, True),
+    (True, False, False),
+    (False, True, False),
+))
+def test_ninja_generator_windows(has_ninja, has_cl, ninja_first, mocker):
+    mocker.patch('platform.system', return_value='windows')
+    mocker.patch('skbuild.platform_specifics.abstract.find_executable',
+                 return_value='ninja.exe' if has_ninja else None)
+    mocker.patch('skbuild.platform_specifics.windows.find_executable',
+                 return_value='cl.exe' if has_cl else None)
+    generators = get_platform().default_generators
+    assert (generators[0] == "Ninja") is ninja_first
+    assert generators[-1] == "MinGW Makefiles"
+
+
 def test_unsupported_platform(mocker):
     mocker.patch('platform.system', return_value='bogus')
 
@@ -112,3 +212,67 @@ def test_unsupported_platform(mocker):
 
     assert failed
     assert "Unsupported platform: bogus." in message
+
+
+def test_generator_cache(tmpdir, mocker):
+    compile_test_cmakelist = mocker.patch.object(
+        CMakePlatform, 'compile_test_cmakelist',
+        return_value='Unix Makefiles')
+
+    with push_env(SKBUILD_CACHE_DIR=str(tmpdir),
+                  SKBUILD_GENERATOR_CACHE_TTL='3600'):
+        cache_path = CMakePlatform.get_generator_cache_path()
+        assert not os.path.exists(cache_path)
+
+        # First call probes the generators and fills the cache
+        assert platform.get_best_generator() == 'Unix Makefiles'
+        assert compile_test_cmakelist.call_count == 1
+        assert os.path.exists(cache_path)
+
+        # Second call is a cache hit
+        assert platform.get_best_generator() == 'Unix Makefiles'
+        assert compile_test_cmakelist.call_count == 1
+
+        # Changing the compiler or the languages is a cache miss
+        with push_env(CC='/path/to/other/cc'):
+            platform.get_best_generator()
+        assert compile_test_cmakelist.call_count == 2
+        platform.get_best_generator(languages=["C"])
+        assert compile_test_cmakelist.call_count == 3
+
+        # Clearing the cache forces a new probe
+        CMakePlatform.clear_generator_cache()
+        assert not os.path.exists(cache_path)
+        platform.get_best_generator()
+        assert compile_test_cmakelist.call_count == 4
+
+
+def test_generator_cache_expired(tmpdir, mocker):
+    compile_test_cmakelist = mocker.patch.object(
+        CMakePlatform, 'compile_test_cmakelist',
+        return_value='Unix Makefiles')
+    mocker.patch('time.time', return_value=1000.0)
+
+    with push_env(SKBUILD_CACHE_DIR=str(tmpdir),
+                  SKBUILD_GENERATOR_CACHE_TTL='60'):
+        platform.get_best_generator()
+        platform.get_best_generator()
+        assert compile_test_cmakelist.call_count == 1
+
+        mocker.patch('time.time', return_value=1061.0)
+        platform.get_best_generator()
+        assert compile_test_cmakelist.call_count == 2
+
+
+@pytest.mark.parametrize("cache_ttl", [None, '0', 'invalid'])
+def test_generator_cache_disabled(cache_ttl, tmpdir, mocker):
+    compile_test_cmakelist = mocker.patch.object(
+        CMakePlatform, 'compile_test_cmakelist',
+        return_value='Unix Makefiles')
+
+    with push_env(SKBUILD_CACHE_DIR=str(tmpdir),
+                  SKBUILD_GENERATOR_CACHE_TTL=cache_ttl):
+        platform.get_best_generator()
+        platform.get_best_generator()
+        assert compile_test_cmakelist.call_count == 2
+        assert not os.path.exists(CMakePlatform.get_generator_cache_path())
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""test_profiling
+----------------------------------
+
+Tests for the build phases instrumentation.
+"""
+
+import json
+import subprocess
+import sys
+
+from skbuild import compile_timer
+from skbuild.profiling import (chrome_trace, compile_times_report,
+                               enable_profiling, format_summary, get_phases,
+                               parse_compile_timer_log, parse_ninja_log,
+                               profile_phase, write_report)
+
+
+def test_profile_phase(tmpdir):
+    del get_phases()[:]
+
+    @profile_phase("decorated")
+    def decorated():
+        subprocess.check_call([sys.executable, "-c", "pass"])
+
+    try:
+        # Nothing is recorded while profiling is disabled
+        enable_profiling(False)
+        decorated()
+        assert get_phases() == []
+
+        enable_profiling()
+        with profile_phase("outer"):
+            decorated()
+        try:
+            with profile_phase("failing"):
+                raise ValueError()
+        except ValueError:
+            pass
+
+        phases = {phase["name"]: phase for phase in get_phases()}
+        assert sorted(phases) == ["decorated", "failing", "outer"]
+        assert phases["outer"]["depth"] == 0
+        assert phases["decorated"]["depth"] == 1
+        assert phases["outer"]["wall"] >= phases["decorated"]["wall"]
+        assert phases["failing"]["failed"]
+        if phases["decorated"]["children"] is not None:
+            assert phases["decorated"]["children"]["user"] >= 0
+
+        report_path = write_report(str(tmpdir.join("profile.json")))
+        with open(report_path) as report_file:
+            report = json.load(report_file)
+        assert [phase["name"] for phase in report["phases"]] == [
+            "outer", "decorated", "failing"]
+        assert report["phases"][0]["start"] == 0
+
+        summary = format_summary(report["phases"]).splitlines()
+        assert summary[1].startswith("outer ")
+        assert summary[2].startswith("  decorated ")
+    finally:
+        enable_profiling(False)
+        del get_phases()[:]
+
+
+def test_parse_ninja_log(tmpdir):
+    ninja_log = tmpdir.join(".ninja_log")
+    ninja_log.write(
+        "# ninja log v5\n"
+        "0\t1500\t0\tCMakeFiles/old.dir/old.cpp.o\tabc\n")
+    offset = ninja_log.size()
+    ninja_log.write(
+        "10\t2010\t0\tsrc/CMakeFiles/foo.dir/a.cpp.o\tabc\n"
+        "20\t520\t0\tsrc/CMakeFiles/foo.dir/b.cpp.o\tdef\n"
+        "2010\t2110\t0\tsrc/libfoo.so\tghi\n", mode="a")
+
+    assert parse_ninja_log(str(ninja_log), offset) == [
+        ("src/CMakeFiles/foo.dir/a.cpp.o", 0.01, 2.01),
+        ("src/CMakeFiles/foo.dir/b.cpp.o", 0.02, 0.52),
+        ("src/libfoo.so", 2.01, 2.11)]
+    assert len(parse_ninja_log(str(ninja_log))) == 4
+    # ninja recompacted the log
+    assert len(parse_ninja_log(str(ninja_log), 100000)) == 4
+    assert parse_ninja_log(str(tmpdir.join("missing"))) == []
+
+
+def test_compile_times_report():
+    records = [
+        ("src/CMakeFiles/foo.dir/a.cpp.o", 0.0, 2.0),
+        ("src/CMakeFiles/foo.dir/b.cpp.o", 0.5, 1.0),
+        ("CMakeFiles/bar.dir/c.cpp.o", 1.0, 2.5),
+        ("src/libfoo.so", 2.5, 3.0)]
+
+    report = compile_times_report(records)
+    assert [entry["output"] for entry in report["objects"]] == [
+        "src/CMakeFiles/foo.dir/a.cpp.o",
+        "CMakeFiles/bar.dir/c.cpp.o",
+        "src/CMakeFiles/foo.dir/b.cpp.o",
+        "src/libfoo.so"]
+    assert report["targets"] == [
+        {"target": "foo", "duration": 2.5, "objects": 2},
+        {"target": "bar", "duration": 1.5, "objects": 1}]
+
+    events = chrome_trace(records)["traceEvents"]
+    assert [(event["name"], event["tid"], event["ts"], event["dur"])
+            for event in events] == [
+        ("src/CMakeFiles/foo.dir/a.cpp.o", 0, 0, 2000000),
+        ("src/CMakeFiles/foo.dir/b.cpp.o", 1, 500000, 500000),
+        ("CMakeFiles/bar.dir/c.cpp.o", 1, 1000000, 1500000),
+        ("src/libfoo.so", 0, 2500000, 500000)]
+
+
+def test_compile_timer(tmpdir):
+    log = tmpdir.join("compile-times.log")
+    with tmpdir.as_cwd():
+        assert compile_timer.main([
+            str(log), sys.executable, "-c", "import sys; sys.exit(3)",
+            "-o", "CMakeFiles/foo.dir/a.cpp.o"]) == 3
+
+    assert [output for output, _, _ in parse_compile_timer_log(
+        str(log), str(tmpdir))] == ["CMakeFiles/foo.dir/a.cpp.o"]
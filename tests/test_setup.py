@@ -11,17 +11,23 @@ import textwrap
 import os
 import pprint
 import pytest
+import time
 
 from distutils.core import Distribution as distutils_Distribution
 from setuptools import Distribution as setuptool_Distribution
 
 from skbuild import setup as skbuild_setup
-from skbuild.cmaker import CMAKE_INSTALL_DIR
+from skbuild.constants import get_cmake_install_dir, get_setuptools_install_dir
 from skbuild.exceptions import SKBuildError
-from skbuild.setuptools_wrap import strip_package
-from skbuild.utils import (push_dir, to_platform_path)
+from skbuild.setuptools_wrap import (_classify_files,
+                                     _collect_package_prefixes,
+                                     _is_metadata_only,
+                                     strip_package)
+from skbuild.utils import (env_flag, push_dir, to_platform_path,
+                           to_unix_path)
 
-from . import (_tmpdir, execute_setup_py, push_argv)
+from . import (_tmpdir, execute_setup_py, initialize_git_repo_and_commit,
+               push_argv, push_env)
 
 
 @pytest.mark.parametrize("distribution_type",
@@ -126,6 +132,50 @@ def test_cmake_args_keyword(cmake_args, capfd):
         assert "VAR_WITH_SPACE[Ciao Mondo]" in out
 
 
+@pytest.mark.parametrize("compiler_cache, env", (
+    ('ccache', None),
+    (None, 'ccache'),
+    (None, None),
+))
+def test_cmake_compiler_cache_keyword(compiler_cache, env, capfd, mocker):
+    tmp_dir = _tmpdir('cmake_compiler_cache_keyword')
+
+    tmp_dir.join('setup.py').write(textwrap.dedent(
+        """
+        from skbuild import setup
+        setup(
+            name="hello",
+            version="1.2.3",
+            description="a minimal example package",
+            author='The scikit-build team',
+            license="MIT",
+            cmake_compiler_cache={compiler_cache!r}
+        )
+        """.format(compiler_cache=compiler_cache)
+    ))
+    tmp_dir.join('CMakeLists.txt').write(textwrap.dedent(
+        r"""
+        cmake_minimum_required(VERSION 3.5.0)
+        project(test NONE)
+        message(STATUS "LAUNCHER[${CMAKE_C_COMPILER_LAUNCHER}]")
+        install(CODE "execute_process(
+          COMMAND \${CMAKE_COMMAND} -E sleep 0)")
+        """
+    ))
+
+    mocker.patch('skbuild.cmaker.find_executable',
+                 side_effect=lambda name: '/path/to/' + name)
+    with push_env(SKBUILD_COMPILER_CACHE=env), \
+            execute_setup_py(tmp_dir, ['build']):
+        pass
+
+    out, _ = capfd.readouterr()
+    if compiler_cache or env:
+        assert "LAUNCHER[/path/to/ccache]" in out
+    else:
+        assert "LAUNCHER[]" in out
+
+
 @pytest.mark.parametrize(
     "cmake_install_dir, expected_failed, error_code_type", (
         (None, True, str),
@@ -209,14 +259,15 @@ def test_cmake_install_dir_keyword(
         if error_code_type == str:
             assert message == "error: package directory " \
                               "'{}' does not exist".format(
-                                    os.path.join(CMAKE_INSTALL_DIR, 'banana'))
+                                    os.path.join(get_cmake_install_dir(),
+                                                 'banana'))
         else:
             assert message.strip().startswith(
                 "setup parameter 'cmake_install_dir' "
                 "is set to an absolute path.")
     else:
         assert "copying {}".format(os.path.join(
-            *"_skbuild/cmake-install/banana/__init__.py".split("/"))) in out
+            get_cmake_install_dir(), "banana", "__init__.py")) in out
 
 
 @pytest.mark.parametrize("distribution_type", ('pure', 'skbuild'))
@@ -278,8 +329,8 @@ def test_script_keyword(distribution_type, capsys):
         ))
 
         messages = [
-            "copying _skbuild/cmake-install/{}.py -> "
-            "_skbuild/setuptools/scripts-".format(module)
+            "copying {{cmake_install_dir}}/{}.py -> "
+            "{{setuptools_install_dir}}/scripts-".format(module)
             for module in ['foo', 'bar']]
 
     elif distribution_type == 'pure':
@@ -288,7 +339,7 @@ def test_script_keyword(distribution_type, capsys):
 
         messages = [
             "copying {}.py -> "
-            "_skbuild/setuptools/scripts-".format(module)
+            "{{setuptools_install_dir}}/scripts-".format(module)
             for module in ['foo', 'bar']]
 
     with execute_setup_py(tmp_dir, ['build']):
@@ -296,7 +347,10 @@ def test_script_keyword(distribution_type, capsys):
 
     out, _ = capsys.readouterr()
     for message in messages:
-        assert to_platform_path(message) in out
+        assert to_platform_path(message.format(
+            cmake_install_dir=to_unix_path(get_cmake_install_dir()),
+            setuptools_install_dir=to_unix_path(get_setuptools_install_dir())
+        )) in out
 
 
 @pytest.mark.parametrize("distribution_type", ('pure', 'skbuild'))
@@ -358,8 +412,8 @@ def test_py_modules_keyword(distribution_type, capsys):
         ))
 
         messages = [
-            "copying _skbuild/cmake-install/{}.py -> "
-            "_skbuild/setuptools/lib".format(module)
+            "copying {{cmake_install_dir}}/{}.py -> "
+            "{{setuptools_install_dir}}/lib".format(module)
             for module in ['foo', 'bar']]
 
     elif distribution_type == 'pure':
@@ -368,7 +422,7 @@ def test_py_modules_keyword(distribution_type, capsys):
 
         messages = [
             "copying {}.py -> "
-            "_skbuild/setuptools/lib".format(module)
+            "{{setuptools_install_dir}}/lib".format(module)
             for module in ['foo', 'bar']]
 
     with execute_setup_py(tmp_dir, ['build']):
@@ -376,7 +430,10 @@ def test_py_modules_keyword(distribution_type, capsys):
 
     out, _ = capsys.readouterr()
     for message in messages:
-        assert to_platform_path(message) in out
+        assert to_platform_path(message.format(
+            cmake_install_dir=to_unix_path(get_cmake_install_dir()),
+            setuptools_install_dir=to_unix_path(get_setuptools_install_dir())
+        )) in out
 
 
 @pytest.mark.parametrize("package_parts, module_file, expected", [
@@ -395,6 +452,176 @@ def test_strip_package(package_parts, module_file, expected):
     assert strip_package(package_parts, module_file) == expected
 
 
+@pytest.mark.parametrize("args, expected", (
+    ([], False),
+    (["--version"], True),
+    (["--name", "--version"], True),
+    (["--help-commands"], False),
+    (["egg_info"], True),
+    (["egg_info", "--egg-base", "build"], True),
+    (["egg_info", "--egg-base"], False),
+    (["sdist", "--formats=gztar", "egg_info"], True),
+    (["egg_info", "build"], False),
+    (["--verbose", "egg_info"], False),
+    (["bdist_wheel"], False),
+))
+def test_is_metadata_only(args, expected):
+    assert _is_metadata_only(args) is expected
+
+
+def test_metadata_only_fast_path(mocker):
+    tmp_dir = _tmpdir('metadata_only_fast_path')
+    tmp_dir.join('setup.py').write(textwrap.dedent(
+        """
+        from skbuild import setup
+        setup(name="fast_path", version="1.2.3")
+        """
+    ))
+    tmp_dir.join('CMakeLists.txt').write("")
+    initialize_git_repo_and_commit(tmp_dir)
+
+    parse_arguments = mocker.patch(
+        'skbuild.setuptools_wrap._parse_setuptools_arguments')
+    with execute_setup_py(tmp_dir, ['egg_info']):
+        pass
+    assert not parse_arguments.called
+    assert tmp_dir.join('fast_path.egg-info', 'PKG-INFO').exists()
+
+
+def _classify(install_paths, packages, py_modules=(), scripts=()):
+    package_dir = {package: package.replace(".", "/") for package in packages}
+    package_data = {}
+    new_py_modules = {}
+    new_scripts = {}
+    data_files = {}
+    _classify_files(
+        [os.path.join(get_cmake_install_dir(), path) for path in install_paths],
+        package_data, _collect_package_prefixes(package_dir, packages),
+        py_modules, new_py_modules,
+        scripts, new_scripts,
+        data_files,
+        "", "")
+    return package_data, new_py_modules, new_scripts, data_files
+
+
+def test_classify_files():
+    package_data, new_py_modules, new_scripts, data_files = _classify(
+        ["top/__init__.py",
+         "top/bar/__init__.py",
+         "top/bar/baz/data.txt",
+         "top/not_a_subpackage/data.txt",
+         "top_level.py",
+         "topography/data.txt",
+         "bin/script",
+         "share/data.txt"],
+        ["top", "top.bar"],
+        py_modules=["top_level"],
+        scripts=["bin/script"])
+
+    # The longest matching package prefix wins
+    assert package_data == {
+        "top": ["__init__.py", to_platform_path("not_a_subpackage/data.txt")],
+        "top.bar": ["__init__.py", to_platform_path("baz/data.txt")],
+    }
+    assert new_py_modules == {"top_level": True}
+    assert new_scripts == {"bin/script": True}
+    # Package prefixes are matched on whole path components
+    install_dir = get_cmake_install_dir()
+    assert data_files == {
+        "topography": {os.path.join(install_dir, "topography/data.txt")},
+        "share": {os.path.join(install_dir, "share/data.txt")},
+    }
+
+
+class _ScanCountingList(list):
+    """List counting how many times it is scanned."""
+
+    scans = 0
+
+    def __iter__(self):
+        self.scans += 1
+        return super(_ScanCountingList, self).__iter__()
+
+    def __contains__(self, item):
+        self.scans += 1
+        return super(_ScanCountingList, self).__contains__(item)
+
+
+def test_classify_files_scaling():
+    install_paths = ["share/data_{}/file_{}.txt".format(index % 100, index)
+                     for index in range(2000)]
+    packages = ["package_{}".format(index) for index in range(400)]
+    package_prefixes = _ScanCountingList(_collect_package_prefixes(
+        {package: package for package in packages}, packages))
+    py_modules = _ScanCountingList(
+        "module_{}".format(index) for index in range(400))
+    scripts = _ScanCountingList(
+        "bin/script_{}".format(index) for index in range(400))
+
+    data_files = {}
+    _classify_files(
+        [os.path.join(get_cmake_install_dir(), path)
+         for path in install_paths],
+        {}, package_prefixes, py_modules, {}, scripts, {}, data_files,
+        "", "")
+
+    assert sum(len(files) for files in data_files.values()) == 2000
+    # Packages, modules and scripts are indexed once instead of being
+    # scanned for each installed file.
+    assert package_prefixes.scans == 1
+    assert py_modules.scans == 1
+    assert scripts.scans == 1
+
+
+def _linear_classify(install_paths, package_prefixes, py_modules, scripts):
+    """Classify ``install_paths`` the way :func:`_classify_files` did before
+    it indexed the packages, modules and scripts: by scanning them for each
+    file. Return the number of files of each kind."""
+    counts = {"package": 0, "module": 0, "script": 0, "data": 0}
+    for path in install_paths:
+        if any(path.startswith(prefix) for prefix, _ in package_prefixes):
+            counts["package"] += 1
+        elif any(path.replace("/", ".") == module + ".py"
+                 for module in py_modules):
+            counts["module"] += 1
+        elif any(path == script for script in scripts):
+            counts["script"] += 1
+        else:
+            counts["data"] += 1
+    return counts
+
+
+@pytest.mark.skipif(not env_flag("SKBUILD_TEST_BENCHMARK"),
+                    reason="Set SKBUILD_TEST_BENCHMARK=1 to run benchmarks")
+@pytest.mark.parametrize("file_count, package_count", (
+    (20000, 400),
+    (20000, 4000),
+))
+def test_classify_files_benchmark(file_count, package_count):
+    install_paths = ["share/data_{}/file_{}.txt".format(index % 100, index)
+                     for index in range(file_count)]
+    packages = ["package_{}".format(index) for index in range(package_count)]
+    py_modules = ["module_{}".format(index) for index in range(package_count)]
+    scripts = ["bin/script_{}".format(index) for index in range(package_count)]
+
+    start = time.time()
+    data_files = _classify(install_paths, packages, py_modules, scripts)[3]
+    indexed = time.time() - start
+
+    start = time.time()
+    counts = _linear_classify(
+        install_paths,
+        _collect_package_prefixes(
+            {package: package for package in packages}, packages),
+        py_modules, scripts)
+    linear = time.time() - start
+
+    print("\nclassified {} files, {} packages: indexed {:.3f}s, "
+          "linear {:.3f}s".format(file_count, package_count, indexed, linear))
+    assert sum(len(files) for files in data_files.values()) == counts["data"]
+    assert indexed < linear
+
+
 @pytest.mark.parametrize("has_cmake_package", [0, 1])
 @pytest.mark.parametrize("has_hybrid_package", [0, 1])
 @pytest.mark.parametrize("has_pure_package", [0, 1])
@@ -651,7 +878,7 @@ def test_setup_inputs(
 
         # package dir
         expected_package_dir = {
-            package: (os.path.join(CMAKE_INSTALL_DIR,
+            package: (os.path.join(get_cmake_install_dir(),
                       package_base,
                       package.replace('.', '/')))
             for package in expected_packages
@@ -829,8 +1056,8 @@ def test_cmake_install_into_pure_package(with_cmake_source_dir, capsys):
         pass
 
     messages = [
-        "copying _skbuild/cmake-install/{} -> "
-        "_skbuild/setuptools/lib".format(module)
+        "copying {{cmake_install_dir}}/{} -> "
+        "{{setuptools_install_dir}}/lib".format(module)
         for module in [
             'fruits/__init__.py',
             'fruits/apple.py',
@@ -841,4 +1068,7 @@ def test_cmake_install_into_pure_package(with_cmake_source_dir, capsys):
 
     out, _ = capsys.readouterr()
     for message in messages:
-        assert to_platform_path(message) in out
+        assert to_platform_path(message.format(
+            cmake_install_dir=to_unix_path(get_cmake_install_dir()),
+            setuptools_install_dir=to_unix_path(get_setuptools_install_dir())
+        )) in out
@@ -9,6 +9,8 @@ Tests for `skbuild` module.
 
 import os
 import platform
+import pytest
+import subprocess
 import sys
 
 from skbuild.platform_specifics import get_platform
@@ -54,3 +56,35 @@ def test_generator_selection():
         )
 
         assert(get_best_generator() == generator)
+
+
+def test_import_skbuild_is_lazy():
+    # setuptools, distutils and wheel are only imported by skbuild.setup()
+    code = (
+        "import sys; import skbuild; "
+        "print(sorted(m for m in sys.modules "
+        "if m.split('.')[0] in ('setuptools', 'wheel', 'pkg_resources') "
+        "or m in ('distutils.core', 'distutils.dist', 'skbuild.cmaker')))")
+    output = subprocess.check_output(
+        [sys.executable, "-c", code],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    assert output.decode().strip() == "[]"
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7),
+                    reason="-X importtime requires python >= 3.7")
+def test_import_skbuild_time():
+    _, err = subprocess.Popen(
+        [sys.executable, "-X", "importtime", "-c", "import skbuild"],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        stderr=subprocess.PIPE).communicate()
+    # Lines look like "import time: <self us> | <cumulative us> | <module>"
+    timings = {
+        fields[2].strip(): int(fields[1])
+        for fields in (line.split("|")
+                       for line in err.decode().splitlines()
+                       if line.startswith("import time:"))
+        if fields[1].strip().isdigit()
+    }
+    # Importing setuptools alone takes ~100ms
+    assert timings["skbuild"] < 50000
@@ -10,9 +10,9 @@ Tests for utils functions.
 import os
 import pytest
 
-from skbuild.utils import (ContextDecorator, mkdir_p,
-                           PythonModuleFinder, push_dir,
-                           to_platform_path, to_unix_path)
+from skbuild.utils import (ContextDecorator, env_flag, link_or_copy, mkdir_p,
+                           parse_flag, PythonModuleFinder, push_dir,
+                           replace_file, to_platform_path, to_unix_path)
 
 from . import (push_env, SAMPLES_DIR)
 
@@ -158,6 +158,80 @@ def test_push_env():
     assert saved_env == os.environ
 
 
+@pytest.mark.parametrize("value, expected", (
+    (None, False),
+    ('', False),
+    ('0', False),
+    ('off', False),
+    ('False', False),
+    ('1', True),
+    ('ON', True),
+    ('yes', True),
+))
+def test_env_flag(value, expected):
+    with push_env(SKBUILD_TEST_FLAG=value):
+        assert env_flag('SKBUILD_TEST_FLAG') is expected
+    with push_env(SKBUILD_TEST_FLAG=None):
+        assert env_flag('SKBUILD_TEST_FLAG', default=True) is True
+
+
+@pytest.mark.parametrize("value, expected", (
+    ('', False),
+    (' No ', False),
+    (False, False),
+    ('on', True),
+    (True, True),
+    ('sccache', None),
+))
+def test_parse_flag(value, expected):
+    assert parse_flag(value) is expected
+
+
+def test_replace_file(tmpdir):
+    src = tmpdir.join("src.txt")
+    dest = tmpdir.join("dest.txt")
+    src.write("first")
+    replace_file(str(src), str(dest))
+    assert dest.read() == "first"
+    assert not src.exists()
+
+    src.write("second")
+    replace_file(str(src), str(dest))
+    assert dest.read() == "second"
+    assert not src.exists()
+
+
+@pytest.mark.parametrize("mode", ("copy", "link"))
+def test_link_or_copy(mode, tmpdir):
+    src = tmpdir.join("src.py")
+    src.write("# src")
+    dest = tmpdir.join("dest.py")
+
+    assert link_or_copy(str(src), str(dest), mode) != "skip"
+    assert dest.read() == "# src"
+
+    # Up-to-date destination is not touched
+    assert link_or_copy(str(src), str(dest), mode) == "skip"
+
+    # Destination is updated if the source changes
+    src.write("# updated src")
+    src.setmtime(src.mtime() + 10)
+    link_or_copy(str(src), str(dest), mode)
+    assert dest.read() == "# updated src"
+
+    # Writing over a hard link to the source must not modify it
+    other = tmpdir.join("other.py")
+    other.write("# other")
+    dest_link = tmpdir.join("dest_link.py")
+    os.link(str(src), str(dest_link))
+    assert link_or_copy(str(other), str(dest_link), mode) != "skip"
+    assert dest_link.read() == "# other"
+    assert src.read() == "# updated src"
+
+    with pytest.raises(ValueError):
+        link_or_copy(str(src), str(dest), "unknown")
+
+
 def test_python_module_finder():
     modules = PythonModuleFinder(['bonjour', 'hello'], {}, []).find_all_modules(
         os.path.join(SAMPLES_DIR, 'hello')
@@ -0,0 +1,268 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""test_wheel_writer
+----------------------------------
+
+Tests for the wheel archive writer.
+"""
+
+import os
+import pytest
+import stat
+import sys
+import zipfile
+
+from distutils.dist import Distribution
+from wheel.bdist_wheel import bdist_wheel as _bdist_wheel
+from wheel.wheelfile import WheelFile
+
+from skbuild import wheel_writer
+from skbuild.command.bdist_wheel import bdist_wheel
+from skbuild.compression import CompressionPolicy
+from skbuild.exceptions import SKBuildError
+from skbuild.wheel_writer import script_content, WheelWriter
+
+
+def test_wheel_writer(tmpdir):
+    tmpdir.join("module.py").write("x = 1\n")
+    tmpdir.join("large.bin").write_binary(b"\0\1" * 1024 * 1024)
+    wheel_path = str(tmpdir.join("pkg-1.0-py3-none-any.whl"))
+
+    with WheelWriter(wheel_path, "pkg-1.0.dist-info") as wheel:
+        wheel.write(str(tmpdir.join("module.py")), "pkg/module.py", 0o644)
+        wheel.write(str(tmpdir.join("large.bin")), "pkg/large.bin")
+        wheel.writestr("pkg-1.0.dist-info/METADATA", b"Name: pkg\n")
+
+    # WheelFile checks the content against the RECORD hashes
+    with WheelFile(wheel_path) as wheel:
+        assert wheel.namelist() == [
+            "pkg/module.py", "pkg/large.bin", "pkg-1.0.dist-info/METADATA",
+            "pkg-1.0.dist-info/RECORD"]
+        assert wheel.read("pkg/module.py") == b"x = 1\n"
+        assert wheel.read("pkg/large.bin") == b"\0\1" * 1024 * 1024
+        assert wheel.getinfo("pkg/module.py").external_attr >> 16 == 0o100644
+        assert wheel.read("pkg-1.0.dist-info/RECORD").decode().splitlines()[
+            -1] == "pkg-1.0.dist-info/RECORD,,"
+
+
+def test_wheel_writer_error(tmpdir):
+    wheel_path = tmpdir.join("pkg-1.0-py3-none-any.whl")
+    with pytest.raises(OSError):
+        with WheelWriter(str(wheel_path), "pkg-1.0.dist-info") as wheel:
+            wheel.write(str(tmpdir.join("missing.py")), "pkg/missing.py")
+    assert not wheel_path.exists()
+
+
+def _write_wheel(tmpdir, name, compression, jobs):
+    wheel_path = str(tmpdir.join(name, "pkg-1.0-py3-none-any.whl"))
+    tmpdir.ensure_dir(name)
+    with WheelWriter(wheel_path, compression=compression,
+                     jobs=jobs) as wheel:
+        wheel.write_files(str(tmpdir.join("tree")))
+        wheel.writestr("pkg-1.0.dist-info/METADATA", b"Name: pkg\n")
+    return wheel_path
+
+
+@pytest.mark.parametrize("compression", (
+    zipfile.ZIP_DEFLATED, zipfile.ZIP_STORED))
+def test_parallel_wheel_writer(tmpdir, monkeypatch, compression):
+    monkeypatch.setenv("SOURCE_DATE_EPOCH", "1500000000")
+    monkeypatch.setattr(wheel_writer, "MMAP_THRESHOLD", 1024)
+    for index in range(20):
+        tmpdir.join("tree", "pkg", "module{}.py".format(index)).ensure(
+        ).write("x = {}\n".format(index) * index * 100)
+    tmpdir.join("tree", "pkg", "data", "large.bin").ensure().write_binary(
+        b"\0\1" * 1024 * 1024)
+    tmpdir.join("tree", "pkg-1.0.dist-info", "WHEEL").ensure().write(
+        "Wheel-Version: 1.0\n")
+
+    serial = _write_wheel(tmpdir, "serial", compression, 1)
+    parallel = _write_wheel(tmpdir, "parallel", compression, 4)
+
+    # Output does not depend on the order members are compressed in
+    with open(serial, "rb") as expected, open(parallel, "rb") as actual:
+        assert actual.read() == expected.read()
+    with WheelFile(parallel) as wheel:
+        assert wheel.namelist()[-3:] == [
+            "pkg-1.0.dist-info/WHEEL", "pkg-1.0.dist-info/METADATA",
+            "pkg-1.0.dist-info/RECORD"]
+        assert wheel.testzip() is None
+        assert wheel.read("pkg/data/large.bin") == b"\0\1" * 1024 * 1024
+
+
+def _zipfile_archive(path, members, compression, level=None):
+    """Write ``members`` (``(zinfo, data)``) using the zipfile API only."""
+    kwargs = {} if level is None else {"compresslevel": level}
+    with zipfile.ZipFile(path, "w", compression, allowZip64=True) as archive:
+        for zinfo, data in members:
+            archive.writestr(zinfo, data, **kwargs)
+    with open(path, "rb") as fp:
+        return fp.read()
+
+
+@pytest.mark.skipif(not wheel_writer.RAW_WRITES_SUPPORTED,
+                    reason="Members are written using the zipfile API")
+@pytest.mark.parametrize("compression, level", (
+    (zipfile.ZIP_STORED, None),
+    (zipfile.ZIP_DEFLATED, None),
+    (zipfile.ZIP_DEFLATED, 1),
+    (zipfile.ZIP_DEFLATED, 9),
+))
+def test_raw_writes_match_zipfile(tmpdir, monkeypatch, compression, level):
+    # The members compressed by the worker threads are written using
+    # zipfile internals: the archive must be the one zipfile writes.
+    if level is not None and sys.version_info < (3, 7):
+        pytest.skip("ZipFile.writestr(compresslevel=...) requires "
+                    "python >= 3.7")
+    monkeypatch.setenv("SOURCE_DATE_EPOCH", "1500000000")
+    contents = [
+        ("pkg/__init__.py", b""),
+        ("pkg/module.py", b"x = 1\n" * 5000),
+        ("pkg/random.bin", os.urandom(64 * 1024)),
+        ("pkg/large.bin", b"\0\1\2" * 1024 * 1024),
+    ]
+    policy = None if level is None else CompressionPolicy(level)
+    path = str(tmpdir.join("raw.zip"))
+    with wheel_writer.ZipWriter(path, compression, jobs=4,
+                                policy=policy) as archive:
+        for arcname, data in contents:
+            archive.writestr(arcname, data, mode=0o644)
+    assert archive._compressed
+
+    members = [(archive._zipinfo(arcname, None, 0o644 | stat.S_IFREG), data)
+               for arcname, data in contents]
+    expected = _zipfile_archive(
+        str(tmpdir.join("expected.zip")), members, compression, level)
+    with open(path, "rb") as fp:
+        assert fp.read() == expected
+
+
+def test_parallel_wheel_writer_error(tmpdir):
+    wheel_path = tmpdir.join("pkg-1.0-py3-none-any.whl")
+    with pytest.raises(IOError):
+        with WheelWriter(str(wheel_path), jobs=2) as wheel:
+            wheel.write(str(tmpdir.join("missing.py")), "pkg/missing.py")
+    assert not wheel_path.exists()
+
+
+@pytest.mark.parametrize("jobs", (1, 4))
+def test_wheel_writer_compression_policy(tmpdir, jobs):
+    tmpdir.join("tree", "pkg", "module.py").ensure().write("x = 1\n" * 1000)
+    tmpdir.join("tree", "pkg", "notes.txt").ensure().write("hello\n" * 1000)
+    tmpdir.join("tree", "pkg", "random.bin").ensure().write_binary(
+        os.urandom(100 * 1024))
+    tmpdir.join("tree", "pkg", "counter.dat").ensure().write(
+        "".join("{:08d}".format(index) for index in range(10000)))
+    wheel_path = str(tmpdir.join("pkg-1.0-py3-none-any.whl"))
+
+    # Without entropy detection, the random content is compressed and then
+    # stored because of its ratio
+    policy = CompressionPolicy.from_string("max,*.txt=store,*.dat=3")
+    with WheelWriter(wheel_path, jobs=jobs, policy=policy) as wheel:
+        wheel.write_files(str(tmpdir.join("tree")))
+
+    levels = dict((name, level) for name, _, _, level, _
+                  in wheel.compression_records)
+    assert levels == {"pkg/counter.dat": 3, "pkg/module.py": 9,
+                      "pkg/notes.txt": 0, "pkg/random.bin": 0}
+    with WheelFile(wheel_path) as wheel:
+        assert wheel.testzip() is None
+        compress_types = dict(
+            (info.filename, info.compress_type) for info in wheel.infolist())
+        assert wheel.read("pkg/random.bin") == tmpdir.join(
+            "tree", "pkg", "random.bin").read_binary()
+    assert compress_types == {
+        "pkg/counter.dat": zipfile.ZIP_DEFLATED,
+        "pkg/module.py": zipfile.ZIP_DEFLATED,
+        "pkg/notes.txt": zipfile.ZIP_STORED,
+        "pkg/random.bin": zipfile.ZIP_STORED,
+        "pkg-1.0.dist-info/RECORD": zipfile.ZIP_DEFLATED}
+
+
+def test_wheel_writer_without_raw_writes(tmpdir, monkeypatch):
+    # Fallback for the python versions whose zipfile internals are unknown
+    monkeypatch.setattr(wheel_writer, "RAW_WRITES_SUPPORTED", False)
+    tmpdir.join("tree", "pkg", "module.py").ensure().write("x = 1\n" * 1000)
+    tmpdir.join("tree", "pkg", "random.bin").ensure().write_binary(
+        os.urandom(100 * 1024))
+    wheel_path = str(tmpdir.join("pkg-1.0-py3-none-any.whl"))
+
+    policy = CompressionPolicy.from_string("dev,*.py=9")
+    with WheelWriter(wheel_path, jobs=4, policy=policy) as wheel:
+        wheel.write_files(str(tmpdir.join("tree")))
+    assert wheel._pool is None
+
+    levels = dict((name, level) for name, _, _, level, _
+                  in wheel.compression_records)
+    assert levels == {"pkg/module.py": 6, "pkg/random.bin": 0}
+    with WheelFile(wheel_path) as wheel:
+        assert wheel.testzip() is None
+        assert wheel.getinfo("pkg/module.py").compress_type == \
+            zipfile.ZIP_DEFLATED
+        assert wheel.getinfo("pkg/random.bin").compress_type == \
+            zipfile.ZIP_STORED
+
+
+@pytest.mark.parametrize("first_line, expected", (
+    (b"#!/usr/bin/env python\n", b"#!python\n"),
+    (b"#!/usr/bin/python3.6 -u\n", b"#!python -u\n"),
+    (b"#!/bin/sh\n", b"#!/bin/sh\n"),
+    (b"print('no shebang')\n", b"print('no shebang')\n"),
+))
+def test_script_content(tmpdir, first_line, expected):
+    script = tmpdir.join("script")
+    script.write_binary(first_line + b"print('hello')\n")
+    assert script_content(str(script)) == expected + b"print('hello')\n"
+
+
+@pytest.mark.skipif(sys.version_info < (3, 6),
+                    reason="ZipFile.open(mode='w') requires python >= 3.6")
+def test_zip_members_are_streamed(tmpdir, mocker):
+    tmpdir.join("large.bin").write_binary(b"\0" * 3 * 1024 * 1024)
+    writestr = mocker.spy(zipfile.ZipFile, "writestr")
+    with WheelWriter(str(tmpdir.join("pkg-1.0-py3-none-any.whl")),
+                     "pkg-1.0.dist-info") as wheel:
+        wheel.write(str(tmpdir.join("large.bin")), "pkg/large.bin")
+    # Only RECORD is written from memory
+    assert writestr.call_count == 1
+
+
+def _bdist_wheel_command(archive_jobs):
+    command = bdist_wheel(Distribution())
+    command.archive_jobs = archive_jobs
+    command.compression_policy = None
+    return command
+
+
+def test_bdist_wheel_writer_not_found(monkeypatch):
+    module = sys.modules[_bdist_wheel.__module__]
+    monkeypatch.delattr(module, "WheelFile")
+    with pytest.raises(SKBuildError) as excinfo:
+        with _bdist_wheel_command(4)._wheel_writer():
+            pass
+    assert "WheelFile not found" in str(excinfo.value)
+
+
+def test_bdist_wheel_writer_not_used():
+    module = sys.modules[_bdist_wheel.__module__]
+    wheel_file = module.WheelFile
+    with pytest.raises(SKBuildError) as excinfo:
+        with _bdist_wheel_command(4)._wheel_writer():
+            assert module.WheelFile is not wheel_file
+    assert "was not written" in str(excinfo.value)
+    assert module.WheelFile is wheel_file
+
+    # Nothing is replaced when writing the wheel serially
+    with _bdist_wheel_command(1)._wheel_writer():
+        assert module.WheelFile is wheel_file
+
+
+def test_bdist_wheel_writer_restored_on_error():
+    module = sys.modules[_bdist_wheel.__module__]
+    wheel_file = module.WheelFile
+    with pytest.raises(RuntimeError):
+        with _bdist_wheel_command(4)._wheel_writer():
+            assert module.WheelFile is not wheel_file
+            raise RuntimeError("build failed")
+    assert module.WheelFile is wheel_file